@@ -0,0 +1,334 @@
+import asyncio
+import contextvars
+import inspect
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import Any
+from typing import AsyncGenerator
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from metrics import record_tool
+from pydantic import ConfigDict
+from pydantic import Field
+from pydantic import PrivateAttr
+
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.tools.functions.function_calling_command import FunctionCallingCommand
+
+
+DEFAULT_FUNCTION_WORKERS = 32
+
+_default_executor: Optional[ThreadPoolExecutor] = None
+_default_executor_lock = threading.Lock()
+_limit_lock = threading.Lock()
+
+
+def default_function_executor() -> ThreadPoolExecutor:
+    """Return the process-wide thread pool running blocking llm functions."""
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_FUNCTION_WORKERS, thread_name_prefix="llm_function"
+            )
+        return _default_executor
+
+
+class ConcurrencyLimit:
+    """
+    A semaphore shared by threads and event loops alike.
+
+    Threads block on `acquire`, coroutines wait on `a_acquire` without blocking their
+    loop, and a released slot is handed over to the longest waiting one of either kind.
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("The concurrency limit must be at least 1")
+        self.limit = limit
+        self._active = 0
+        self._lock = threading.Lock()
+        self._waiters: Deque[Any] = deque()
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        waiter.wait()
+
+    async def a_acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was handed over while being cancelled, so pass it on
+            self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self._active -= 1
+                return
+            waiter = self._waiters.popleft()
+
+        # The slot goes to the waiter as is, the active count does not change
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        loop, future = waiter
+        try:
+            loop.call_soon_threadsafe(self._wake, future)
+        except RuntimeError:
+            # The loop of the waiter is closed
+            self.release()
+
+    def _wake(self, future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ConcurrencyLimit":
+        # A limit is shared by every copy of the workflow using it
+        return self
+
+
+class AsyncFunctionCallingCommand(FunctionCallingCommand):
+    """
+    A FunctionCallingCommand that never runs a blocking function on the event loop.
+
+    `async def` llm functions are awaited natively. Plain functions are run on an
+    executor, the shared `default_function_executor` unless one is configured, so one
+    slow call, a registration writing to a database for instance, does not hold up the
+    other conversations served by the loop. The sync path runs both kinds on the
+    executor as well, so the timeout applies to them.
+
+    When a message holds several calls of the function, they are all dispatched at
+    once, and their responses returned together in the order of the calls.
+
+    Attributes:
+        executor (Optional[Executor]): Runs the blocking functions.
+        max_concurrency (Optional[int]): Maximum number of calls to the function in
+            flight at once, across every thread and event loop, unlimited if not set.
+        timeout (Optional[float]): Seconds a call may run before failing with a
+            TimeoutError, not counting the wait for a concurrency slot. A blocking
+            function cannot be interrupted, so it keeps its slot until it returns.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    executor: Optional[Executor] = Field(default=None)
+    max_concurrency: Optional[int] = Field(default=None)
+    timeout: Optional[float] = Field(default=None)
+
+    _limit: Optional[ConcurrencyLimit] = PrivateAttr(default=None)
+
+    class Builder(FunctionCallingCommand.Builder):
+        """Concrete builder for AsyncFunctionCallingCommand."""
+
+        def _init_command(self) -> "AsyncFunctionCallingCommand":
+            return AsyncFunctionCallingCommand()
+
+        def executor(self, executor: Executor) -> "AsyncFunctionCallingCommand.Builder":
+            self._command.executor = executor
+            return self
+
+        def max_concurrency(
+            self, max_concurrency: int
+        ) -> "AsyncFunctionCallingCommand.Builder":
+            self._command.max_concurrency = max_concurrency
+            return self
+
+        def timeout(self, timeout: float) -> "AsyncFunctionCallingCommand.Builder":
+            self._command.timeout = timeout
+            return self
+
+    def _is_async(self) -> bool:
+        return inspect.iscoroutinefunction(inspect.unwrap(self.function_tool.function))
+
+    def _get_executor(self) -> Executor:
+        return self.executor or default_function_executor()
+
+    def _get_limit(self) -> Optional[ConcurrencyLimit]:
+        if self.max_concurrency is None:
+            return None
+        with _limit_lock:
+            if self._limit is None:
+                self._limit = ConcurrencyLimit(self.max_concurrency)
+            return self._limit
+
+    def _timeout_error(self) -> TimeoutError:
+        return TimeoutError(
+            f"{self.function_tool.name} did not return within {self.timeout} seconds"
+        )
+
+    def _submit(self, function: Callable[..., Any], *args: Any) -> Future:
+        """
+        Run the function on the executor, in the context of the caller so its events
+        and metrics are labelled with the running node, holding a slot until it returns.
+        """
+        limit = self._get_limit()
+        context = contextvars.copy_context()
+        try:
+            future = self._get_executor().submit(context.run, function, *args)
+        except BaseException:
+            if limit is not None:
+                limit.release()
+            raise
+        if limit is not None:
+            future.add_done_callback(lambda _: limit.release())
+        return future
+
+    def _split_tool_calls(self, input_data: Message) -> List[Message]:
+        """Return one message per call of the tool's function, in the order of the calls."""
+        if not input_data.tool_calls:
+            # Left to the tool to reject
+            return [input_data]
+        return [
+            input_data.model_copy(update={"tool_calls": [tool_call]})
+            for tool_call in input_data.tool_calls
+            if tool_call.function.name == self.function_tool.function_specs.name
+        ]
+
+    async def _a_call(
+        self, execution_context: ExecutionContext, input_data: Message
+    ) -> List[Message]:
+        return [
+            message
+            async for messages in self.function_tool.a_execute(
+                execution_context, input_data
+            )
+            for message in (messages if isinstance(messages, list) else [messages])
+        ]
+
+    def _start(
+        self, execution_context: ExecutionContext, input_data: Message, is_async: bool
+    ) -> Tuple[Future, float]:
+        limit = self._get_limit()
+        if limit is not None:
+            limit.acquire()
+
+        started_at = time.perf_counter()
+        if is_async:
+            future = self._submit(
+                asyncio.run, self._a_call(execution_context, input_data)
+            )
+        else:
+            future = self._submit(
+                self.function_tool.execute, execution_context, input_data
+            )
+        return future, started_at
+
+    async def _a_dispatch(
+        self, execution_context: ExecutionContext, input_data: Message, is_async: bool
+    ) -> List[Message]:
+        limit = self._get_limit()
+        if limit is not None:
+            await limit.a_acquire()
+
+        if is_async:
+            try:
+                return await self._a_wait(self._a_call(execution_context, input_data))
+            finally:
+                if limit is not None:
+                    limit.release()
+
+        future = self._submit(self.function_tool.execute, execution_context, input_data)
+        return await self._a_wait(asyncio.wrap_future(future))
+
+    async def _a_wait(self, call: Awaitable[List[Message]]) -> List[Message]:
+        # Only the timeout expiring is reported as such, a TimeoutError raised by the
+        # function itself is left as it is
+        timeout = asyncio.timeout(self.timeout)
+        try:
+            async with timeout:
+                return await call
+        except TimeoutError:
+            if timeout.expired():
+                raise self._timeout_error() from None
+            raise
+
+    def execute(
+        self, execution_context: ExecutionContext, input_data: Message
+    ) -> List[Message]:
+        is_async = self._is_async()
+        messages: List[Message] = []
+        with record_tool(self.function_tool.name):
+            # Every call is started before waiting for the first one
+            pending = [
+                self._start(execution_context, tool_call_message, is_async)
+                for tool_call_message in self._split_tool_calls(input_data)
+            ]
+            for future, started_at in pending:
+                timeout = (
+                    None
+                    if self.timeout is None
+                    else max(0.0, started_at + self.timeout - time.perf_counter())
+                )
+                # Waited for apart from its result, a TimeoutError raised by the
+                # function itself is not mistaken for the timeout expiring
+                if not wait([future], timeout=timeout).done:
+                    for other, _ in pending:
+                        other.cancel()
+                    raise self._timeout_error()
+                messages.extend(future.result())
+
+        return messages
+
+    async def a_execute(
+        self, execution_context: ExecutionContext, input_data: Message
+    ) -> AsyncGenerator[Message, None]:
+        is_async = self._is_async()
+        with record_tool(self.function_tool.name):
+            results = await asyncio.gather(
+                *(
+                    self._a_dispatch(execution_context, tool_call_message, is_async)
+                    for tool_call_message in self._split_tool_calls(input_data)
+                )
+            )
+
+        # The responses are published together, in the order of the calls
+        yield [message for messages in results for message in messages]
+
+    def __deepcopy__(
+        self, memo: Optional[Dict[int, Any]] = None
+    ) -> "AsyncFunctionCallingCommand":
+        # The executor and the concurrency limit are shared by every copy of the workflow
+        memo = {} if memo is None else memo
+        memo[id(self.executor)] = self.executor
+        self._get_limit()
+        return super().__deepcopy__(memo)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **super().to_dict(),
+            "executor": type(self.executor).__name__ if self.executor else None,
+            "max_concurrency": self.max_concurrency,
+            "timeout": self.timeout,
+        }
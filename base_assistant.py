@@ -0,0 +1,184 @@
+import asyncio
+from typing import AsyncGenerator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from workflow_template import WorkflowTemplate
+
+from grafi.assistants.assistant import Assistant
+from grafi.common.containers.container import container
+from grafi.common.decorators.record_assistant_a_stream import record_assistant_a_stream
+from grafi.common.events.topic_events.consume_from_topic_event import (
+    ConsumeFromTopicEvent,
+)
+from grafi.common.events.topic_events.output_topic_event import OutputTopicEvent
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.common.topics.output_topic import AGENT_OUTPUT_TOPIC
+from grafi.common.topics.output_topic import AGENT_STREAM_OUTPUT_TOPIC
+from grafi.common.topics.topic_base import HUMAN_REQUEST_TOPIC
+
+
+class BaseAssistant(Assistant):
+    """
+    Base class for the assistants in this project, extending grafi's Assistant with
+    end-to-end streaming and batch execution.
+
+    The workflow must provide `a_stream`, as ParallelEventDrivenWorkflow does.
+    """
+
+    def execute(
+        self, execution_context: ExecutionContext, input_data: List[Message]
+    ) -> List[Message]:
+        """
+        Process the input data through the workflow and return the response messages.
+        A request left waiting for a human reply is checkpointed by the workflow.
+        """
+        output = super().execute(execution_context, input_data)
+        self.workflow.checkpoint(execution_context)
+        return output
+
+    async def a_execute(
+        self, execution_context: ExecutionContext, input_data: List[Message]
+    ) -> List[Message]:
+        """
+        Process the input data through the workflow and return the response messages.
+        A request left waiting for a human reply is checkpointed by the workflow.
+        """
+        output = await super().a_execute(execution_context, input_data)
+        self.workflow.checkpoint(execution_context)
+        return output
+
+    async def a_execute_many(
+        self,
+        requests: List[Tuple[ExecutionContext, List[Message]]],
+        max_concurrency: int = 16,
+        timeout: Optional[float] = None,
+    ) -> List[Union[List[Message], Exception]]:
+        """
+        Process many independent requests concurrently on the running event loop.
+
+        At most `max_concurrency` requests run at the same time, each on its own copy of the
+        assistant, since a workflow holds the topic state of the request it is executing.
+        A request that fails or exceeds `timeout` seconds does not stop the others.
+
+        Args:
+            requests (List[Tuple[ExecutionContext, List[Message]]]): Execution context and
+                input messages of every request
+            max_concurrency (int): Maximum number of requests executed at the same time
+            timeout (Optional[float]): Timeout of a single request in seconds, no timeout if None
+
+        Returns:
+            List[Union[List[Message], Exception]]: The output messages of every request, or the
+                exception it raised, in the order of the requests
+        """
+        results: List[Union[List[Message], Exception]] = [None] * len(requests)
+        pending_requests = iter(enumerate(requests))
+
+        async def worker(assistant: "BaseAssistant") -> None:
+            for index, (execution_context, input_data) in pending_requests:
+                try:
+                    results[index] = await asyncio.wait_for(
+                        assistant.a_execute(execution_context, input_data), timeout
+                    )
+                except Exception as e:
+                    results[index] = e
+
+        worker_count = max(1, min(max_concurrency, len(requests)))
+        await asyncio.gather(*(worker(self._fork()) for _ in range(worker_count)))
+
+        return results
+
+    def _fork(self) -> "BaseAssistant":
+        """
+        Copy the assistant with its own workflow, nodes and topics, so it can execute a
+        request concurrently with this one. The copy shares the tools, the commands and
+        the compiled routing of the workflow, and its topics publish to it.
+        """
+        return self.model_copy(
+            update={"workflow": WorkflowTemplate(self.workflow).instantiate()}
+        )
+
+    def _get_consumed_events(self) -> List[ConsumeFromTopicEvent]:
+        # Read the output topics of this assistant's workflow rather than the module level
+        # topics, which a forked workflow does not publish to
+        consumed_events: List[ConsumeFromTopicEvent] = []
+        for topic_name in (
+            HUMAN_REQUEST_TOPIC,
+            AGENT_OUTPUT_TOPIC,
+            AGENT_STREAM_OUTPUT_TOPIC,
+        ):
+            topic = self.workflow.topics.get(topic_name)
+            if topic is None or not topic.can_consume(self.name):
+                continue
+
+            for event in topic.consume(self.name):
+                if topic_name == HUMAN_REQUEST_TOPIC and not isinstance(
+                    event, OutputTopicEvent
+                ):
+                    continue
+                consumed_events.append(
+                    ConsumeFromTopicEvent(
+                        topic_name=event.topic_name,
+                        consumer_name=self.name,
+                        consumer_type=self.type,
+                        execution_context=event.execution_context,
+                        offset=event.offset,
+                        data=event.data,
+                    )
+                )
+
+        return consumed_events
+
+    @record_assistant_a_stream
+    async def a_stream(
+        self, execution_context: ExecutionContext, input_data: List[Message]
+    ) -> AsyncGenerator[Message, None]:
+        """
+        Process the input data through the workflow and stream the response.
+
+        Token deltas of the final LLM node are yielded as soon as they are generated, while
+        upstream nodes may still be running. Output messages that were not streamed, such as
+        human requests, are yielded complete once the workflow has finished.
+
+        Args:
+            execution_context (ExecutionContext): Context containing execution information
+            input_data (List[Message]): List of input messages to be processed
+
+        Returns:
+            AsyncGenerator[Message, None]: Response deltas followed by the remaining outputs
+        """
+        return self._a_stream(execution_context, input_data)
+
+    async def _a_stream(
+        self, execution_context: ExecutionContext, input_data: List[Message]
+    ) -> AsyncGenerator[Message, None]:
+        streamed_message_ids: Set[str] = set()
+        consumed_events: List[ConsumeFromTopicEvent] = []
+        try:
+            async for message in self.workflow.a_stream(execution_context, input_data):
+                streamed_message_ids.add(message.message_id)
+                yield message
+
+            output: List[Message] = []
+
+            consumed_events = self._get_consumed_events()
+
+            for event in consumed_events:
+                messages = event.data if isinstance(event.data, list) else [event.data]
+                output.extend(
+                    message
+                    for message in messages
+                    if message.message_id not in streamed_message_ids
+                )
+
+            for message in sorted(output, key=lambda msg: msg.timestamp):
+                yield message
+
+            self.workflow.checkpoint(execution_context)
+        finally:
+            if consumed_events:
+                container.event_store.record_events(consumed_events)
@@ -0,0 +1,94 @@
+"""
+Benchmarks of the import time of the assistant modules, the bulk of the cold start of a
+short-lived worker. Every round imports the module in a fresh interpreter.
+
+Run with pytest-benchmark installed:
+
+    pytest benchmark_imports.py --benchmark-columns=mean,median,max
+
+Besides the timings, every benchmark reports in its extra info the import time measured
+inside the interpreter, without its startup, the number of modules loaded and the
+heaviest packages, from `python -X importtime`.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any
+from typing import Dict
+from typing import List
+
+import pytest
+
+
+pytest.importorskip("pytest_benchmark")
+
+# Provider SDKs that are only imported once a tool using them is built
+LAZY_MODULES = ("ollama", "numpy", "http.server")
+
+IMPORT_SCRIPT = """
+import json
+import sys
+import time
+
+started_at = time.perf_counter()
+import {module}
+import_seconds = time.perf_counter() - started_at
+print(json.dumps({{"import_seconds": import_seconds, "modules": sorted(sys.modules)}}))
+"""
+
+
+def import_module(module: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", IMPORT_SCRIPT.format(module=module)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
+def heaviest_packages(importtime_log: str, count: int = 5) -> Dict[str, float]:
+    """Sum the self time of the imported modules by top-level package, in ms."""
+    self_times: Dict[str, float] = defaultdict(float)
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        if self_us.strip().isdigit():
+            self_times[name.strip().split(".")[0]] += int(self_us) / 1000
+    heaviest = sorted(self_times.items(), key=lambda item: -item[1])[:count]
+    return {package: round(ms, 1) for package, ms in heaviest}
+
+
+def run_benchmark(benchmark: Any, module: str) -> List[str]:
+    benchmark.pedantic(import_module, args=(module,), rounds=5, warmup_rounds=1)
+
+    # Measured on one more run, outside the timed rounds
+    result = import_module(module, "-X", "importtime")
+    report = json.loads(result.stdout.splitlines()[-1])
+    benchmark.extra_info.update(
+        {
+            "import_ms": round(report["import_seconds"] * 1000, 1),
+            "modules": len(report["modules"]),
+            "heaviest_packages_ms": heaviest_packages(result.stderr),
+        }
+    )
+    return report["modules"]
+
+
+def test_simple_llm_assistant_import(benchmark):
+    modules = run_benchmark(benchmark, "simple_llm_assistant")
+    assert not set(LAZY_MODULES) & set(modules)
+
+
+def test_simple_ollama_assistant_import(benchmark):
+    modules = run_benchmark(benchmark, "simple_ollama_assistant")
+    assert not set(LAZY_MODULES) & set(modules)
+
+
+def test_kyc_assistant_import(benchmark):
+    modules = run_benchmark(benchmark, "kyc_assistant")
+    assert not set(LAZY_MODULES) & set(modules)
@@ -0,0 +1,147 @@
+"""
+Benchmarks of the framework overhead of the assistants, with MockLLMTool in place of the
+models so no time is spent on the network.
+
+Run with pytest-benchmark installed:
+
+    pytest benchmark_workflows.py --benchmark-columns=mean,median,ops
+
+Besides the timings, every benchmark reports in its extra info the events recorded per
+second, the overhead of each node over its tool, the memory allocated by one run and
+the p99 latency.
+"""
+
+import asyncio
+import statistics
+import tracemalloc
+from collections import defaultdict
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+
+import pytest
+from mock_assistants import get_execution_context
+from mock_assistants import kyc_assistant
+from mock_assistants import simple_llm_assistant
+
+from grafi.common.containers.container import container
+from grafi.common.events.event import EventType
+from grafi.common.models.message import Message
+
+
+# The outputs of the assistants are tested in test_workflows.py, only the timings need
+# pytest-benchmark
+pytest.importorskip("pytest_benchmark")
+
+
+def node_tools(assistant: Any) -> Dict[str, str]:
+    """Map the nodes of the assistant workflow to the name of the tool they call."""
+    tools = {}
+    for node in assistant.workflow.nodes.values():
+        tool = getattr(node.command, "llm", None) or getattr(
+            node.command, "function_tool", None
+        )
+        if tool is not None:
+            tools[node.name] = tool.name
+    return tools
+
+
+def node_overhead(events: List[Any], tools: Dict[str, str]) -> Dict[str, float]:
+    """Return the mean milliseconds each node spends outside the tool it calls."""
+    started: Dict[str, List[Any]] = defaultdict(list)
+    durations: Dict[str, List[float]] = defaultdict(list)
+    for event in sorted(events, key=lambda e: e.timestamp):
+        name = getattr(event, "node_name", None) or getattr(event, "tool_name", None)
+        if event.event_type in (EventType.NODE_INVOKE, EventType.TOOL_INVOKE):
+            started[name].append(event.timestamp)
+        elif event.event_type in (EventType.NODE_RESPOND, EventType.TOOL_RESPOND):
+            if started[name]:
+                start = started[name].pop(0)
+                durations[name].append((event.timestamp - start).total_seconds())
+
+    return {
+        node_name: round(
+            (
+                statistics.mean(durations[node_name])
+                - statistics.mean(durations.get(tool_name) or [0.0])
+            )
+            * 1000,
+            3,
+        )
+        for node_name, tool_name in tools.items()
+        if durations.get(node_name)
+    }
+
+
+def run_benchmark(benchmark: Any, assistant: Any, run: Callable[[], Any]) -> None:
+    event_store = container.event_store
+    benchmark.pedantic(run, setup=event_store.clear_events, rounds=50, warmup_rounds=5)
+
+    # Measured on one more run, outside the timed rounds
+    event_store.clear_events()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    events = event_store.get_events()
+
+    timings = sorted(benchmark.stats.stats.data)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    benchmark.extra_info.update(
+        {
+            "events": len(events),
+            "events_per_sec": round(len(events) / benchmark.stats.stats.mean),
+            "node_overhead_ms": node_overhead(events, node_tools(assistant)),
+            "peak_allocated_kb": round(peak / 1024, 1),
+            "p99_ms": round(p99 * 1000, 3),
+        }
+    )
+
+
+def test_simple_llm_assistant_execute(benchmark):
+    assistant = simple_llm_assistant()
+    input_data = [Message(role="user", content="Hello, what can you do?")]
+
+    def run():
+        return assistant.execute(get_execution_context(), input_data)
+
+    run_benchmark(benchmark, assistant, run)
+
+
+def test_simple_llm_assistant_a_execute(benchmark):
+    assistant = simple_llm_assistant()
+    input_data = [Message(role="user", content="Hello, what can you do?")]
+
+    def run():
+        return asyncio.run(assistant.a_execute(get_execution_context(), input_data))
+
+    run_benchmark(benchmark, assistant, run)
+
+
+def test_kyc_assistant_registration(benchmark):
+    assistant = kyc_assistant()
+    input_data = [Message(role="user", content="Craig Li, craig@binome.dev")]
+
+    def run():
+        return assistant.execute(get_execution_context(), input_data)
+
+    run_benchmark(benchmark, assistant, run)
+
+
+def test_kyc_assistant_hitl(benchmark):
+    assistant = kyc_assistant()
+
+    def run():
+        # The request is resumed with the human reply to the information request
+        execution_context = get_execution_context()
+        assistant.execute(
+            execution_context,
+            [Message(role="user", content="Hello, I want to register the gym.")],
+        )
+        return assistant.execute(
+            execution_context,
+            [Message(role="user", content="Craig Li, craig@binome.dev")],
+        )
+
+    run_benchmark(benchmark, assistant, run)
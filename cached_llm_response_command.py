@@ -0,0 +1,179 @@
+import time
+import uuid
+from typing import Any
+from typing import AsyncGenerator
+from typing import Callable
+from typing import List
+from typing import Optional
+
+from metrics import current_node
+from metrics import response_cache_requests
+from metrics import semantic_cache_requests
+from pydantic import ConfigDict
+from pydantic import Field
+from response_cache import ResponseCache
+from response_cache import response_cache_key
+from semantic_cache import SemanticCache
+from semantic_cache import SemanticQuery
+
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.tools.llms.llm_response_command import LLMResponseCommand
+
+
+class CachedLLMResponseCommand(LLMResponseCommand):
+    """
+    An LLMResponseCommand that serves repeated requests from a response cache.
+
+    The cache is keyed on the model, system message, input messages and chat params, and
+    is only used when the LLM runs with temperature 0, since other responses are not
+    meant to be reproducible. Cached responses are returned with fresh message and tool
+    call ids, so they can be published like a new response.
+
+    Requests missing the response cache can then be looked up in a semantic cache,
+    which serves near-duplicate requests as well. It is opted in per command, at any
+    temperature, and `semantic_cache_condition` can restrict it to the requests whose
+    response does not depend on their details.
+
+    Attributes:
+        response_cache (Optional[ResponseCache]): Serves identical requests.
+        semantic_cache (Optional[SemanticCache]): Serves similar requests.
+        semantic_cache_condition (Optional[Callable[[List[Message]], bool]]): Whether
+            a request may use the semantic cache, all of them if not set.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    response_cache: Optional[ResponseCache] = Field(default=None)
+    semantic_cache: Optional[SemanticCache] = Field(default=None)
+    semantic_cache_condition: Optional[Callable[[List[Message]], bool]] = Field(
+        default=None
+    )
+
+    class Builder(LLMResponseCommand.Builder):
+        """Concrete builder for CachedLLMResponseCommand."""
+
+        def _init_command(self) -> "CachedLLMResponseCommand":
+            return CachedLLMResponseCommand()
+
+        def response_cache(
+            self, response_cache: ResponseCache
+        ) -> "CachedLLMResponseCommand.Builder":
+            self._command.response_cache = response_cache
+            return self
+
+        def semantic_cache(
+            self, semantic_cache: Optional[SemanticCache]
+        ) -> "CachedLLMResponseCommand.Builder":
+            self._command.semantic_cache = semantic_cache
+            return self
+
+        def semantic_cache_condition(
+            self, semantic_cache_condition: Callable[[List[Message]], bool]
+        ) -> "CachedLLMResponseCommand.Builder":
+            self._command.semantic_cache_condition = semantic_cache_condition
+            return self
+
+    def _cache_enabled(self) -> bool:
+        return (
+            self.response_cache is not None
+            and self.llm.chat_params.get("temperature") == 0
+        )
+
+    def _semantic_cache_enabled(self, input_data: List[Message]) -> bool:
+        return self.semantic_cache is not None and (
+            self.semantic_cache_condition is None
+            or self.semantic_cache_condition(input_data)
+        )
+
+    def _get_semantic(self, query: SemanticQuery) -> Optional[List[Message]]:
+        cached = self.semantic_cache.get(query)
+        semantic_cache_requests.inc(
+            node=current_node(),
+            tool=self.llm.name,
+            result="miss" if cached is None else "hit",
+        )
+        return cached
+
+    def _store(
+        self,
+        key: Optional[str],
+        query: Optional[SemanticQuery],
+        messages: List[Message],
+    ) -> None:
+        if key is not None:
+            self.response_cache.set(key, messages)
+        if query is not None:
+            self.semantic_cache.set(query, messages)
+
+    def _get_cached(self, key: str) -> Optional[List[Message]]:
+        cached = self.response_cache.get(key)
+        response_cache_requests.inc(
+            node=current_node(),
+            tool=self.llm.name,
+            result="miss" if cached is None else "hit",
+        )
+        return cached
+
+    def _from_cache(self, messages: List[Message]) -> List[Message]:
+        responses = []
+        for message in messages:
+            update = {"message_id": uuid.uuid4().hex, "timestamp": time.time_ns()}
+            if message.tool_calls:
+                update["tool_calls"] = [
+                    tool_call.model_copy(update={"id": f"call_{uuid.uuid4().hex}"})
+                    for tool_call in message.tool_calls
+                ]
+            responses.append(message.model_copy(update=update))
+        return responses
+
+    def execute(
+        self, execution_context: ExecutionContext, input_data: List[Message]
+    ) -> Message:
+        key = query = cached = None
+        if self._cache_enabled():
+            key = response_cache_key(self.llm, input_data)
+            cached = self._get_cached(key)
+        if cached is None and self._semantic_cache_enabled(input_data):
+            query = self.semantic_cache.query(self.llm, input_data)
+            if query is not None:
+                cached = self._get_semantic(query)
+        if cached is not None:
+            return self._from_cache(cached)[0]
+
+        message = self.llm.execute(execution_context, input_data)
+        self._store(key, query, [message])
+        return message
+
+    async def a_execute(
+        self, execution_context: ExecutionContext, input_data: List[Message]
+    ) -> AsyncGenerator[Message, None]:
+        key = query = cached = None
+        if self._cache_enabled():
+            key = response_cache_key(self.llm, input_data)
+            cached = self._get_cached(key)
+        if cached is None and self._semantic_cache_enabled(input_data):
+            query = await self.semantic_cache.a_query(self.llm, input_data)
+            if query is not None:
+                cached = self._get_semantic(query)
+        if cached is not None:
+            for message in self._from_cache(cached):
+                yield message
+            return
+
+        messages = []
+        async for message in self.llm.a_execute(execution_context, input_data):
+            messages.append(message)
+            yield message
+        self._store(key, query, messages)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **super().to_dict(),
+            "response_cache": type(self.response_cache).__name__
+            if self.response_cache
+            else None,
+            "semantic_cache": type(self.semantic_cache).__name__
+            if self.semantic_cache
+            else None,
+        }
@@ -0,0 +1,103 @@
+import json
+import sqlite3
+import threading
+import zlib
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+
+class CheckpointStore:
+    """Stores the checkpoints of suspended workflows by assistant request id."""
+
+    def save(self, assistant_request_id: str, checkpoint: Dict[str, Any]) -> None:
+        """Save the checkpoint of a request, replacing any previous one."""
+        raise NotImplementedError
+
+    def pop(self, assistant_request_id: str) -> Optional[Dict[str, Any]]:
+        """Remove and return the checkpoint of a request, if there is one."""
+        raise NotImplementedError
+
+    def delete(self, assistant_request_id: str) -> None:
+        """Remove the checkpoint of a request."""
+        raise NotImplementedError
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "CheckpointStore":
+        # A store is shared by every copy of the workflow using it
+        return self
+
+
+class InMemoryCheckpointStore(CheckpointStore):
+    """Keeps checkpoints in process memory, mostly useful for a single worker and tests."""
+
+    def __init__(self):
+        self._checkpoints: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def save(self, assistant_request_id: str, checkpoint: Dict[str, Any]) -> None:
+        # Stored serialized, so an idle checkpoint holds no live objects
+        with self._lock:
+            self._checkpoints[assistant_request_id] = zlib.compress(
+                json.dumps(checkpoint).encode()
+            )
+
+    def pop(self, assistant_request_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._checkpoints.pop(assistant_request_id, None)
+        return json.loads(zlib.decompress(payload)) if payload is not None else None
+
+    def delete(self, assistant_request_id: str) -> None:
+        with self._lock:
+            self._checkpoints.pop(assistant_request_id, None)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """
+    Keeps checkpoints in a SQLite database, so any worker with access to the file can
+    resume a suspended request, provided the workers also share the event store the
+    history of the request is read from.
+    """
+
+    def __init__(self, db_path: str = "checkpoints.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    assistant_request_id TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL
+                )
+                """
+            )
+
+    def save(self, assistant_request_id: str, checkpoint: Dict[str, Any]) -> None:
+        payload = zlib.compress(json.dumps(checkpoint).encode())
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?)",
+                (assistant_request_id, payload),
+            )
+
+    def pop(self, assistant_request_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT payload FROM checkpoints WHERE assistant_request_id = ?",
+                (assistant_request_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "DELETE FROM checkpoints WHERE assistant_request_id = ?",
+                (assistant_request_id,),
+            )
+        return json.loads(zlib.decompress(row[0]))
+
+    def delete(self, assistant_request_id: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM checkpoints WHERE assistant_request_id = ?",
+                (assistant_request_id,),
+            )
@@ -0,0 +1,203 @@
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import threading
+import weakref
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Optional
+from typing import Tuple
+
+import httpx
+from loguru import logger
+from openai import AsyncOpenAI
+from openai import DefaultAsyncHttpxClient
+from openai import DefaultHttpxClient
+from openai import OpenAI
+
+
+DEFAULT_POOL_SIZE = 100
+DEFAULT_POOL_IDLE_TIMEOUT = 30.0
+
+
+@functools.lru_cache(maxsize=None)
+def http2_available() -> bool:
+    """
+    Whether the `h2` package is installed, checked when the first client is created
+    rather than on import, so modules that never create one do not warn about it.
+    """
+    if importlib.util.find_spec("h2") is None:
+        logger.warning(
+            "`h2` not installed, pooled clients fall back to HTTP/1.1. "
+            "Install using `pip install httpx[http2]` to enable HTTP/2."
+        )
+        return False
+    return True
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of pooled API clients for the LLM tools.
+
+    Clients are keyed by endpoint, credentials and pool settings, so every tool talking to
+    the same endpoint with the same key shares one connection pool, and keep-alive
+    connections are reused across tools, nodes and conversations instead of paying a TLS
+    handshake per request. HTTP/2 is used when the `h2` package is installed.
+
+    Async clients are bound to the event loop they were created on, so they are kept per
+    running loop and dropped together with it.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._clients = {}
+            cls._instance._async_clients = weakref.WeakKeyDictionary()
+        return cls._instance
+
+    @staticmethod
+    def _limits(pool_size: int, pool_idle_timeout: float) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=pool_idle_timeout,
+        )
+
+    @staticmethod
+    def _key(
+        kind: str,
+        endpoint: Optional[str],
+        credentials: Optional[str],
+        pool_size: int,
+        pool_idle_timeout: float,
+    ) -> Tuple[Hashable, ...]:
+        # Only keep a digest of the credentials around
+        credentials_digest = (
+            hashlib.sha256(credentials.encode()).hexdigest() if credentials else None
+        )
+        return (kind, endpoint, credentials_digest, pool_size, pool_idle_timeout)
+
+    def _get_or_create(self, key: Tuple[Hashable, ...], factory) -> Any:
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = factory()
+            return client
+
+    def _a_get_or_create(self, key: Tuple[Hashable, ...], factory) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients: Dict[Tuple[Hashable, ...], Any] = self._async_clients.setdefault(
+                loop, {}
+            )
+            client = clients.get(key)
+            if client is None:
+                client = clients[key] = factory()
+            return client
+
+    def openai_client(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        pool_idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT,
+    ) -> OpenAI:
+        """Return the shared OpenAI client for the endpoint and api key."""
+        key = self._key("openai", base_url, api_key, pool_size, pool_idle_timeout)
+        return self._get_or_create(
+            key,
+            lambda: OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                # Retries are left to the shared rate limiter
+                max_retries=0,
+                http_client=DefaultHttpxClient(
+                    limits=self._limits(pool_size, pool_idle_timeout),
+                    http2=http2_available(),
+                ),
+            ),
+        )
+
+    def async_openai_client(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        pool_idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT,
+    ) -> AsyncOpenAI:
+        """Return the shared async OpenAI client for the endpoint, api key and running loop."""
+        key = self._key("openai", base_url, api_key, pool_size, pool_idle_timeout)
+        return self._a_get_or_create(
+            key,
+            lambda: AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                # Retries are left to the shared rate limiter
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=self._limits(pool_size, pool_idle_timeout),
+                    http2=http2_available(),
+                ),
+            ),
+        )
+
+    def ollama_client(
+        self,
+        api_url: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        pool_idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT,
+    ) -> Any:
+        """Return the shared Ollama client for the api url."""
+        import ollama
+
+        key = self._key("ollama", api_url, None, pool_size, pool_idle_timeout)
+        return self._get_or_create(
+            key,
+            lambda: ollama.Client(
+                api_url,
+                limits=self._limits(pool_size, pool_idle_timeout),
+                http2=http2_available(),
+            ),
+        )
+
+    def async_ollama_client(
+        self,
+        api_url: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        pool_idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT,
+    ) -> Any:
+        """Return the shared async Ollama client for the api url and running loop."""
+        import ollama
+
+        key = self._key("ollama", api_url, None, pool_size, pool_idle_timeout)
+        return self._a_get_or_create(
+            key,
+            lambda: ollama.AsyncClient(
+                api_url,
+                limits=self._limits(pool_size, pool_idle_timeout),
+                http2=http2_available(),
+            ),
+        )
+
+    def close(self) -> None:
+        """Close the pooled sync clients and forget every registered client."""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+            self._async_clients.clear()
+
+    async def a_close(self) -> None:
+        """Close the pooled async clients of the running event loop and forget them."""
+        with self._lock:
+            clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.close()
+
+
+client_registry = ClientRegistry()
@@ -0,0 +1,160 @@
+"""Module for storing events in an append-only SQLite log."""
+
+import json
+import sqlite3
+import threading
+import zlib
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from loguru import logger
+from metrics import current_node
+from metrics import event_store_write_duration
+
+from grafi.common.event_stores.event_store import EventStore
+from grafi.common.events.event import Event
+
+
+class EventStoreSQLite(EventStore):
+    """
+    SQLite-backed implementation of the EventStore interface.
+
+    Events are appended to a single table in WAL mode, with the serialized event stored as
+    a zlib-compressed blob. The conversation_id, assistant_request_id and topic_name
+    columns are indexed, so loading the history of one conversation or request only reads
+    that conversation's rows instead of scanning every event in the store.
+
+    Register it on the container to use it for every assistant:
+
+        container.register_event_store(EventStoreSQLite, EventStoreSQLite("events.db"))
+    """
+
+    def __init__(self, db_path: str = "events.db", compression_level: int = 6):
+        """
+        Initialize the SQLite event store.
+        :param db_path: Path of the SQLite database file, or ':memory:'.
+        :param compression_level: zlib compression level of the stored payloads.
+        """
+        self.db_path = db_path
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_id TEXT NOT NULL UNIQUE,
+                    conversation_id TEXT NOT NULL,
+                    assistant_request_id TEXT NOT NULL,
+                    topic_name TEXT,
+                    event_type TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    payload BLOB NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_events_conversation_id "
+                "ON events (conversation_id)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_events_assistant_request_id "
+                "ON events (assistant_request_id)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_events_topic_name "
+                "ON events (topic_name, conversation_id) WHERE topic_name IS NOT NULL"
+            )
+
+    def _to_row(self, event: Event) -> Tuple[Any, ...]:
+        event_dict = event.to_dict()
+        payload = zlib.compress(
+            json.dumps(event_dict, default=str).encode(), self.compression_level
+        )
+        return (
+            event_dict["event_id"],
+            event.execution_context.conversation_id,
+            event.execution_context.assistant_request_id,
+            event_dict["event_context"].get("topic_name"),
+            event_dict["event_type"],
+            event_dict["timestamp"],
+            payload,
+        )
+
+    def _from_payload(self, payload: bytes) -> Optional[Event]:
+        event_dict: Dict[str, Any] = json.loads(zlib.decompress(payload))
+        return self._create_event_from_dict(event_dict)
+
+    def _query(self, where: str = "", params: Tuple[Any, ...] = ()) -> List[Event]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT payload FROM events {where} ORDER BY id", params
+            ).fetchall()
+        return [self._from_payload(payload) for (payload,) in rows]
+
+    def record_event(self, event: Event) -> None:
+        """Record a single event into the database."""
+        self.record_events([event])
+
+    def record_events(self, events: List[Event]) -> None:
+        """Record multiple events into the database in one transaction."""
+        with event_store_write_duration.time(node=current_node()):
+            rows = [self._to_row(event) for event in events]
+            try:
+                with self._lock, self._connection:
+                    self._connection.executemany(
+                        "INSERT INTO events (event_id, conversation_id, "
+                        "assistant_request_id, topic_name, event_type, timestamp, "
+                        "payload) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            except Exception as e:
+                logger.error(f"Failed to record events: {e}")
+                raise e
+
+    def clear_events(self) -> None:
+        """Clear all events."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM events")
+
+    def get_events(self) -> List[Event]:
+        """Get all events."""
+        return self._query()
+
+    def get_event(self, event_id: str) -> Optional[Event]:
+        """Get an event by ID."""
+        events = self._query("WHERE event_id = ?", (event_id,))
+        return events[0] if events else None
+
+    def get_agent_events(self, assistant_request_id: str) -> List[Event]:
+        """Get all events for a given agent request ID."""
+        return self._query("WHERE assistant_request_id = ?", (assistant_request_id,))
+
+    def get_conversation_events(self, conversation_id: str) -> List[Event]:
+        """Get all events for a given conversation ID."""
+        return self._query("WHERE conversation_id = ?", (conversation_id,))
+
+    def get_topic_events(
+        self, topic_name: str, conversation_id: Optional[str] = None
+    ) -> List[Event]:
+        """Get all events of a topic, optionally limited to one conversation."""
+        if conversation_id is None:
+            return self._query("WHERE topic_name = ?", (topic_name,))
+        return self._query(
+            "WHERE topic_name = ? AND conversation_id = ?",
+            (topic_name, conversation_id),
+        )
+
+    def delete_conversation_events(self, conversation_id: str) -> None:
+        """Delete every event of a finished conversation."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM events WHERE conversation_id = ?", (conversation_id,)
+            )
@@ -0,0 +1,148 @@
+import hashlib
+import json
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import NoReturn
+from typing import Optional
+
+from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
+from pydantic import PrivateAttr
+
+from grafi.common.decorators.llm_function import llm_function
+from grafi.common.models.function_spec import FunctionSpec
+
+
+def serialize_tool(tool: Dict[str, Any]) -> bytes:
+    """Serialize a tool to canonical JSON, the same bytes in any process."""
+    return json.dumps(
+        tool, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode()
+
+
+def _read_only(self: Any, *args: Any, **kwargs: Any) -> NoReturn:
+    raise TypeError(f"{type(self).__name__} is read-only")
+
+
+class FrozenDict(dict):
+    """
+    A dict that cannot be changed, so it can be shared. It is equal to and serializes
+    like a dict, copy and deepcopy return it as is, and it is pickled as a dict.
+    """
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self) -> "FrozenDict":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FrozenDict":
+        return self
+
+    def __reduce__(self) -> Any:
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    """A list that cannot be changed, like FrozenDict."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+
+    def __copy__(self) -> "FrozenList":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FrozenList":
+        return self
+
+    def __reduce__(self) -> Any:
+        return list, (list(self),)
+
+
+class FrozenTool(FrozenDict):
+    """The OpenAI tool of a compiled spec, along with its JSON serialization."""
+
+    def __init__(self, tool: Dict[str, Any], tool_json: bytes):
+        super().__init__(tool)
+        self.tool_json = tool_json
+
+
+def freeze(value: Any) -> Any:
+    """Make a JSON value read-only, freezing its dicts and lists."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+class CompiledFunctionSpec(FunctionSpec):
+    """
+    A FunctionSpec with its OpenAI tool generated once, along with the JSON
+    serialization of the tool and its hash.
+
+    to_openai_tool() returns the same read-only tool for every request instead of
+    building a new one. Its keys are sorted, so it always serializes to the same bytes
+    and the tools keep a stable prefix for provider-side prompt caching. A compiled
+    spec must not be changed, and copying it returns the spec itself.
+    """
+
+    _tool: Optional[FrozenTool] = PrivateAttr(default=None)
+    _tool_hash: str = PrivateAttr(default="")
+
+    @classmethod
+    def compile(cls, spec: FunctionSpec) -> "CompiledFunctionSpec":
+        """Compile a spec, returning it as is if it already is."""
+        if isinstance(spec, cls):
+            return spec
+        compiled = cls(**spec.model_dump())
+        tool_json = serialize_tool(spec.to_openai_tool())
+        compiled._tool = FrozenTool(freeze(json.loads(tool_json)), tool_json)
+        compiled._tool_hash = hashlib.sha256(tool_json).hexdigest()
+        return compiled
+
+    @property
+    def tool_json(self) -> bytes:
+        """The tool serialized to canonical JSON."""
+        return self._tool.tool_json
+
+    @property
+    def tool_hash(self) -> str:
+        """SHA-256 of the serialized tool."""
+        return self._tool_hash
+
+    def to_openai_tool(self) -> ChatCompletionToolParam:
+        # Skips the lookup of private attributes by pydantic, slow next to the rest
+        return self.__pydantic_private__["_tool"]
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "CompiledFunctionSpec":
+        # A spec is shared by every instance of its tool, like the class default it is
+        return self
+
+
+def compiled_llm_function(func: Callable) -> Callable:
+    """
+    Expose a method to the LLM like `llm_function`, with its spec compiled when the
+    class is defined rather than its tool built on every request.
+    """
+    wrapper = llm_function(func)
+    wrapper._function_spec = CompiledFunctionSpec.compile(wrapper._function_spec)
+    return wrapper
+
+
+def tools_json(tools: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    Serialize the tools of a request to a JSON array, reusing the serialization of the
+    compiled ones.
+    """
+    serialized = [
+        tool.tool_json if isinstance(tool, FrozenTool) else serialize_tool(tool)
+        for tool in tools
+    ]
+    return b"[" + b",".join(serialized) + b"]"
+
+
+def tools_hash(tools: Iterable[Dict[str, Any]]) -> str:
+    """SHA-256 of the serialized tools of a request, stable across processes."""
+    return hashlib.sha256(tools_json(tools)).hexdigest()
@@ -1,8 +1,11 @@
 import json
 import uuid
 
+from checkpoint_store import InMemoryCheckpointStore
+from function_schema import compiled_llm_function
 from kyc_assistant import KycAssistant
-from grafi.common.decorators.llm_function import llm_function
+from kyc_validator import validate_client_info
+from response_cache import InMemoryResponseCache
 from grafi.common.models.execution_context import ExecutionContext
 from grafi.common.models.message import Message
 from grafi.tools.functions.function_tool import FunctionTool
@@ -10,7 +13,7 @@ from grafi.tools.functions.function_tool import FunctionTool
 
 class ClientInfo(FunctionTool):
 
-    @llm_function
+    @compiled_llm_function
     def request_client_information(self, question_description: str):
         """
         Requests client input for personal information based on a given question description.
@@ -20,7 +23,7 @@ class ClientInfo(FunctionTool):
 
 class RegisterClient(FunctionTool):
 
-    @llm_function
+    @compiled_llm_function
     def register_client(self, name: str, email: str):
         """
         Registers a user based on their name and email.
@@ -73,6 +76,13 @@ def test_kyc_assistant():
         )
         .hitl_request(ClientInfo(name="request_human_information"))
         .register_request(RegisterClient(name="register_client"))
+        .response_cache(InMemoryResponseCache(max_size=1024, ttl=3600))
+        # Single worker, in-memory checkpoints. Resuming requests on other workers needs
+        # a SQLiteCheckpointStore and an event store shared by the workers
+        .checkpoint_store(InMemoryCheckpointStore())
+        .function_timeout(30)
+        .function_max_concurrency(16)
+        .user_info_pre_check(validate_client_info)
         .build()
     )
 
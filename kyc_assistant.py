@@ -1,24 +1,73 @@
 import os
+from concurrent.futures import Executor
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
 
+from async_function_calling_command import AsyncFunctionCallingCommand
+from base_assistant import BaseAssistant
+from cached_llm_response_command import CachedLLMResponseCommand
+from checkpoint_store import CheckpointStore
+from client_registry import DEFAULT_POOL_IDLE_TIMEOUT
+from client_registry import DEFAULT_POOL_SIZE
+from managed_llm_node import ManagedLLMNode
 from openinference.semconv.trace import OpenInferenceSpanKindValues
+from parallel_event_driven_workflow import ParallelEventDrivenWorkflow
+from parallel_function_call_node import ParallelFunctionCallNode
+from pooled_openai_tool import PooledOpenAITool
 from pydantic import Field
+from response_cache import InMemoryResponseCache
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache
+from topic_condition import no_tool_calls
+from topic_condition import tool_call_name_in
+from topic_condition import tool_call_name_not_in
+from workflow_template import WorkflowTemplate
 
-from grafi.assistants.assistant import Assistant
+from grafi.common.models.message import Message
 from grafi.common.topics.human_request_topic import human_request_topic
 from grafi.common.topics.output_topic import agent_output_topic
 from grafi.common.topics.subscription_builder import SubscriptionBuilder
 from grafi.common.topics.topic import Topic
 from grafi.common.topics.topic import agent_input_topic
-from grafi.nodes.impl.llm_function_call_node import LLMFunctionCallNode
-from grafi.nodes.impl.llm_node import LLMNode
-from grafi.tools.functions.function_calling_command import FunctionCallingCommand
 from grafi.tools.functions.function_tool import FunctionTool
-from grafi.tools.llms.impl.openai_tool import OpenAITool
 from grafi.tools.llms.llm_response_command import LLMResponseCommand
-from grafi.workflows.impl.event_driven_workflow import EventDrivenWorkflow
 
 
-class KycAssistant(Assistant):
+# Settings of the LLMs that an instance of a template can change
+LLM_FIELDS = (
+    "api_key",
+    "model",
+    "pool_size",
+    "pool_idle_timeout",
+    "requests_per_minute",
+    "tokens_per_minute",
+)
+LLM_SYSTEM_MESSAGE_FIELDS = {
+    "HistorySummaryLLM": None,
+    "ThoughtLLM": "user_info_extract_system_message",
+    "ActionLLM": "action_llm_system_message",
+    "ResponseToUserLLM": "summary_llm_system_message",
+}
+
+
+def _requests_client_info(input_data: List[Message]) -> bool:
+    """
+    Whether the validator found the client info incomplete, in which case the action
+    asks for it, rather than registering a client from the details of the input.
+    """
+    last_message = input_data[-1] if input_data else None
+    return (
+        last_message is not None
+        and last_message.role == "assistant"
+        and isinstance(last_message.content, str)
+        and last_message.content.startswith("Invalid")
+    )
+
+
+class KycAssistant(BaseAssistant):
     oi_span_type: OpenInferenceSpanKindValues = Field(
         default=OpenInferenceSpanKindValues.AGENT
     )
@@ -26,13 +75,29 @@ class KycAssistant(Assistant):
     type: str = Field(default="KycAssistant")
     api_key: str = Field(default_factory=lambda: os.getenv("OPENAI_API_KEY"))
     model: str = Field(default="gpt-4o-mini")
+    pool_size: int = Field(default=DEFAULT_POOL_SIZE)
+    pool_idle_timeout: float = Field(default=DEFAULT_POOL_IDLE_TIMEOUT)
+    requests_per_minute: Optional[float] = Field(default=None)
+    tokens_per_minute: Optional[float] = Field(default=None)
     user_info_extract_system_message: str = Field(default=None)
     action_llm_system_message: str = Field(default=None)
     summary_llm_system_message: str = Field(default=None)
     hitl_request: FunctionTool = Field(default=None)
     register_request: FunctionTool = Field(default=None)
+    response_cache: Optional[ResponseCache] = Field(default=None)
+    semantic_cache: Optional[SemanticCache] = Field(default=None)
+    checkpoint_store: Optional[CheckpointStore] = Field(default=None)
+    max_prompt_tokens: Optional[int] = Field(default=None)
+    speculative_action: bool = Field(default=False)
+    function_executor: Optional[Executor] = Field(default=None)
+    function_timeout: Optional[float] = Field(default=None)
+    function_max_concurrency: Optional[int] = Field(default=None)
+    user_info_pre_check: Optional[Callable[[List[Message]], Optional[str]]] = Field(
+        default=None
+    )
+    workflow_template: Optional[WorkflowTemplate] = Field(default=None)
 
-    class Builder(Assistant.Builder):
+    class Builder(BaseAssistant.Builder):
         """Concrete builder for KycAssistant."""
 
         def __init__(self):
@@ -49,6 +114,26 @@ class KycAssistant(Assistant):
             self._assistant.model = model
             return self
 
+        def pool_size(self, pool_size: int) -> "KycAssistant.Builder":
+            self._assistant.pool_size = pool_size
+            return self
+
+        def pool_idle_timeout(
+            self, pool_idle_timeout: float
+        ) -> "KycAssistant.Builder":
+            self._assistant.pool_idle_timeout = pool_idle_timeout
+            return self
+
+        def requests_per_minute(
+            self, requests_per_minute: float
+        ) -> "KycAssistant.Builder":
+            self._assistant.requests_per_minute = requests_per_minute
+            return self
+
+        def tokens_per_minute(self, tokens_per_minute: float) -> "KycAssistant.Builder":
+            self._assistant.tokens_per_minute = tokens_per_minute
+            return self
+
         def user_info_extract_system_message(
             self, user_info_extract_system_message: str
         ) -> "KycAssistant.Builder":
@@ -79,17 +164,125 @@ class KycAssistant(Assistant):
             self._assistant.register_request = register_request
             return self
 
+        def response_cache(
+            self, response_cache: ResponseCache
+        ) -> "KycAssistant.Builder":
+            self._assistant.response_cache = response_cache
+            return self
+
+        def semantic_cache(
+            self, semantic_cache: SemanticCache
+        ) -> "KycAssistant.Builder":
+            self._assistant.semantic_cache = semantic_cache
+            return self
+
+        def checkpoint_store(
+            self, checkpoint_store: CheckpointStore
+        ) -> "KycAssistant.Builder":
+            self._assistant.checkpoint_store = checkpoint_store
+            return self
+
+        def max_prompt_tokens(self, max_prompt_tokens: int) -> "KycAssistant.Builder":
+            self._assistant.max_prompt_tokens = max_prompt_tokens
+            return self
+
+        def speculative_action(
+            self, speculative_action: bool
+        ) -> "KycAssistant.Builder":
+            self._assistant.speculative_action = speculative_action
+            return self
+
+        def function_executor(
+            self, function_executor: Executor
+        ) -> "KycAssistant.Builder":
+            self._assistant.function_executor = function_executor
+            return self
+
+        def function_timeout(self, function_timeout: float) -> "KycAssistant.Builder":
+            self._assistant.function_timeout = function_timeout
+            return self
+
+        def function_max_concurrency(
+            self, function_max_concurrency: int
+        ) -> "KycAssistant.Builder":
+            self._assistant.function_max_concurrency = function_max_concurrency
+            return self
+
+        def user_info_pre_check(
+            self, user_info_pre_check: Callable[[List[Message]], Optional[str]]
+        ) -> "KycAssistant.Builder":
+            self._assistant.user_info_pre_check = user_info_pre_check
+            return self
+
+        def workflow_template(
+            self, workflow_template: WorkflowTemplate
+        ) -> "KycAssistant.Builder":
+            """
+            Stamp the workflow out of a template rather than building it. Only the LLM
+            settings set on this builder apply, the rest comes from the template.
+            """
+            self._assistant.workflow_template = workflow_template
+            return self
+
+        def build_template(self) -> WorkflowTemplate:
+            """Build the workflow once, as a template for many assistants."""
+            return WorkflowTemplate(self._assistant._construct_workflow().workflow)
+
         def build(self) -> "KycAssistant":
-            self._assistant._construct_workflow()
+            if self._assistant.workflow_template is not None:
+                self._assistant.workflow = (
+                    self._assistant.workflow_template.instantiate(
+                        self._assistant._llm_params()
+                    )
+                )
+            else:
+                self._assistant._construct_workflow()
             return self._assistant
 
+    def _llm_params(self) -> Dict[str, Dict[str, Any]]:
+        """The LLM settings set on the assistant, by tool name."""
+        params = {
+            field: getattr(self, field)
+            for field in LLM_FIELDS
+            if field in self.model_fields_set
+        }
+        llm_params = {}
+        for tool_name, system_message_field in LLM_SYSTEM_MESSAGE_FIELDS.items():
+            tool_params = dict(params)
+            if system_message_field in self.model_fields_set:
+                tool_params["system_message"] = getattr(self, system_message_field)
+            if tool_params:
+                llm_params[tool_name] = tool_params
+        return llm_params
+
     def _construct_workflow(self) -> "KycAssistant":
+        # The LLMs below share the rate limiter of the api key and model, so the limits
+        # hold for the assistant as a whole
+
+        # Past max_prompt_tokens, the history sent by the LLM nodes is summarized
+        history_summarizer = (
+            PooledOpenAITool.Builder()
+            .name("HistorySummaryLLM")
+            .api_key(self.api_key)
+            .model(self.model)
+            .pool_size(self.pool_size)
+            .pool_idle_timeout(self.pool_idle_timeout)
+            .requests_per_minute(self.requests_per_minute)
+            .tokens_per_minute(self.tokens_per_minute)
+            .chat_params({"temperature": 0})
+            .system_message("You summarize conversations between a user and an agent.")
+            .build()
+        )
+        # Shared by the nodes of this workflow, but not with the response cache, where
+        # responses would evict the summaries
+        summary_cache = InMemoryResponseCache()
+
         # Create thought node to process user input
 
         user_info_extract_topic = Topic(name="user_info_extract_topic")
 
         user_info_extract_node = (
-            LLMNode.Builder()
+            ManagedLLMNode.Builder()
             .name("ThoughtNode")
             .subscribe(
                 SubscriptionBuilder()
@@ -99,17 +292,31 @@ class KycAssistant(Assistant):
                 .build()
             )
             .command(
-                LLMResponseCommand.Builder()
+                # The validator is deterministic, so repeated inputs can be served from cache
+                CachedLLMResponseCommand.Builder()
                 .llm(
-                    OpenAITool.Builder()
+                    PooledOpenAITool.Builder()
                     .name("ThoughtLLM")
                     .api_key(self.api_key)
                     .model(self.model)
+                    .pool_size(self.pool_size)
+                    .pool_idle_timeout(self.pool_idle_timeout)
+                    .requests_per_minute(self.requests_per_minute)
+                    .tokens_per_minute(self.tokens_per_minute)
+                    .chat_params({"temperature": 0})
                     .system_message(self.user_info_extract_system_message)
                     .build()
                 )
+                .response_cache(self.response_cache)
                 .build()
             )
+            .max_prompt_tokens(self.max_prompt_tokens)
+            .summarizer(history_summarizer)
+            .summary_cache(summary_cache)
+            # Start the action node on a valid input while the validator is running
+            .speculative_output("Valid" if self.speculative_action else None)
+            # Inputs the rules can decide on are validated without calling the LLM
+            .pre_check(self.user_info_pre_check)
             .publish_to(user_info_extract_topic)
             .build()
         )
@@ -118,44 +325,61 @@ class KycAssistant(Assistant):
 
         hitl_call_topic = Topic(
             name="hitl_call_topic",
-            condition=lambda msgs: msgs[-1].tool_calls[0].function.name
-            != "register_client",
+            condition=tool_call_name_not_in("register_client"),
         )
 
         register_user_topic = Topic(
             name="register_user_topic",
-            condition=lambda msgs: msgs[-1].tool_calls[0].function.name
-            == "register_client",
+            condition=tool_call_name_in("register_client"),
         )
 
+        # Replies without a tool call would match neither topic above, and the request
+        # would end without an output
+        action_reply_topic = Topic(name="action_reply_topic", condition=no_tool_calls)
+
         action_node = (
-            LLMNode.Builder()
+            ManagedLLMNode.Builder()
             .name("ActionNode")
             .subscribe(user_info_extract_topic)
             .command(
-                LLMResponseCommand.Builder()
+                # Requests for the missing client info are near-duplicates, mostly
+                # greetings, so they can be served from the semantic cache
+                CachedLLMResponseCommand.Builder()
                 .llm(
-                    OpenAITool.Builder()
+                    PooledOpenAITool.Builder()
                     .name("ActionLLM")
                     .api_key(self.api_key)
                     .model(self.model)
+                    .pool_size(self.pool_size)
+                    .pool_idle_timeout(self.pool_idle_timeout)
+                    .requests_per_minute(self.requests_per_minute)
+                    .tokens_per_minute(self.tokens_per_minute)
                     .system_message(self.action_llm_system_message)
                     .build()
                 )
+                .semantic_cache(self.semantic_cache)
+                .semantic_cache_condition(_requests_client_info)
                 .build()
             )
+            .max_prompt_tokens(self.max_prompt_tokens)
+            .summarizer(history_summarizer)
+            .summary_cache(summary_cache)
             .publish_to(hitl_call_topic)
             .publish_to(register_user_topic)
+            .publish_to(action_reply_topic)
             .build()
         )
 
         human_request_function_call_node = (
-            LLMFunctionCallNode.Builder()
+            ParallelFunctionCallNode.Builder()
             .name("HumanRequestNode")
             .subscribe(hitl_call_topic)
             .command(
-                FunctionCallingCommand.Builder()
+                AsyncFunctionCallingCommand.Builder()
                 .function_tool(self.hitl_request)
+                .executor(self.function_executor)
+                .timeout(self.function_timeout)
+                .max_concurrency(self.function_max_concurrency)
                 .build()
             )
             .publish_to(human_request_topic)
@@ -166,12 +390,15 @@ class KycAssistant(Assistant):
 
         # Create an output LLM node
         register_user_node = (
-            LLMFunctionCallNode.Builder()
+            ParallelFunctionCallNode.Builder()
             .name("FunctionCallRegisterNode")
             .subscribe(register_user_topic)
             .command(
-                FunctionCallingCommand.Builder()
+                AsyncFunctionCallingCommand.Builder()
                 .function_tool(self.register_request)
+                .executor(self.function_executor)
+                .timeout(self.function_timeout)
+                .max_concurrency(self.function_max_concurrency)
                 .build()
             )
             .publish_to(register_user_respond_topic)
@@ -179,36 +406,48 @@ class KycAssistant(Assistant):
         )
 
         user_reply_node = (
-            LLMNode.Builder()
+            ManagedLLMNode.Builder()
             .name("LLMResponseToUserNode")
             .subscribe(
-                SubscriptionBuilder().subscribed_to(register_user_respond_topic).build()
+                SubscriptionBuilder()
+                .subscribed_to(register_user_respond_topic)
+                .or_()
+                .subscribed_to(action_reply_topic)
+                .build()
             )
             .command(
                 LLMResponseCommand.Builder()
                 .llm(
-                    OpenAITool.Builder()
+                    PooledOpenAITool.Builder()
                     .name("ResponseToUserLLM")
                     .api_key(self.api_key)
                     .model(self.model)
+                    .pool_size(self.pool_size)
+                    .pool_idle_timeout(self.pool_idle_timeout)
+                    .requests_per_minute(self.requests_per_minute)
+                    .tokens_per_minute(self.tokens_per_minute)
                     .system_message(self.summary_llm_system_message)
                     .build()
                 )
                 .build()
             )
+            .max_prompt_tokens(self.max_prompt_tokens)
+            .summarizer(history_summarizer)
+            .summary_cache(summary_cache)
             .publish_to(agent_output_topic)
             .build()
         )
 
-        # Create a workflow and add the nodes
+        # Create a workflow and add the nodes, independent branches run concurrently
         self.workflow = (
-            EventDrivenWorkflow.Builder()
+            ParallelEventDrivenWorkflow.Builder()
             .name("simple_function_call_workflow")
             .node(user_info_extract_node)
             .node(action_node)
             .node(human_request_function_call_node)
             .node(register_user_node)
             .node(user_reply_node)
+            .checkpoint_store(self.checkpoint_store)
             .build()
         )
 
@@ -2,9 +2,11 @@ import json
 import os
 import uuid
 
+from function_schema import compiled_llm_function
 from kyc_assistant import KycAssistant
+from response_cache import InMemoryResponseCache
+from semantic_cache import SemanticCache
 
-from grafi.common.decorators.llm_function import llm_function
 from grafi.common.models.execution_context import ExecutionContext
 from grafi.common.models.message import Message
 from grafi.tools.functions.function_tool import FunctionTool
@@ -14,7 +16,7 @@ api_key = os.getenv("OPENAI_API_KEY")
 
 
 class ClientInfo(FunctionTool):
-    @llm_function
+    @compiled_llm_function
     def request_client_information(self, question_description: str):
         """
         Requests client input for personal information based on a given question description.
@@ -36,7 +38,7 @@ class ClientInfo(FunctionTool):
 
 
 class RegisterClient(FunctionTool):
-    @llm_function
+    @compiled_llm_function
     def register_client(self, name: str, email: str):
         """
         Requests human input for personal information based on a given question description.
@@ -95,6 +97,8 @@ def test_kyc_assistant():
         .summary_llm_system_message("Response to user with result of registering.")
         .hitl_request(ClientInfo(name="request_human_information"))
         .register_request(RegisterClient(name="register_client"))
+        .response_cache(InMemoryResponseCache(max_size=1024, ttl=3600))
+        .semantic_cache(SemanticCache(max_size=1024, ttl=3600))
         .build()
     )
 
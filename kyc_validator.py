@@ -0,0 +1,112 @@
+import re
+from typing import List
+from typing import Optional
+
+from grafi.common.models.message import Message
+
+
+EMAIL_PATTERN = re.compile(
+    r"(?<![\w.%+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b"
+)
+# Separates the parts of an input, a name is looked for within one of them
+SEGMENT_SEPARATOR = re.compile(r"[,;:()<>\[\]\n]+|(?<=\w)[.!?](?=\s|$)")
+# Two letters at least, or a single one before an apostrophe or hyphen, as in O'Brien
+NAME_WORD = re.compile(r"(?:[^\W\d_]{2,}|[^\W\d_](?=['’-]))(?:['’-][^\W\d_]+)*")
+# Introduce the name that follows them
+NAME_CUE = re.compile(
+    r"\b(?:my name is|name is|name\s*:|this is|i am|i['’]m)\s*", re.IGNORECASE
+)
+PLACEHOLDER_NAMES = frozenset({"john doe", "jane doe"})
+# Capitalized in greetings and requests, or at the start of a sentence, more often
+# than in a name
+COMMON_WORDS = frozenset(
+    """
+    a about account afternoon am an and are as at be can client could day dear email
+    evening for from good gym hello help here hey hi how in is it join like mail me
+    member membership morning my name new no not of on or please register
+    registration sign so thank thanks that the there this to up us want we with would
+    yes you your
+    """.split()
+)
+
+
+def is_name_word(word: str) -> bool:
+    """
+    Whether a word can be part of a name: capitalized letters only, possibly joined by
+    an apostrophe or a hyphen, in any alphabet, and not a common word.
+    """
+    return (
+        NAME_WORD.fullmatch(word) is not None
+        and word[0].isupper()
+        and word.lower() not in COMMON_WORDS
+    )
+
+
+def find_full_name(text: str) -> Optional[str]:
+    """Return the first run of two or more name words of the text, or None."""
+    for segment in SEGMENT_SEPARATOR.split(EMAIL_PATTERN.sub(",", text)):
+        run: List[str] = []
+        for word in segment.split() + [""]:
+            if is_name_word(word):
+                run.append(word)
+                continue
+            if len(run) >= 2:
+                return " ".join(run)
+            run = []
+    return None
+
+
+def find_cued_name(text: str) -> Optional[str]:
+    """
+    Return a full name the text marks as one, or None: the name words right after a
+    cue like "my name is" or "I am", or the part of the text right before an email
+    when it is made of name words only.
+    """
+    for cue in NAME_CUE.finditer(text):
+        segment = SEGMENT_SEPARATOR.split(text[cue.end() :], maxsplit=1)[0]
+        run: List[str] = []
+        for word in segment.split():
+            if not is_name_word(word):
+                break
+            run.append(word)
+        if len(run) >= 2:
+            return " ".join(run)
+
+    for email in EMAIL_PATTERN.finditer(text):
+        segments = SEGMENT_SEPARATOR.split(text[: email.start()])
+        words = next((s.split() for s in reversed(segments) if s.strip()), [])
+        if len(words) >= 2 and all(is_name_word(word) for word in words):
+            return " ".join(words)
+    return None
+
+
+def validate_client_info(input_data: List[Message]) -> Optional[str]:
+    """
+    Validate the full name and email of the user messages with deterministic rules,
+    answering like the KYC validator LLM when the answer is certain.
+
+    Returns "Valid" when the input has a valid email and a full name marked as one, by
+    a cue or by sitting right before the email, and the reasons it is invalid when it
+    has no email at all. Returns None for the inputs the rules cannot decide on, like a
+    malformed email, a placeholder, lowercase or uncued name, or an email on its own,
+    which are left to the LLM, as a false "Valid" lets bad data through.
+    """
+    text = "\n".join(
+        message.content
+        for message in input_data
+        if message.role == "user" and isinstance(message.content, str)
+    )
+
+    if "@" not in text:
+        if find_full_name(text) is None:
+            return "Invalid - Full name and email are missing"
+        return "Invalid - Email is missing"
+
+    full_name = find_cued_name(text)
+    if (
+        EMAIL_PATTERN.search(text)
+        and full_name is not None
+        and full_name.lower() not in PLACEHOLDER_NAMES
+    ):
+        return "Valid"
+    return None
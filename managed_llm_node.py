@@ -0,0 +1,466 @@
+import asyncio
+import contextvars
+import math
+from concurrent.futures import Executor
+from typing import Any
+from typing import AsyncGenerator
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from loguru import logger
+from metrics import pre_check_results
+from metrics import speculative_executions
+from pydantic import Field
+from pydantic import PrivateAttr
+from response_cache import InMemoryResponseCache
+from response_cache import ResponseCache
+from response_cache import response_cache_key
+
+from grafi.common.decorators.record_node_a_execution import record_node_a_execution
+from grafi.common.decorators.record_node_execution import record_node_execution
+from grafi.common.events.topic_events.consume_from_topic_event import (
+    ConsumeFromTopicEvent,
+)
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.nodes.impl.llm_node import LLMNode
+from grafi.tools.llms.llm import LLM
+
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def estimate_tokens(message: Message) -> int:
+    """
+    Estimate the prompt tokens of a message at about four characters per token, plus
+    the per-message overhead of the chat format.
+    """
+    chars = len(str(message.content or ""))
+    for tool_call in message.tool_calls or []:
+        chars += len(tool_call.function.name) + len(tool_call.function.arguments)
+    return 4 + math.ceil(chars / 4)
+
+
+class ManagedLLMNode(LLMNode):
+    """
+    An LLMNode that keeps its prompt within a token budget.
+
+    The node input is rebuilt from the whole request history on every run, so the
+    prompt of a node fed by a long conversation, like a validator resubscribed to the
+    human request topic, grows with every turn. Past `max_prompt_tokens`, only the most
+    recent messages that fit the budget are sent. The older ones are dropped, or folded
+    into a summary by the `summarizer` LLM when one is set.
+
+    The summary is cached per conversation and node, and records the last message it
+    covers. The next turns reuse it, and only summarize the messages that left the
+    budget since, together with the previous summary.
+
+    A node with a `speculative_output` lets the nodes it feeds start before it answers:
+    while it runs, the workflow starts the managed LLM nodes subscribed to its topics on
+    the input they would get if it answered the predicted content, like "Valid" for a
+    validator. They run on the executor of the workflow, or as tasks of its event loop.
+    A speculative response is only used by the node if its actual input turns out to be
+    the same, otherwise it is discarded and the model is called again.
+
+    A `pre_check` answers for the model when it can: it is given the node input, and
+    the content it returns is published as the node response without calling the
+    model. Returning None, when the check is not confident, leaves the input to the
+    model. Deterministic checks, like the rules of a validator, answer most inputs in
+    microseconds instead of a model call.
+
+    Attributes:
+        max_prompt_tokens (Optional[int]): Prompt token budget, including the system
+            message of the command LLM. The history is never compacted if not set.
+        min_recent_messages (int): Number of last messages always sent as they are,
+            even over the budget.
+        summarizer (Optional[LLM]): LLM summarizing the dropped messages, they are
+            truncated if not set.
+        summary_max_tokens (int): Part of the budget reserved for the summary.
+        summary_cache (ResponseCache): Where the summaries are cached, by node and
+            conversation. Nodes can share it, but it should not be a response cache,
+            where responses would evict the summaries.
+        token_counter (Callable[[Message], int]): Counts the prompt tokens of a message,
+            `estimate_tokens` by default. Plug a tokenizer in for exact budgets.
+        speculative_output (Optional[str]): Predicted content of the node response, the
+            nodes it feeds are not started speculatively if not set.
+        pre_check (Optional[Callable[[List[Message]], Optional[str]]]): Answers in
+            place of the model, or returns None to leave the input to it.
+    """
+
+    name: str = "ManagedLLMNode"
+    type: str = "ManagedLLMNode"
+    max_prompt_tokens: Optional[int] = Field(default=None)
+    min_recent_messages: int = Field(default=2)
+    summarizer: Optional[LLM] = Field(default=None)
+    summary_max_tokens: int = Field(default=256)
+    summary_cache: ResponseCache = Field(default_factory=InMemoryResponseCache)
+    token_counter: Callable[[Message], int] = Field(default=estimate_tokens)
+    speculative_output: Optional[str] = Field(default=None)
+    pre_check: Optional[Callable[[List[Message]], Optional[str]]] = Field(default=None)
+
+    # Key of the input of the speculative execution, and its pending result
+    _speculation: Optional[Tuple[str, Any]] = PrivateAttr(default=None)
+
+    class Builder(LLMNode.Builder):
+        """Concrete builder for ManagedLLMNode."""
+
+        def _init_node(self) -> "ManagedLLMNode":
+            return ManagedLLMNode()
+
+        def max_prompt_tokens(
+            self, max_prompt_tokens: int
+        ) -> "ManagedLLMNode.Builder":
+            self._node.max_prompt_tokens = max_prompt_tokens
+            return self
+
+        def min_recent_messages(
+            self, min_recent_messages: int
+        ) -> "ManagedLLMNode.Builder":
+            self._node.min_recent_messages = min_recent_messages
+            return self
+
+        def summarizer(self, summarizer: LLM) -> "ManagedLLMNode.Builder":
+            self._node.summarizer = summarizer
+            return self
+
+        def summary_max_tokens(
+            self, summary_max_tokens: int
+        ) -> "ManagedLLMNode.Builder":
+            self._node.summary_max_tokens = summary_max_tokens
+            return self
+
+        def summary_cache(
+            self, summary_cache: ResponseCache
+        ) -> "ManagedLLMNode.Builder":
+            self._node.summary_cache = summary_cache
+            return self
+
+        def token_counter(
+            self, token_counter: Callable[[Message], int]
+        ) -> "ManagedLLMNode.Builder":
+            self._node.token_counter = token_counter
+            return self
+
+        def speculative_output(
+            self, speculative_output: str
+        ) -> "ManagedLLMNode.Builder":
+            self._node.speculative_output = speculative_output
+            return self
+
+        def pre_check(
+            self, pre_check: Optional[Callable[[List[Message]], Optional[str]]]
+        ) -> "ManagedLLMNode.Builder":
+            self._node.pre_check = pre_check
+            return self
+
+    @record_node_execution
+    def execute(
+        self,
+        execution_context: ExecutionContext,
+        node_input: List[ConsumeFromTopicEvent],
+    ) -> List[Message]:
+        logger.debug(f"Executing ManagedLLMNode with inputs: {node_input}")
+
+        messages = self.get_command_input(execution_context, node_input)
+        answer = self._run_pre_check(messages)
+        if answer is not None:
+            return [answer]
+
+        input_data = self._compact(execution_context, messages)
+        speculation = self._take_speculation(execution_context, input_data)
+        # Rather than wait for a speculation still queued, the command is run here
+        if speculation is not None and speculation.cancel():
+            speculative_executions.inc(node=self.name, result="discarded")
+        elif speculation is not None:
+            speculative_executions.inc(node=self.name, result="used")
+            try:
+                return speculation.result()
+            except Exception as e:
+                logger.warning(f"[{self.name}] Speculative execution failed: {e}")
+
+        return [self.command.execute(execution_context, input_data)]
+
+    @record_node_a_execution
+    async def a_execute(
+        self,
+        execution_context: ExecutionContext,
+        node_input: List[ConsumeFromTopicEvent],
+    ) -> AsyncGenerator[Message, None]:
+        logger.debug(f"Executing ManagedLLMNode with inputs: {node_input}")
+
+        messages = self.get_command_input(execution_context, node_input)
+        answer = self._run_pre_check(messages)
+        if answer is not None:
+            yield answer
+            return
+
+        input_data = await self._a_compact(execution_context, messages)
+        speculation = self._take_speculation(execution_context, input_data)
+        if speculation is not None:
+            speculative_executions.inc(node=self.name, result="used")
+            try:
+                for message in await speculation:
+                    yield message
+                return
+            except Exception as e:
+                logger.warning(f"[{self.name}] Speculative execution failed: {e}")
+
+        async for message in self.command.a_execute(execution_context, input_data):
+            yield message
+
+    def speculate(
+        self,
+        execution_context: ExecutionContext,
+        upstream_input: List[Message],
+        predicted: Message,
+        executor: Executor,
+    ) -> None:
+        """
+        Submit the command to the executor, on the input the node would get if the
+        upstream node given `upstream_input` answered `predicted`.
+        """
+        input_data = self._speculative_input(
+            execution_context, upstream_input, predicted
+        )
+        self.discard_speculation()
+        if input_data is None:
+            return
+
+        def run() -> List[Message]:
+            return [self.command.execute(execution_context, input_data)]
+
+        self._speculation = (
+            self._speculation_key(execution_context, input_data),
+            executor.submit(contextvars.copy_context().run, run),
+        )
+
+    def a_speculate(
+        self,
+        execution_context: ExecutionContext,
+        upstream_input: List[Message],
+        predicted: Message,
+    ) -> None:
+        """Async version of `speculate`, the command runs as a task of the running loop."""
+        input_data = self._speculative_input(
+            execution_context, upstream_input, predicted
+        )
+        self.discard_speculation()
+        if input_data is None:
+            return
+
+        async def run() -> List[Message]:
+            return [
+                message
+                async for message in self.command.a_execute(
+                    execution_context, input_data
+                )
+            ]
+
+        self._speculation = (
+            self._speculation_key(execution_context, input_data),
+            asyncio.create_task(run()),
+        )
+
+    def discard_speculation(self) -> None:
+        """Drop the pending speculative execution, cancelling it if possible."""
+        speculation, self._speculation = self._speculation, None
+        if speculation is not None:
+            speculation[1].cancel()
+            speculative_executions.inc(node=self.name, result="discarded")
+
+    def _take_speculation(
+        self, execution_context: ExecutionContext, input_data: List[Message]
+    ) -> Any:
+        if self._speculation is None:
+            return None
+        if self._speculation[0] != self._speculation_key(execution_context, input_data):
+            self.discard_speculation()
+            return None
+
+        speculation, self._speculation = self._speculation[1], None
+        return speculation
+
+    def _speculation_key(
+        self, execution_context: ExecutionContext, input_data: List[Message]
+    ) -> str:
+        # Only the tools of the last message are sent, earlier ones may carry stale tools
+        sent = [
+            message.model_copy(update={"tools": None}) for message in input_data[:-1]
+        ] + input_data[-1:]
+        key = response_cache_key(self.command.llm, sent)
+        return f"{execution_context.execution_id}:{key}"
+
+    def _speculative_input(
+        self,
+        execution_context: ExecutionContext,
+        upstream_input: List[Message],
+        predicted: Message,
+    ) -> Optional[List[Message]]:
+        # The upstream input followed by its output, as LLMNode.get_command_input
+        # assembles it
+        messages = [
+            message.model_copy(update={"tools": None}) for message in upstream_input
+        ] + [predicted.model_copy()]
+        if self.function_specs:
+            messages[-1].tools = [spec.to_openai_tool() for spec in self.function_specs]
+
+        history, recent = self._split_history(messages)
+        if not history or self.summarizer is None:
+            return recent
+
+        # A new summary is left to the actual run rather than requested speculatively
+        summary, pending = self._get_summary(execution_context, history)
+        return None if pending else [summary] + recent
+
+    def _run_pre_check(self, messages: List[Message]) -> Optional[Message]:
+        if self.pre_check is None:
+            return None
+
+        content = self.pre_check(messages)
+        pre_check_results.inc(
+            node=self.name, result="deferred" if content is None else "answered"
+        )
+        if content is None:
+            return None
+        # A speculative run of this node is of no use once it is answered
+        self.discard_speculation()
+        return Message(role="assistant", content=content)
+
+    def _compact(
+        self, execution_context: ExecutionContext, messages: List[Message]
+    ) -> List[Message]:
+        history, recent = self._split_history(messages)
+        if not history or self.summarizer is None:
+            return recent
+
+        summary, pending = self._get_summary(execution_context, history)
+        if pending:
+            response = self.summarizer.execute(
+                execution_context, [self._summary_request(summary, pending)]
+            )
+            summary = self._set_summary(
+                execution_context, history, response.content or ""
+            )
+        return [summary] + recent
+
+    async def _a_compact(
+        self, execution_context: ExecutionContext, messages: List[Message]
+    ) -> List[Message]:
+        history, recent = self._split_history(messages)
+        if not history or self.summarizer is None:
+            return recent
+
+        summary, pending = self._get_summary(execution_context, history)
+        if pending:
+            content = ""
+            async for response in self.summarizer.a_execute(
+                execution_context, [self._summary_request(summary, pending)]
+            ):
+                content += response.content or ""
+            summary = self._set_summary(execution_context, history, content)
+        return [summary] + recent
+
+    def _split_history(
+        self, messages: List[Message]
+    ) -> Tuple[List[Message], List[Message]]:
+        """Split the messages into the history to compact and the recent ones to send."""
+        if self.max_prompt_tokens is None or not messages:
+            return [], messages
+
+        system_message = self.command.llm.system_message
+        budget = self.max_prompt_tokens - (
+            self.token_counter(Message(role="system", content=system_message))
+            if system_message
+            else 0
+        )
+        tokens = [self.token_counter(message) for message in messages]
+        if sum(tokens) <= budget:
+            return [], messages
+
+        if self.summarizer is not None:
+            budget -= self.summary_max_tokens
+
+        cut = len(messages)
+        used = 0
+        while cut > 0:
+            kept = len(messages) - cut
+            over_budget = used + tokens[cut - 1] > budget
+            if kept >= max(self.min_recent_messages, 1) and over_budget:
+                break
+            used += tokens[cut - 1]
+            cut -= 1
+
+        # Tool results are only valid after the assistant message calling them
+        while cut > 0 and messages[cut].role == "tool":
+            cut -= 1
+
+        return messages[:cut], messages[cut:]
+
+    def _summary_key(self, execution_context: ExecutionContext) -> str:
+        return f"history_summary:{self.name}:{execution_context.conversation_id}"
+
+    def _get_summary(
+        self, execution_context: ExecutionContext, history: List[Message]
+    ) -> Tuple[Optional[Message], List[Message]]:
+        """Return the cached summary and the history messages it does not cover yet."""
+        cached = self.summary_cache.get(self._summary_key(execution_context))
+        if not cached:
+            return None, history
+
+        # The summary message carries the id of the last message it covers
+        summary = cached[0]
+        for index, message in enumerate(history):
+            if message.message_id == summary.message_id:
+                return summary, history[index + 1 :]
+        return None, history
+
+    def _set_summary(
+        self, execution_context: ExecutionContext, history: List[Message], content: str
+    ) -> Message:
+        summary = Message(
+            role="system",
+            content=SUMMARY_PREFIX + content,
+            message_id=history[-1].message_id,
+        )
+        self.summary_cache.set(self._summary_key(execution_context), [summary])
+        return summary
+
+    def _summary_request(
+        self, summary: Optional[Message], messages: List[Message]
+    ) -> Message:
+        lines = []
+        for message in messages:
+            if message.content:
+                lines.append(f"{message.role}: {message.content}")
+            for tool_call in message.tool_calls or []:
+                lines.append(
+                    f"{message.role} called {tool_call.function.name}"
+                    f"({tool_call.function.arguments})"
+                )
+
+        previous = (
+            f"Summary so far:\n{summary.content[len(SUMMARY_PREFIX):]}\n\n"
+            if summary
+            else ""
+        )
+        return Message(
+            role="user",
+            content=(
+                "Summarize the conversation below for an assistant that continues it. "
+                "Keep every name, email, decision and open question. Reply with the "
+                f"summary only, in at most {self.summary_max_tokens} tokens.\n\n"
+                f"{previous}New messages:\n" + "\n".join(lines)
+            ),
+        )
+
+    def to_dict(self) -> dict[str, any]:
+        return {
+            **super().to_dict(),
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "min_recent_messages": self.min_recent_messages,
+            "summarizer": self.summarizer.to_dict() if self.summarizer else None,
+            "summary_max_tokens": self.summary_max_tokens,
+            "pre_check": getattr(self.pre_check, "__name__", None),
+        }
@@ -0,0 +1,408 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Name of the node running in the current thread or task, set by the workflow
+_current_node: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_node", default=""
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    # The shortest exact representation, with :g counts past a million lose digits
+    return repr(float(value))
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    """A named metric with one series per combination of label values."""
+
+    type: str = ""
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _pairs(self, key: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        return list(zip(self.label_names, key))
+
+    def render(self) -> List[str]:
+        """Return the lines of the metric in the Prometheus text format."""
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type}",
+            *self._render_series(),
+        ]
+
+    def _render_series(self) -> List[str]:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """A value that only goes up, like a number of tokens or cache hits."""
+
+    type = "counter"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        super().__init__(name, description, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _render_series(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self._pairs(key))} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, like durations in seconds, counted in cumulative
+    buckets as Prometheus expects them. Quantiles are estimated from the buckets.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: count of each bucket, the last one being +Inf, and the sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts, total = self._series.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def sum(self, **labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return series[1][0] if series else 0.0
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        """Estimate the q-quantile, interpolating linearly inside its bucket."""
+        series = self._series.get(self._key(labels))
+        if not series or not sum(series[0]):
+            return None
+
+        counts = series[0]
+        rank = q * sum(counts)
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    # Beyond the last bound, the best estimate is the bound itself
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def summary(self) -> Dict[Tuple[str, ...], Dict[str, Optional[float]]]:
+        """Return the count, mean, p50, p90 and p99 of every series by label values."""
+        result = {}
+        for key in list(self._series):
+            labels = dict(self._pairs(key))
+            count = self.count(**labels)
+            result[key] = {
+                "count": count,
+                "mean": self.sum(**labels) / count if count else None,
+                "p50": self.quantile(0.5, **labels),
+                "p90": self.quantile(0.9, **labels),
+                "p99": self.quantile(0.99, **labels),
+            }
+        return result
+
+    def _render_series(self) -> List[str]:
+        with self._lock:
+            series = {
+                key: (list(counts), total[0])
+                for key, (counts, total) in self._series.items()
+            }
+
+        lines = []
+        for key, (counts, total) in sorted(series.items()):
+            pairs = self._pairs(key)
+            cumulative = 0
+            for bound, count in zip([*self.buckets, float("inf")], counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(
+                    f"{self.name}_bucket{_format_labels([*pairs, ('le', le)])} "
+                    f"{cumulative}"
+                )
+            lines.append(
+                f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}"
+            )
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {cumulative}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics, rendered together in the Prometheus text format.
+
+    Everything is kept in process, so the metrics can be read with the histogram API or
+    the text format without any collector, and scraped with `start_http_server` when
+    one is running.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(
+        self, name: str, description: str, label_names: Sequence[str] = ()
+    ) -> Counter:
+        """Return the counter with the name, creating it if needed."""
+        return self._get_or_create(Counter, name, description, label_names)
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Return the histogram with the name, creating it if needed."""
+        return self._get_or_create(
+            Histogram, name, description, label_names, buckets=buckets
+        )
+
+    def _get_or_create(self, cls, name, description, label_names, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, label_names, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already a {metric.type}")
+            return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Clear the values of every metric, keeping the metrics registered."""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def start_http_server(
+        self, port: int = 9464, host: str = "0.0.0.0"
+    ) -> "ThreadingHTTPServer":
+        """Serve the metrics on a background thread for a Prometheus scraper."""
+        # Imported here, most processes never serve their metrics
+        from http.server import BaseHTTPRequestHandler
+        from http.server import ThreadingHTTPServer
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+metrics = MetricsRegistry()
+
+node_duration = metrics.histogram(
+    "grafi_node_duration_seconds", "Wall time of node executions.", ("node",)
+)
+node_queue_wait = metrics.histogram(
+    "grafi_node_queue_wait_seconds",
+    "Time between a node being ready and starting to execute.",
+    ("node",),
+)
+tool_duration = metrics.histogram(
+    "grafi_tool_duration_seconds", "Wall time of tool calls.", ("node", "tool")
+)
+llm_prompt_tokens = metrics.counter(
+    "grafi_llm_prompt_tokens_total",
+    "Prompt tokens reported by the model.",
+    ("node", "tool", "model"),
+)
+llm_completion_tokens = metrics.counter(
+    "grafi_llm_completion_tokens_total",
+    "Completion tokens reported by the model.",
+    ("node", "tool", "model"),
+)
+response_cache_requests = metrics.counter(
+    "grafi_response_cache_requests_total",
+    "Response cache lookups, by result.",
+    ("node", "tool", "result"),
+)
+semantic_cache_requests = metrics.counter(
+    "grafi_semantic_cache_requests_total",
+    "Semantic cache lookups, by result.",
+    ("node", "tool", "result"),
+)
+speculative_executions = metrics.counter(
+    "grafi_speculative_executions_total",
+    "Speculative node executions, by whether they were used or discarded.",
+    ("node", "result"),
+)
+pre_check_results = metrics.counter(
+    "grafi_pre_check_results_total",
+    "Pre-checks of LLM nodes, by whether they answered or deferred to the model.",
+    ("node", "result"),
+)
+llm_backend_requests = metrics.counter(
+    "grafi_llm_backend_requests_total",
+    "Requests of routed LLM tools to their backends, by result.",
+    ("tool", "backend", "result"),
+)
+event_store_write_duration = metrics.histogram(
+    "grafi_event_store_write_seconds", "Wall time of event store writes.", ("node",)
+)
+
+
+def current_node() -> str:
+    """Return the name of the node running in the current thread or task."""
+    return _current_node.get()
+
+
+@contextmanager
+def record_node(node_name: str, ready_at: Optional[float] = None) -> Iterator[None]:
+    """
+    Label the metrics recorded in the block with the node and observe its wall time,
+    and the time it waited since `ready_at`, a `time.perf_counter()` value.
+    """
+    start = time.perf_counter()
+    if ready_at is not None:
+        node_queue_wait.observe(start - ready_at, node=node_name)
+
+    token = _current_node.set(node_name)
+    try:
+        yield
+    finally:
+        _current_node.reset(token)
+        node_duration.observe(time.perf_counter() - start, node=node_name)
+
+
+@contextmanager
+def record_tool(tool_name: str) -> Iterator[None]:
+    """Observe the wall time of a tool call, labelled with the running node."""
+    with tool_duration.time(node=current_node(), tool=tool_name):
+        yield
+
+
+def record_tokens(
+    tool_name: str, model: str, prompt_tokens: int, completion_tokens: int
+) -> None:
+    """Count the tokens of a model response, labelled with the running node."""
+    node = current_node()
+    llm_prompt_tokens.inc(prompt_tokens or 0, node=node, tool=tool_name, model=model)
+    llm_completion_tokens.inc(
+        completion_tokens or 0, node=node, tool=tool_name, model=model
+    )
@@ -0,0 +1,98 @@
+"""
+Assistants wired to MockLLMTool in place of their models, shared by the offline tests
+and the benchmarks.
+"""
+
+import uuid
+from typing import Any
+from typing import List
+
+from kyc import ClientInfo
+from kyc import RegisterClient
+from kyc import user_info_extract_system_message
+from kyc_assistant import KycAssistant
+from mock_llm_tool import MockLLMTool
+from mock_llm_tool import mock_tool_call
+from simple_llm_assistant import SimpleLLMAssistant
+
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+
+
+SIMPLE_LLM_RESPONSE = "Hello, how can I help you?"
+REGISTERED_RESPONSE = "You are registered."
+
+
+def get_execution_context() -> ExecutionContext:
+    return ExecutionContext(
+        conversation_id=uuid.uuid4().hex,
+        execution_id=uuid.uuid4().hex,
+        assistant_request_id=uuid.uuid4().hex,
+    )
+
+
+def validate(input_data: List[Message]) -> str:
+    if "@" in (input_data[-1].content or ""):
+        return "Valid"
+    return "Invalid - the name and email are missing"
+
+
+def act(input_data: List[Message]) -> Message:
+    if (input_data[-1].content or "").startswith("Invalid"):
+        return mock_tool_call(
+            "request_client_information", {"question_description": "name and email"}
+        )
+    return mock_tool_call(
+        "register_client", {"name": "Craig Li", "email": "craig@binome.dev"}
+    )
+
+
+def set_llm(assistant: Any, node_name: str, llm: MockLLMTool) -> None:
+    command = assistant.workflow.nodes[node_name].command
+    llm.system_message = command.llm.system_message
+    command.llm = llm
+
+
+def simple_llm_assistant(name: str = "SimpleLLMAssistant") -> SimpleLLMAssistant:
+    assistant = (
+        SimpleLLMAssistant.Builder()
+        .name(name)
+        .api_key("mock")
+        .system_message("You are a helpful assistant.")
+        .build()
+    )
+    set_llm(
+        assistant,
+        "OpenAINode",
+        MockLLMTool(name="OpenAITool", responses=[SIMPLE_LLM_RESPONSE]),
+    )
+    return assistant
+
+
+def kyc_assistant(
+    name: str = "KycAssistant", speculative_action: bool = False
+) -> KycAssistant:
+    assistant = (
+        KycAssistant.Builder()
+        .name(name)
+        .api_key("mock")
+        .user_info_extract_system_message(user_info_extract_system_message)
+        .action_llm_system_message(
+            "Select the most appropriate tool based on the request."
+        )
+        .summary_llm_system_message("Response to user with result of registering.")
+        .hitl_request(ClientInfo(name="request_human_information"))
+        .register_request(RegisterClient(name="register_client"))
+        .speculative_action(speculative_action)
+        .build()
+    )
+    set_llm(
+        assistant, "ThoughtNode", MockLLMTool(name="ThoughtLLM", responses=[validate])
+    )
+    set_llm(assistant, "ActionNode", MockLLMTool(name="ActionLLM", responses=[act]))
+    set_llm(
+        assistant,
+        "LLMResponseToUserNode",
+        MockLLMTool(name="ResponseToUserLLM", responses=[REGISTERED_RESPONSE]),
+    )
+    return assistant
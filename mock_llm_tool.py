@@ -0,0 +1,196 @@
+import asyncio
+import itertools
+import json
+import time
+import uuid
+from typing import Any
+from typing import AsyncGenerator
+from typing import Callable
+from typing import Dict
+from typing import Generator
+from typing import List
+from typing import Optional
+from typing import Union
+
+from metrics import record_tool
+from pydantic import Field
+from pydantic import PrivateAttr
+
+from grafi.common.decorators.record_tool_a_execution import record_tool_a_execution
+from grafi.common.decorators.record_tool_execution import record_tool_execution
+from grafi.common.decorators.record_tool_stream import record_tool_stream
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.tools.llms.llm import LLM
+
+
+MockResponse = Union[str, Message, Callable[[List[Message]], Union[str, Message]]]
+
+
+def mock_tool_call(name: str, arguments: Dict[str, Any]) -> Message:
+    """Create an assistant message calling the tool `name` with the arguments."""
+    return Message(
+        role="assistant",
+        content=None,
+        tool_calls=[
+            {
+                "id": f"call_{uuid.uuid4().hex}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)},
+            }
+        ],
+    )
+
+
+class MockLLMTool(LLM):
+    """
+    A deterministic stand-in for OpenAITool and OllamaTool that never leaves the process.
+
+    Responses are played from a script in order, and the script starts over once every
+    response has been played. A response is a message content, a Message, for instance
+    a tool call created with `mock_tool_call`, or a function of the input messages
+    returning either. The latency of the model is simulated before each response, and
+    between the chunks of a streamed one. Tool events are recorded as they are for the
+    real tools, so workflows run against it exactly as they do against a model.
+
+    Attributes:
+        api_key (Optional[str]): Accepted for interface compatibility, never used.
+        model (str): Model name reported by the tool.
+        responses (List[MockResponse]): Scripted responses, echoes the last input
+            message if empty.
+        latency (float): Seconds before a response, or before the first chunk of a
+            streamed response.
+        chunk_latency (float): Seconds between two streamed chunks.
+    """
+
+    name: str = Field(default="MockLLMTool")
+    type: str = Field(default="MockLLMTool")
+    api_key: Optional[str] = Field(default=None)
+    model: str = Field(default="mock")
+    responses: List[MockResponse] = Field(default=[])
+    latency: float = Field(default=0.0)
+    chunk_latency: float = Field(default=0.0)
+
+    _calls: Any = PrivateAttr(default_factory=itertools.count)
+
+    class Builder(LLM.Builder):
+        """Concrete builder for MockLLMTool."""
+
+        def _init_tool(self) -> "MockLLMTool":
+            return MockLLMTool()
+
+        def api_key(self, api_key: str) -> "MockLLMTool.Builder":
+            self._tool.api_key = api_key
+            return self
+
+        def model(self, model: str) -> "MockLLMTool.Builder":
+            self._tool.model = model
+            return self
+
+        def responses(self, responses: List[MockResponse]) -> "MockLLMTool.Builder":
+            self._tool.responses = responses
+            return self
+
+        def latency(self, latency: float) -> "MockLLMTool.Builder":
+            self._tool.latency = latency
+            return self
+
+        def chunk_latency(self, chunk_latency: float) -> "MockLLMTool.Builder":
+            self._tool.chunk_latency = chunk_latency
+            return self
+
+    def prepare_api_input(self, input_data: List[Message]) -> List[Dict[str, Any]]:
+        # Serialized like a provider request, so benchmarks include that cost
+        return [
+            {
+                "name": message.name,
+                "role": message.role,
+                "content": message.content or "",
+                "tool_calls": message.tool_calls,
+                "tool_call_id": message.tool_call_id,
+            }
+            for message in input_data
+        ]
+
+    def _respond(self, input_data: List[Message]) -> Message:
+        self.prepare_api_input(input_data)
+
+        if not self.responses:
+            response: Union[str, Message] = input_data[-1].content or ""
+        else:
+            response = self.responses[next(self._calls) % len(self.responses)]
+            if callable(response):
+                response = response(input_data)
+
+        if isinstance(response, Message):
+            # Every response is a new message, with new tool call ids
+            update = {"message_id": uuid.uuid4().hex, "timestamp": time.time_ns()}
+            if response.tool_calls:
+                update["tool_calls"] = [
+                    tool_call.model_copy(update={"id": f"call_{uuid.uuid4().hex}"})
+                    for tool_call in response.tool_calls
+                ]
+            return response.model_copy(update=update)
+        return Message(role="assistant", content=response)
+
+    def _chunks(self, message: Message) -> List[Message]:
+        if message.tool_calls or not message.content:
+            return [message]
+        words = message.content.split(" ")
+        return [
+            Message(role="assistant", content=word if i == 0 else f" {word}")
+            for i, word in enumerate(words)
+        ]
+
+    @record_tool_execution
+    def execute(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> Message:
+        with record_tool(self.name):
+            time.sleep(self.latency)
+            return self._respond(input_data)
+
+    @record_tool_a_execution
+    async def a_execute(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> AsyncGenerator[Message, None]:
+        with record_tool(self.name):
+            await asyncio.sleep(self.latency)
+            message = self._respond(input_data)
+        yield message
+
+    @record_tool_stream
+    def stream(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> Generator[Message, None, None]:
+        time.sleep(self.latency)
+        for i, chunk in enumerate(self._chunks(self._respond(input_data))):
+            if i:
+                time.sleep(self.chunk_latency)
+            yield chunk
+
+    @record_tool_a_execution
+    async def a_stream(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> AsyncGenerator[Message, None]:
+        await asyncio.sleep(self.latency)
+        for i, chunk in enumerate(self._chunks(self._respond(input_data))):
+            if i:
+                await asyncio.sleep(self.chunk_latency)
+            yield chunk
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **super().to_dict(),
+            "model": self.model,
+            "latency": self.latency,
+            "chunk_latency": self.chunk_latency,
+        }
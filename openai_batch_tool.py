@@ -0,0 +1,298 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from client_registry import client_registry
+from openai.types.chat import ChatCompletion
+from pooled_openai_tool import PooledOpenAITool
+from pydantic import Field
+
+from grafi.common.containers.container import container
+from grafi.common.events.tool_events.tool_event import TOOL_ID
+from grafi.common.events.tool_events.tool_event import TOOL_NAME
+from grafi.common.events.tool_events.tool_event import TOOL_TYPE
+from grafi.common.events.tool_events.tool_failed_event import ToolFailedEvent
+from grafi.common.events.tool_events.tool_invoke_event import ToolInvokeEvent
+from grafi.common.events.tool_events.tool_respond_event import ToolRespondEvent
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+
+
+BATCH_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchTransport:
+    """Submits batch request files and retrieves their results."""
+
+    def submit(self, batch_file: str) -> str:
+        """Upload the JSONL batch file, start the batch and return its id."""
+        raise NotImplementedError
+
+    def poll(self, batch_id: str) -> str:
+        """Return the status of the batch."""
+        raise NotImplementedError
+
+    def download(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Return the result and error lines of a finished batch."""
+        raise NotImplementedError
+
+
+class OpenAIBatchTransport(BatchTransport):
+    """
+    Transport for the OpenAI Batch API, or any server implementing its files and batches
+    endpoints at `base_url`.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        completion_window: str = "24h",
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.completion_window = completion_window
+
+    def _client(self):
+        return client_registry.openai_client(self.api_key, self.base_url)
+
+    def submit(self, batch_file: str) -> str:
+        client = self._client()
+        with open(batch_file, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> str:
+        return self._client().batches.retrieve(batch_id).status
+
+    def download(self, batch_id: str) -> List[Dict[str, Any]]:
+        client = self._client()
+        batch = client.batches.retrieve(batch_id)
+        lines: List[Dict[str, Any]] = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = client.files.content(file_id).text
+                lines.extend(json.loads(line) for line in content.splitlines() if line)
+        return lines
+
+
+class OpenAIBatchTool(PooledOpenAITool):
+    """
+    An OpenAITool that can send many requests through the OpenAI Batch API, trading hours
+    of latency for higher throughput and lower cost on non-interactive workloads.
+
+    Requests are written to a JSONL file, submitted through the transport and polled until
+    the batch finishes. Each result is then mapped back to the execution context of its
+    request, and tool invoke, respond and failed events are recorded per request as they
+    are for `execute`. A batch can also be submitted and collected by different processes
+    with `submit_batch` and `collect_batch`.
+
+    Attributes:
+        transport (BatchTransport): Submits and polls batches, the OpenAI Batch API at
+            `base_url` by default.
+        poll_interval (float): Seconds between two status checks of a running batch.
+        batch_dir (Optional[str]): Directory the JSONL batch files are written to, the
+            system temporary directory if not set. A batch file is deleted once it is
+            submitted.
+    """
+
+    name: str = Field(default="OpenAIBatchTool")
+    type: str = Field(default="OpenAIBatchTool")
+    transport: Optional[BatchTransport] = Field(default=None)
+    poll_interval: float = Field(default=60.0)
+    batch_dir: Optional[str] = Field(default=None)
+
+    class Builder(PooledOpenAITool.Builder):
+        """Concrete builder for OpenAIBatchTool."""
+
+        def _init_tool(self) -> "OpenAIBatchTool":
+            return OpenAIBatchTool()
+
+        def transport(self, transport: BatchTransport) -> "OpenAIBatchTool.Builder":
+            self._tool.transport = transport
+            return self
+
+        def poll_interval(self, poll_interval: float) -> "OpenAIBatchTool.Builder":
+            self._tool.poll_interval = poll_interval
+            return self
+
+        def batch_dir(self, batch_dir: str) -> "OpenAIBatchTool.Builder":
+            self._tool.batch_dir = batch_dir
+            return self
+
+        def build(self) -> "OpenAIBatchTool":
+            if self._tool.transport is None:
+                self._tool.transport = OpenAIBatchTransport(
+                    self._tool.api_key, self._tool.base_url
+                )
+            return self._tool
+
+    def _tool_event_base(
+        self, execution_context: ExecutionContext, input_data: List[Message]
+    ) -> Dict[str, Any]:
+        return {
+            TOOL_ID: self.tool_id,
+            "execution_context": execution_context,
+            TOOL_TYPE: self.type,
+            TOOL_NAME: self.name,
+            "input_data": input_data,
+        }
+
+    def _write_batch_file(
+        self, requests: List[Tuple[ExecutionContext, List[Message]]]
+    ) -> str:
+        fd, batch_file = tempfile.mkstemp(
+            prefix=f"{self.name}_", suffix=".jsonl", dir=self.batch_dir
+        )
+        with os.fdopen(fd, "wb") as f:
+            for index, (_, input_data) in enumerate(requests):
+                api_messages, api_tools = self.prepare_api_input(input_data)
+                body = {
+                    "model": self.model,
+                    "messages": api_messages,
+                    **self.chat_params,
+                }
+                if api_tools:
+                    body["tools"] = api_tools
+                line = {
+                    "custom_id": str(index),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body,
+                }
+                f.write(json.dumps(line, default=str).encode() + b"\n")
+        return batch_file
+
+    def submit_batch(
+        self, requests: List[Tuple[ExecutionContext, List[Message]]]
+    ) -> str:
+        """
+        Write the requests to a batch file, submit it and return the batch id.
+
+        Args:
+            requests (List[Tuple[ExecutionContext, List[Message]]]): Execution context and
+                input messages of every request
+
+        Returns:
+            str: The id of the submitted batch
+        """
+        batch_file = self._write_batch_file(requests)
+        try:
+            batch_id = self.transport.submit(batch_file)
+        finally:
+            # The transport has uploaded the file, or failed to
+            os.remove(batch_file)
+
+        if container.event_store:
+            container.event_store.record_events(
+                [
+                    ToolInvokeEvent(
+                        **self._tool_event_base(execution_context, input_data)
+                    )
+                    for execution_context, input_data in requests
+                ]
+            )
+        return batch_id
+
+    def wait_batch(self, batch_id: str) -> str:
+        """Block until the batch reaches a terminal status and return it."""
+        while (status := self.transport.poll(batch_id)) not in BATCH_TERMINAL_STATUSES:
+            time.sleep(self.poll_interval)
+        return status
+
+    async def a_wait_batch(self, batch_id: str) -> str:
+        """Wait without blocking the event loop until the batch reaches a terminal status."""
+        while (
+            status := await asyncio.to_thread(self.transport.poll, batch_id)
+        ) not in BATCH_TERMINAL_STATUSES:
+            await asyncio.sleep(self.poll_interval)
+        return status
+
+    def collect_batch(
+        self,
+        batch_id: str,
+        requests: List[Tuple[ExecutionContext, List[Message]]],
+        status: str = "completed",
+    ) -> List[Union[Message, Exception]]:
+        """
+        Map the results of a finished batch back to its requests.
+
+        Args:
+            batch_id (str): The id returned by `submit_batch`
+            requests (List[Tuple[ExecutionContext, List[Message]]]): The submitted requests,
+                in the same order
+            status (str): Terminal status of the batch
+
+        Returns:
+            List[Union[Message, Exception]]: The response message of every request, or the
+                RuntimeError describing why it failed, in the order of the requests
+        """
+        results: Dict[int, Union[Message, Exception]] = {}
+        if status != "failed":
+            for line in self.transport.download(batch_id):
+                index = int(line["custom_id"])
+                response = line.get("response") or {}
+                if line.get("error") or response.get("status_code") != 200:
+                    error = line.get("error") or response.get("body")
+                    results[index] = RuntimeError(f"OpenAI batch error: {error}")
+                else:
+                    completion = ChatCompletion.model_validate(response["body"])
+                    results[index] = self.to_message(completion)
+
+        outputs: List[Union[Message, Exception]] = []
+        events = []
+        for index, (execution_context, input_data) in enumerate(requests):
+            result = results.get(
+                index,
+                RuntimeError(f"OpenAI batch {batch_id} {status} without a result"),
+            )
+            outputs.append(result)
+
+            tool_event_base = self._tool_event_base(execution_context, input_data)
+            if isinstance(result, Exception):
+                events.append(ToolFailedEvent(**tool_event_base, error=str(result)))
+            else:
+                events.append(ToolRespondEvent(**tool_event_base, output_data=result))
+
+        if container.event_store:
+            container.event_store.record_events(events)
+        return outputs
+
+    def execute_batch(
+        self, requests: List[Tuple[ExecutionContext, List[Message]]]
+    ) -> List[Union[Message, Exception]]:
+        """Submit the requests as one batch, wait for it and return the results in order."""
+        batch_id = self.submit_batch(requests)
+        status = self.wait_batch(batch_id)
+        return self.collect_batch(batch_id, requests, status)
+
+    async def a_execute_batch(
+        self, requests: List[Tuple[ExecutionContext, List[Message]]]
+    ) -> List[Union[Message, Exception]]:
+        """Async version of `execute_batch`, the transport calls run in a worker thread."""
+        batch_id = await asyncio.to_thread(self.submit_batch, requests)
+        status = await self.a_wait_batch(batch_id)
+        return await asyncio.to_thread(
+            self.collect_batch, batch_id, requests, status
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **super().to_dict(),
+            "transport": type(self.transport).__name__,
+            "poll_interval": self.poll_interval,
+            "batch_dir": self.batch_dir,
+        }
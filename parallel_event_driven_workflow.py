@@ -0,0 +1,559 @@
+import asyncio
+import contextvars
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import Any
+from typing import AsyncGenerator
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from checkpoint_store import CheckpointStore
+from loguru import logger
+from managed_llm_node import ManagedLLMNode
+from metrics import record_node
+from pydantic import ConfigDict
+from pydantic import Field
+from pydantic import PrivateAttr
+from topic_checkpoint import checkpoint_topics
+from topic_checkpoint import is_waiting_for_human
+from topic_checkpoint import restore_topics
+from workflow_routing import WorkflowRouting
+from workflow_routing import check_cycles
+from workflow_routing import check_reachability
+from workflow_speculation import WorkflowSpeculation
+
+from grafi.common.containers.container import container
+from grafi.common.decorators.record_workflow_a_execution import (
+    record_workflow_a_execution,
+)
+from grafi.common.decorators.record_workflow_execution import record_workflow_execution
+from grafi.common.event_stores.event_store_in_memory import EventStoreInMemory
+from grafi.common.events.topic_events.consume_from_topic_event import (
+    ConsumeFromTopicEvent,
+)
+from grafi.common.events.topic_events.output_topic_event import OutputTopicEvent
+from grafi.common.events.topic_events.publish_to_topic_event import PublishToTopicEvent
+from grafi.common.events.topic_events.topic_event import TopicEvent
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.common.topics.human_request_topic import HumanRequestTopic
+from grafi.common.topics.output_topic import OutputTopic
+from grafi.nodes.impl.llm_node import LLMNode
+from grafi.nodes.node import Node
+from grafi.tools.llms.llm_response_command import LLMResponseCommand
+from grafi.tools.llms.llm_stream_response_command import LLMStreamResponseCommand
+from grafi.workflows.impl.event_driven_workflow import EventDrivenWorkflow
+
+
+class ParallelEventDrivenWorkflow(EventDrivenWorkflow):
+    """
+    An event-driven workflow that runs every node whose subscriptions are satisfied at the
+    same time concurrently, instead of draining the execution queue one node at a time.
+
+    Async execution schedules ready nodes on an asyncio task group, sync execution runs them
+    on a thread pool. Topic consumption and publishing always happen on the calling thread,
+    so topics and routing state are never touched concurrently.
+
+    Between turns of the same assistant request, such as the human-in-the-loop turns of a
+    KYC conversation, the topics are resumed from their in-memory state, so each node only
+    reads the events published since its committed offset instead of the whole topic
+    history being replayed from the event store every turn. The state is only reused while
+    no other workflow has published to or reset the shared topics in the meantime.
+
+    With a checkpoint store, a request that is waiting for a human reply is instead
+    checkpointed once the assistant has collected its outputs: only the topic events that
+    are still unconsumed and the committed offsets are saved, and the topics are released.
+    The next turn of the request rehydrates its topics from the checkpoint on any worker
+    sharing the store. LLM nodes still read the history of the request from the event
+    store, so the workers must also share the event store, such as an EventStoreSQLite on
+    shared storage or a Postgres event store, for a turn to be served by another worker.
+
+    The graph is compiled into a WorkflowRouting once when the workflow is built, so
+    dispatching a publish event is a dict lookup. Nodes that cannot be reached from the
+    agent input, and cycles that do not go through the human request topic, are logged as
+    warnings.
+
+    While a ManagedLLMNode with a speculative output runs, the managed LLM nodes that its
+    predicted output would trigger are started speculatively, and keep their result only
+    if the node answers as predicted.
+
+    Attributes:
+        max_workers (int): Size of the thread pool used by the sync execution path.
+        incremental_restore (bool): Resume the topics from memory between turns. Disable it
+            when turns of one request can be served by different processes.
+        checkpoint_store (Optional[CheckpointStore]): Where requests waiting for a human
+            reply are checkpointed, they are kept in memory if not set. Resuming on
+            another worker also needs an event store shared by the workers.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    name: str = "ParallelEventDrivenWorkflow"
+    type: str = "ParallelEventDrivenWorkflow"
+
+    max_workers: int = Field(default=8)
+    incremental_restore: bool = Field(default=True)
+    checkpoint_store: Optional[CheckpointStore] = Field(default=None)
+
+    # Assistant request the in-memory topic state belongs to, and the topic watermarks at
+    # the end of its last run
+    _restored_request_id: Optional[str] = PrivateAttr(default=None)
+    _topic_watermarks: Dict[str, Tuple[int, Optional[str]]] = PrivateAttr(
+        default_factory=dict
+    )
+
+    _routing: Optional[WorkflowRouting] = PrivateAttr(default=None)
+    _speculation: Optional[WorkflowSpeculation] = PrivateAttr(default=None)
+
+    class Builder(EventDrivenWorkflow.Builder):
+        """Concrete builder for ParallelEventDrivenWorkflow."""
+
+        def _init_workflow(self) -> "ParallelEventDrivenWorkflow":
+            return ParallelEventDrivenWorkflow()
+
+        def max_workers(self, max_workers: int) -> "ParallelEventDrivenWorkflow.Builder":
+            self._workflow.max_workers = max_workers
+            return self
+
+        def incremental_restore(
+            self, incremental_restore: bool
+        ) -> "ParallelEventDrivenWorkflow.Builder":
+            self._workflow.incremental_restore = incremental_restore
+            return self
+
+        def checkpoint_store(
+            self, checkpoint_store: CheckpointStore
+        ) -> "ParallelEventDrivenWorkflow.Builder":
+            self._workflow.checkpoint_store = checkpoint_store
+            return self
+
+        def build(self) -> "ParallelEventDrivenWorkflow":
+            workflow = super().build()
+            workflow.compile()
+            return workflow
+
+    def compile(self) -> None:
+        """
+        Compile the routing table of the workflow and check the graph for nodes that can
+        never run and for unintended cycles.
+        """
+        self._routing = WorkflowRouting(self.nodes, self.topic_nodes)
+
+        self._speculation = WorkflowSpeculation(
+            self.nodes,
+            self.topic_nodes,
+            {
+                node_name
+                for node_name, node in self.nodes.items()
+                if self._is_output_llm_node(node)
+            },
+        )
+
+        check_reachability(self.name, self.nodes)
+        check_cycles(self.name, self.nodes, self.topic_nodes)
+
+    def _start_speculation(
+        self,
+        execution_context: ExecutionContext,
+        node: Node,
+        node_consumed_events: List[ConsumeFromTopicEvent],
+        executor: Optional[Executor] = None,
+    ) -> List[ManagedLLMNode]:
+        if self._speculation is None:
+            return []
+        return self._speculation.start(
+            self.nodes, execution_context, node, node_consumed_events, executor
+        )
+
+    def _discard_speculations(self) -> None:
+        if self._speculation is not None:
+            self._speculation.discard(self.nodes)
+
+    def _can_execute(self, node: Node) -> bool:
+        if self._routing is None:
+            return node.can_execute()
+        return self._routing.can_execute(node, self.topics)
+
+    def on_event(self, event: TopicEvent) -> None:
+        """Queue the subscribers of the published topic whose subscriptions are satisfied."""
+        if not isinstance(event, PublishToTopicEvent) or isinstance(
+            event, OutputTopicEvent
+        ):
+            return
+
+        if self._routing is None:
+            return
+
+        for node_name in self._routing.ready_subscribers(event.topic_name, self.topics):
+            self.execution_queue.append(self.nodes[node_name])
+
+    def bind_topics(self) -> None:
+        """
+        Point the publish handlers of the topics at this workflow. Module level topics
+        are shared by every workflow using them, and publish to the last one built
+        otherwise.
+        """
+        for topic in self.topics.values():
+            topic.publish_event_handler = self.on_event
+            if isinstance(topic, HumanRequestTopic):
+                topic.publish_to_human_event_handler = self.on_event
+
+    def initial_workflow(
+        self, execution_context: ExecutionContext, input: List[Message]
+    ) -> Any:
+        """
+        Restore the workflow state, from memory when the topics still hold the state of
+        the last run of this assistant request, from its checkpoint when it was suspended,
+        otherwise from stored events.
+        """
+        self.bind_topics()
+
+        can_resume = (
+            self.incremental_restore
+            and self._restored_request_id == execution_context.assistant_request_id
+            and self._get_topic_watermarks() == self._topic_watermarks
+        )
+
+        # Invalidated until this run completes
+        self._restored_request_id = None
+
+        if not can_resume:
+            checkpoint = (
+                self.checkpoint_store.pop(execution_context.assistant_request_id)
+                if self.checkpoint_store is not None
+                else None
+            )
+            if checkpoint is None:
+                return super().initial_workflow(execution_context, input)
+            self._restore_checkpoint(execution_context, checkpoint)
+
+        self._queue_pending_nodes(input)
+
+    def _queue_pending_nodes(self, input: List[Message]) -> None:
+        for topic_name, node_names in self.topic_nodes.items():
+            topic = self.topics[topic_name]
+
+            # Only events after the lowest committed offset can still be unconsumed
+            pending_offset = min(
+                topic.consumption_offsets.get(node_name, 0) for node_name in node_names
+            )
+            for publish_event in topic.topic_events[pending_offset:]:
+                for node_name in node_names:
+                    node = self.nodes[node_name]
+                    # add unprocessed node to the execution queue
+                    if topic.can_consume(node_name) and self._can_execute(node):
+                        if isinstance(
+                            topic, HumanRequestTopic
+                        ) and topic.can_append_user_input(node_name, publish_event):
+                            # if the topic is human request topic, we need to produce a new topic event
+                            event = topic.append_user_input(
+                                user_input_event=publish_event,
+                                data=input,
+                            )
+                            container.event_store.record_event(event)
+                        self.execution_queue.append(node)
+
+    def checkpoint(self, execution_context: ExecutionContext) -> None:
+        """
+        Checkpoint the request if it is waiting for a human reply and release its topics.
+        Called by the assistant once it has consumed the outputs of the run, and a no-op
+        without a checkpoint store.
+        """
+        if self.checkpoint_store is None or not is_waiting_for_human(
+            self.topics, self.topic_nodes
+        ):
+            return
+
+        self.checkpoint_store.save(
+            execution_context.assistant_request_id,
+            checkpoint_topics(self.topics, self.topic_nodes),
+        )
+
+        for topic in self.topics.values():
+            topic.reset()
+        self._restored_request_id = None
+        self._topic_watermarks = {}
+
+    def _restore_checkpoint(
+        self, execution_context: ExecutionContext, checkpoint: Dict[str, Any]
+    ) -> None:
+        # The topics are restored from the checkpoint, but LLM nodes still read the
+        # messages published in the earlier turns of the request from the event store
+        if isinstance(container.event_store, EventStoreInMemory) and not any(
+            isinstance(event, PublishToTopicEvent)
+            for event in container.event_store.get_agent_events(
+                execution_context.assistant_request_id
+            )
+        ):
+            logger.warning(
+                f"[{self.name}] Resuming request "
+                f"{execution_context.assistant_request_id} without its history, the "
+                "in-memory event store is not shared with the worker that "
+                "checkpointed it"
+            )
+        restore_topics(self.topics, checkpoint)
+
+    def _get_topic_watermarks(self) -> Dict[str, Tuple[int, Optional[str]]]:
+        watermarks: Dict[str, Tuple[int, Optional[str]]] = {}
+        for name, topic in self.topics.items():
+            last_event = topic.topic_events[-1] if topic.topic_events else None
+            watermarks[name] = (
+                len(topic.topic_events),
+                last_event.event_id if last_event else None,
+            )
+        return watermarks
+
+    def _commit_topic_state(self, execution_context: ExecutionContext) -> None:
+        self._restored_request_id = execution_context.assistant_request_id
+        self._topic_watermarks = self._get_topic_watermarks()
+
+    def _dequeue_ready_nodes(self) -> List[Tuple[Node, List[ConsumeFromTopicEvent]]]:
+        """
+        Drain the execution queue and consume the input of every ready node.
+
+        A node can be queued several times by one publish, so it is only taken once.
+        Nodes without any new input are dropped, as in the sequential workflow.
+        """
+        ready_nodes: Dict[str, Tuple[Node, List[ConsumeFromTopicEvent]]] = {}
+
+        while self.execution_queue:
+            node = self.execution_queue.popleft()
+            if node.name in ready_nodes:
+                continue
+
+            node_consumed_events = self.get_node_input(node)
+            if node_consumed_events:
+                ready_nodes[node.name] = (node, node_consumed_events)
+
+        return list(ready_nodes.values())
+
+    @record_workflow_execution
+    def execute(
+        self, execution_context: ExecutionContext, input: List[Message]
+    ) -> None:
+        """
+        Execute the workflow with the given context and input.
+        Independent ready nodes are executed on the thread pool, and their results are
+        published as soon as each one completes.
+        """
+        self.initial_workflow(execution_context, input)
+
+        running: Dict[Future, Tuple[Node, List[ConsumeFromTopicEvent]]] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while self.execution_queue or running:
+                    ready_at = time.perf_counter()
+                    for node, node_consumed_events in self._dequeue_ready_nodes():
+                        # Copy the context so node spans stay under the workflow span
+                        future = executor.submit(
+                            contextvars.copy_context().run,
+                            self._execute_node,
+                            execution_context,
+                            node,
+                            node_consumed_events,
+                            ready_at,
+                            executor,
+                        )
+                        running[future] = (node, node_consumed_events)
+
+                    if not running:
+                        continue
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        node, node_consumed_events = running.pop(future)
+                        self._publish_events(
+                            node,
+                            execution_context,
+                            future.result(),
+                            node_consumed_events,
+                        )
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+            finally:
+                self._discard_speculations()
+
+        self._commit_topic_state(execution_context)
+
+    def _execute_node(
+        self,
+        execution_context: ExecutionContext,
+        node: Node,
+        node_consumed_events: List[ConsumeFromTopicEvent],
+        ready_at: float,
+        executor: Executor,
+    ) -> Any:
+        with record_node(node.name, ready_at):
+            # Speculations are queued on the workflow executor after this node, and
+            # before the nodes it feeds, which wait for them
+            targets = self._start_speculation(
+                execution_context, node, node_consumed_events, executor
+            )
+            result = None
+            try:
+                result = node.execute(execution_context, node_consumed_events)
+            finally:
+                WorkflowSpeculation.resolve(node, result, targets)
+            return result
+
+    @record_workflow_a_execution
+    async def a_execute(
+        self,
+        execution_context: ExecutionContext,
+        input: List[Message],
+        stream_queue: Optional[asyncio.Queue] = None,
+    ) -> None:
+        """
+        Execute the workflow with the given context and input.
+        Independent ready nodes run concurrently on a task group; each node publishes its
+        result when it finishes and immediately schedules the nodes it unblocked.
+
+        When a `stream_queue` is given, LLM nodes publishing to the agent output topic are
+        streamed and their deltas are put on the queue as they arrive.
+        """
+        self.initial_workflow(execution_context, input)
+
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                self._schedule_ready_nodes(
+                    task_group, execution_context, stream_queue
+                )
+        finally:
+            self._discard_speculations()
+
+        self._commit_topic_state(execution_context)
+
+    async def a_stream(
+        self, execution_context: ExecutionContext, input: List[Message]
+    ) -> AsyncGenerator[Message, None]:
+        """
+        Execute the workflow and yield the token deltas of the output LLM nodes while the
+        rest of the graph is still running.
+
+        Every delta of one response carries the message_id of the complete message that is
+        published to the output topic once the stream ends, so callers can tell which
+        output messages they have already received.
+        """
+        stream_queue: asyncio.Queue = asyncio.Queue()
+
+        async def execute_workflow() -> None:
+            try:
+                await self.a_execute(
+                    execution_context, input, stream_queue=stream_queue
+                )
+            finally:
+                stream_queue.put_nowait(None)
+
+        execution_task = asyncio.create_task(execute_workflow())
+        try:
+            while (message := await stream_queue.get()) is not None:
+                yield message
+
+            # Surface errors raised by the workflow
+            await execution_task
+        finally:
+            execution_task.cancel()
+
+    def _schedule_ready_nodes(
+        self,
+        task_group: asyncio.TaskGroup,
+        execution_context: ExecutionContext,
+        stream_queue: Optional[asyncio.Queue] = None,
+    ) -> None:
+        ready_at = time.perf_counter()
+        for node, node_consumed_events in self._dequeue_ready_nodes():
+            task_group.create_task(
+                self._a_execute_node(
+                    task_group,
+                    execution_context,
+                    node,
+                    node_consumed_events,
+                    stream_queue,
+                    ready_at,
+                )
+            )
+
+    async def _a_execute_node(
+        self,
+        task_group: asyncio.TaskGroup,
+        execution_context: ExecutionContext,
+        node: Node,
+        node_consumed_events: List[ConsumeFromTopicEvent],
+        stream_queue: Optional[asyncio.Queue] = None,
+        ready_at: Optional[float] = None,
+    ) -> None:
+        with record_node(node.name, ready_at):
+            targets = self._start_speculation(
+                execution_context, node, node_consumed_events
+            )
+            result = None
+            try:
+                if stream_queue is not None and self._is_output_llm_node(node):
+                    result = await self._a_stream_node(
+                        execution_context, node, node_consumed_events, stream_queue
+                    )
+                elif isinstance(node.command, LLMStreamResponseCommand):
+                    # Stream node usually would be the last node of the workflow which will return to user.
+                    # In this case we return the async generator to the caller
+                    result = node.a_execute(execution_context, node_consumed_events)
+                else:
+                    # Extract data from async generator and publish the data to the topic
+                    result = []
+                    async for item in node.a_execute(
+                        execution_context, node_consumed_events
+                    ):
+                        result.extend(item if isinstance(item, list) else [item])
+            finally:
+                WorkflowSpeculation.resolve(node, result, targets)
+
+        self._publish_events(node, execution_context, result, node_consumed_events)
+        self._schedule_ready_nodes(task_group, execution_context, stream_queue)
+
+    def _is_output_llm_node(self, node: Node) -> bool:
+        return (
+            isinstance(node, LLMNode)
+            and isinstance(node.command, LLMResponseCommand)
+            and not isinstance(node.command, LLMStreamResponseCommand)
+            and any(isinstance(topic, OutputTopic) for topic in node.publish_to)
+        )
+
+    async def _a_stream_node(
+        self,
+        execution_context: ExecutionContext,
+        node: LLMNode,
+        node_consumed_events: List[ConsumeFromTopicEvent],
+        stream_queue: asyncio.Queue,
+    ) -> List[Message]:
+        """
+        Run an output LLM node through its LLM's a_stream, forwarding every delta to the
+        stream queue, and return the assembled message to publish downstream.
+        Only the text content is assembled, output nodes are not expected to call tools.
+        """
+        stream_node = node.model_copy(
+            update={
+                "command": LLMStreamResponseCommand.Builder()
+                .llm(node.command.llm)
+                .build()
+            }
+        )
+
+        message_id = uuid.uuid4().hex
+        content = ""
+        async for delta in stream_node.a_execute(
+            execution_context, node_consumed_events
+        ):
+            if delta.content is not None:
+                content += delta.content
+            stream_queue.put_nowait(delta.model_copy(update={"message_id": message_id}))
+
+        return [Message(message_id=message_id, role="assistant", content=content)]
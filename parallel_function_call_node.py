@@ -0,0 +1,119 @@
+from typing import AsyncGenerator
+from typing import List
+from typing import Optional
+
+from loguru import logger
+
+from grafi.common.decorators.record_node_a_execution import record_node_a_execution
+from grafi.common.decorators.record_node_execution import record_node_execution
+from grafi.common.events.topic_events.consume_from_topic_event import (
+    ConsumeFromTopicEvent,
+)
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.nodes.impl.llm_function_call_node import LLMFunctionCallNode
+
+
+class ParallelFunctionCallNode(LLMFunctionCallNode):
+    """
+    An LLMFunctionCallNode that runs every pending tool call of its input at once.
+
+    The pending calls of all the input messages are sent to the command together, as
+    the calls of one message, so an AsyncFunctionCallingCommand dispatches them all
+    concurrently on the sync and async paths alike. The tool responses are published as
+    one batch in the order of the calls. A call is pending until the input holds its
+    response, so the calls of a message that were already answered are not run again.
+    """
+
+    name: str = "ParallelFunctionCallNode"
+    type: str = "ParallelFunctionCallNode"
+
+    class Builder(LLMFunctionCallNode.Builder):
+        """Concrete builder for ParallelFunctionCallNode."""
+
+        def _init_node(self) -> "ParallelFunctionCallNode":
+            return ParallelFunctionCallNode()
+
+    @record_node_execution
+    def execute(
+        self,
+        execution_context: ExecutionContext,
+        node_input: List[ConsumeFromTopicEvent],
+    ) -> List[Message]:
+        tool_call_message = self._merge_tool_calls(self.get_command_input(node_input))
+        if tool_call_message is None:
+            return []
+        return self.command.execute(execution_context, tool_call_message)
+
+    @record_node_a_execution
+    async def a_execute(
+        self,
+        execution_context: ExecutionContext,
+        node_input: List[ConsumeFromTopicEvent],
+    ) -> AsyncGenerator[Message, None]:
+        tool_call_message = self._merge_tool_calls(self.get_command_input(node_input))
+        if tool_call_message is None:
+            yield []
+            return
+
+        tool_response_messages: List[Message] = []
+        try:
+            async for response in self.command.a_execute(
+                execution_context, tool_call_message
+            ):
+                tool_response_messages.extend(
+                    response if isinstance(response, list) else [response]
+                )
+        except Exception as e:
+            logger.error(f"Error in async function execution: {str(e)}")
+            raise
+
+        yield tool_response_messages
+
+    def get_command_input(
+        self, node_input: List[ConsumeFromTopicEvent]
+    ) -> List[Message]:
+        """Return the messages with pending tool calls, without their answered calls."""
+        input_messages = [
+            message
+            for event in node_input
+            for message in (
+                event.data if isinstance(event.data, list) else [event.data]
+            )
+        ]
+
+        responded_tool_call_ids = {
+            message.tool_call_id
+            for message in input_messages
+            if message.tool_call_id
+        }
+        tool_call_messages = []
+        for message in input_messages:
+            if not message.tool_calls:
+                continue
+            pending_tool_calls = [
+                tool_call
+                for tool_call in message.tool_calls
+                if tool_call.id not in responded_tool_call_ids
+            ]
+            if len(pending_tool_calls) == len(message.tool_calls):
+                tool_call_messages.append(message)
+            elif pending_tool_calls:
+                tool_call_messages.append(
+                    message.model_copy(update={"tool_calls": pending_tool_calls})
+                )
+        return tool_call_messages
+
+    @staticmethod
+    def _merge_tool_calls(tool_call_messages: List[Message]) -> Optional[Message]:
+        if len(tool_call_messages) <= 1:
+            return tool_call_messages[0] if tool_call_messages else None
+        return tool_call_messages[-1].model_copy(
+            update={
+                "tool_calls": [
+                    tool_call
+                    for message in tool_call_messages
+                    for tool_call in message.tool_calls
+                ]
+            }
+        )
@@ -0,0 +1,216 @@
+from typing import Any
+from typing import AsyncGenerator
+from typing import Dict
+from typing import Generator
+from typing import List
+from typing import Optional
+from typing import Union
+
+from client_registry import DEFAULT_POOL_IDLE_TIMEOUT
+from client_registry import DEFAULT_POOL_SIZE
+from client_registry import client_registry
+from loguru import logger
+from metrics import record_tokens
+from metrics import record_tool
+from pydantic import Field
+
+from grafi.common.decorators.record_tool_a_execution import record_tool_a_execution
+from grafi.common.decorators.record_tool_execution import record_tool_execution
+from grafi.common.decorators.record_tool_stream import record_tool_stream
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.tools.llms.impl.ollama_tool import OllamaTool
+
+
+class PooledOllamaTool(OllamaTool):
+    """
+    An OllamaTool that sends its requests through the shared client registry instead of
+    creating a new client, and a new connection, for every call.
+
+    Responses can be streamed like with OpenAITool, and `warm_up` loads the model ahead
+    of the first request so it does not pay for the load.
+
+    Attributes:
+        pool_size (int): Maximum number of pooled connections to the Ollama server.
+        pool_idle_timeout (float): Seconds an idle keep-alive connection is kept open.
+        keep_alive (Optional[Union[float, str]]): How long the server keeps the model
+            loaded after a request, in seconds or as a duration such as "30m", -1 to
+            keep it loaded. The server default, 5 minutes, when not set.
+    """
+
+    name: str = Field(default="PooledOllamaTool")
+    type: str = Field(default="PooledOllamaTool")
+    pool_size: int = Field(default=DEFAULT_POOL_SIZE)
+    pool_idle_timeout: float = Field(default=DEFAULT_POOL_IDLE_TIMEOUT)
+    keep_alive: Optional[Union[float, str]] = Field(default=None)
+
+    class Builder(OllamaTool.Builder):
+        """Concrete builder for PooledOllamaTool."""
+
+        def _init_tool(self) -> "PooledOllamaTool":
+            return PooledOllamaTool()
+
+        def pool_size(self, pool_size: int) -> "PooledOllamaTool.Builder":
+            self._tool.pool_size = pool_size
+            return self
+
+        def pool_idle_timeout(
+            self, pool_idle_timeout: float
+        ) -> "PooledOllamaTool.Builder":
+            self._tool.pool_idle_timeout = pool_idle_timeout
+            return self
+
+        def keep_alive(
+            self, keep_alive: Union[float, str]
+        ) -> "PooledOllamaTool.Builder":
+            self._tool.keep_alive = keep_alive
+            return self
+
+    @record_tool_execution
+    def execute(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> Message:
+        logger.debug("Input data: %s", input_data)
+
+        api_messages, api_functions = self.prepare_api_input(input_data)
+        client = client_registry.ollama_client(
+            self.api_url, self.pool_size, self.pool_idle_timeout
+        )
+        try:
+            with record_tool(self.name):
+                response = client.chat(
+                    model=self.model,
+                    messages=api_messages,
+                    tools=api_functions,
+                    keep_alive=self.keep_alive,
+                )
+
+            self._record_usage(response)
+            return self.to_message(response)
+        except Exception as e:
+            logger.error("Ollama API error: %s", e)
+            raise RuntimeError(f"Ollama API error: {e}") from e
+
+    @record_tool_a_execution
+    async def a_execute(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> AsyncGenerator[Message, None]:
+        logger.debug("Input data: %s", input_data)
+
+        api_messages, api_functions = self.prepare_api_input(input_data)
+        client = client_registry.async_ollama_client(
+            self.api_url, self.pool_size, self.pool_idle_timeout
+        )
+        try:
+            with record_tool(self.name):
+                response = await client.chat(
+                    model=self.model,
+                    messages=api_messages,
+                    tools=api_functions,
+                    keep_alive=self.keep_alive,
+                )
+
+            self._record_usage(response)
+            yield self.to_message(response)
+        except Exception as e:
+            logger.error("Ollama API error: %s", e)
+            raise RuntimeError(f"Ollama API error: {e}") from e
+
+    @record_tool_stream
+    def stream(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> Generator[Message, None, None]:
+        api_messages, api_functions = self.prepare_api_input(input_data)
+        client = client_registry.ollama_client(
+            self.api_url, self.pool_size, self.pool_idle_timeout
+        )
+        try:
+            with record_tool(self.name):
+                for chunk in client.chat(
+                    model=self.model,
+                    messages=api_messages,
+                    tools=api_functions,
+                    stream=True,
+                    keep_alive=self.keep_alive,
+                ):
+                    if chunk.done:
+                        self._record_usage(chunk)
+                    yield self.to_message(chunk)
+        except Exception as e:
+            logger.error("Ollama API error: %s", e)
+            raise RuntimeError(f"Ollama API error: {e}") from e
+
+    @record_tool_a_execution
+    async def a_stream(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> AsyncGenerator[Message, None]:
+        api_messages, api_functions = self.prepare_api_input(input_data)
+        client = client_registry.async_ollama_client(
+            self.api_url, self.pool_size, self.pool_idle_timeout
+        )
+        try:
+            with record_tool(self.name):
+                async for chunk in await client.chat(
+                    model=self.model,
+                    messages=api_messages,
+                    tools=api_functions,
+                    stream=True,
+                    keep_alive=self.keep_alive,
+                ):
+                    if chunk.done:
+                        self._record_usage(chunk)
+                    yield self.to_message(chunk)
+        except Exception as e:
+            logger.error("Ollama API error: %s", e)
+            raise RuntimeError(f"Ollama API error: {e}") from e
+
+    def warm_up(self) -> bool:
+        """
+        Load the model on the server and keep it loaded for `keep_alive`, returning
+        whether it succeeded. A request without a prompt only loads the model.
+        """
+        client = client_registry.ollama_client(
+            self.api_url, self.pool_size, self.pool_idle_timeout
+        )
+        try:
+            client.generate(model=self.model, keep_alive=self.keep_alive)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not warm up Ollama model {self.model}: {e}")
+            return False
+
+    async def a_warm_up(self) -> bool:
+        """Load the model on the server, like `warm_up`, without blocking the loop."""
+        client = client_registry.async_ollama_client(
+            self.api_url, self.pool_size, self.pool_idle_timeout
+        )
+        try:
+            await client.generate(model=self.model, keep_alive=self.keep_alive)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not warm up Ollama model {self.model}: {e}")
+            return False
+
+    def _record_usage(self, response: Any) -> None:
+        record_tokens(
+            self.name,
+            self.model,
+            getattr(response, "prompt_eval_count", None) or 0,
+            getattr(response, "eval_count", None) or 0,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **super().to_dict(),
+            "pool_size": self.pool_size,
+            "pool_idle_timeout": self.pool_idle_timeout,
+            "keep_alive": self.keep_alive,
+        }
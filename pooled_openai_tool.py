@@ -0,0 +1,252 @@
+import hashlib
+from typing import Any
+from typing import AsyncGenerator
+from typing import Dict
+from typing import Generator
+from typing import List
+from typing import Optional
+
+from client_registry import DEFAULT_POOL_IDLE_TIMEOUT
+from client_registry import DEFAULT_POOL_SIZE
+from client_registry import client_registry
+from deprecated import deprecated
+from function_schema import tools_json
+from metrics import record_tokens
+from metrics import record_tool
+from openai.types.chat import ChatCompletion
+from pydantic import Field
+from rate_limiter import DEFAULT_MAX_RETRIES
+from rate_limiter import RateLimiter
+from rate_limiter import estimate_request_tokens
+from rate_limiter import rate_limiters
+
+from grafi.common.decorators.record_tool_a_execution import record_tool_a_execution
+from grafi.common.decorators.record_tool_execution import record_tool_execution
+from grafi.common.decorators.record_tool_stream import record_tool_stream
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.tools.llms.impl.openai_tool import OpenAITool
+
+
+class PooledOpenAITool(OpenAITool):
+    """
+    An OpenAITool that sends its requests through the shared client registry instead of
+    creating a new client, and a new connection, for every call.
+
+    Requests go through the rate limiter shared by every tool with the same API key and
+    model, which also retries them on 429, 5xx and connection errors in place of the
+    client.
+
+    Attributes:
+        base_url (Optional[str]): The API endpoint, the OpenAI default when not set.
+        pool_size (int): Maximum number of pooled connections to the endpoint.
+        pool_idle_timeout (float): Seconds an idle keep-alive connection is kept open.
+        requests_per_minute (Optional[float]): Request limit of the API key and model.
+        tokens_per_minute (Optional[float]): Token limit of the API key and model.
+        max_retries (int): Retries of a request failing with a retryable error.
+        prompt_cache_routing (bool): Send a `prompt_cache_key` hashed from the system
+            message and tools, so the requests sharing them are routed to the same
+            provider-side prompt cache. Ignored if set in the chat params.
+    """
+
+    name: str = Field(default="PooledOpenAITool")
+    type: str = Field(default="PooledOpenAITool")
+    base_url: Optional[str] = Field(default=None)
+    pool_size: int = Field(default=DEFAULT_POOL_SIZE)
+    pool_idle_timeout: float = Field(default=DEFAULT_POOL_IDLE_TIMEOUT)
+    requests_per_minute: Optional[float] = Field(default=None)
+    tokens_per_minute: Optional[float] = Field(default=None)
+    max_retries: int = Field(default=DEFAULT_MAX_RETRIES)
+    prompt_cache_routing: bool = Field(default=False)
+
+    class Builder(OpenAITool.Builder):
+        """Concrete builder for PooledOpenAITool."""
+
+        def _init_tool(self) -> "PooledOpenAITool":
+            return PooledOpenAITool()
+
+        def base_url(self, base_url: str) -> "PooledOpenAITool.Builder":
+            self._tool.base_url = base_url
+            return self
+
+        def pool_size(self, pool_size: int) -> "PooledOpenAITool.Builder":
+            self._tool.pool_size = pool_size
+            return self
+
+        def pool_idle_timeout(
+            self, pool_idle_timeout: float
+        ) -> "PooledOpenAITool.Builder":
+            self._tool.pool_idle_timeout = pool_idle_timeout
+            return self
+
+        def requests_per_minute(
+            self, requests_per_minute: float
+        ) -> "PooledOpenAITool.Builder":
+            self._tool.requests_per_minute = requests_per_minute
+            return self
+
+        def tokens_per_minute(
+            self, tokens_per_minute: float
+        ) -> "PooledOpenAITool.Builder":
+            self._tool.tokens_per_minute = tokens_per_minute
+            return self
+
+        def max_retries(self, max_retries: int) -> "PooledOpenAITool.Builder":
+            self._tool.max_retries = max_retries
+            return self
+
+        def prompt_cache_routing(
+            self, prompt_cache_routing: bool
+        ) -> "PooledOpenAITool.Builder":
+            self._tool.prompt_cache_routing = prompt_cache_routing
+            return self
+
+    @record_tool_execution
+    def execute(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> Message:
+        api_messages, api_tools = self.prepare_api_input(input_data)
+
+        try:
+            client = client_registry.openai_client(
+                self.api_key, self.base_url, self.pool_size, self.pool_idle_timeout
+            )
+            with record_tool(self.name):
+                response = self._rate_limiter().call(
+                    lambda: client.chat.completions.create(
+                        model=self.model,
+                        messages=api_messages,
+                        tools=api_tools,
+                        **self._request_params(api_tools),
+                    ),
+                    estimate_request_tokens(api_messages, self.chat_params),
+                    self.max_retries,
+                    self._total_tokens,
+                )
+            self._record_usage(response)
+            return self.to_message(response)
+
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API error: {e}") from e
+
+    @record_tool_a_execution
+    async def a_execute(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> AsyncGenerator[Message, None]:
+        api_messages, api_tools = self.prepare_api_input(input_data)
+        try:
+            client = client_registry.async_openai_client(
+                self.api_key, self.base_url, self.pool_size, self.pool_idle_timeout
+            )
+            with record_tool(self.name):
+                response = await self._rate_limiter().a_call(
+                    lambda: client.chat.completions.create(
+                        model=self.model,
+                        messages=api_messages,
+                        tools=api_tools,
+                        **self._request_params(api_tools),
+                    ),
+                    estimate_request_tokens(api_messages, self.chat_params),
+                    self.max_retries,
+                    self._total_tokens,
+                )
+            self._record_usage(response)
+            yield self.to_message(response)
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API error: {e}") from e
+
+    @record_tool_stream
+    @deprecated("Use a_stream() instead for streaming functionality")
+    def stream(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> Generator[Message, None, None]:
+        api_messages, api_tools = self.prepare_api_input(input_data)
+        client = client_registry.openai_client(
+            self.api_key, self.base_url, self.pool_size, self.pool_idle_timeout
+        )
+
+        with record_tool(self.name):
+            for chunk in self._rate_limiter().stream(
+                lambda: client.chat.completions.create(
+                    model=self.model,
+                    messages=api_messages,
+                    tools=api_tools,
+                    stream=True,
+                    **self._request_params(api_tools),
+                ),
+                estimate_request_tokens(api_messages, self.chat_params),
+                self.max_retries,
+            ):
+                yield self.to_stream_message(chunk)
+
+    @record_tool_a_execution
+    async def a_stream(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> AsyncGenerator[Message, None]:
+        api_messages, api_tools = self.prepare_api_input(input_data)
+        client = client_registry.async_openai_client(
+            self.api_key, self.base_url, self.pool_size, self.pool_idle_timeout
+        )
+
+        with record_tool(self.name):
+            async for chunk in self._rate_limiter().a_stream(
+                lambda: client.chat.completions.create(
+                    model=self.model,
+                    messages=api_messages,
+                    tools=api_tools,
+                    stream=True,
+                    **self._request_params(api_tools),
+                ),
+                estimate_request_tokens(api_messages, self.chat_params),
+                self.max_retries,
+            ):
+                yield self.to_stream_message(chunk)
+
+    def _request_params(
+        self, api_tools: Optional[List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """The chat params of a request, with its prompt cache key if routed."""
+        if not self.prompt_cache_routing or "prompt_cache_key" in self.chat_params:
+            return self.chat_params
+        prefix = hashlib.sha256((self.system_message or "").encode())
+        if api_tools:
+            prefix.update(tools_json(api_tools))
+        return {**self.chat_params, "prompt_cache_key": prefix.hexdigest()[:32]}
+
+    def _rate_limiter(self) -> RateLimiter:
+        return rate_limiters.get(
+            self.api_key, self.model, self.requests_per_minute, self.tokens_per_minute
+        )
+
+    @staticmethod
+    def _total_tokens(response: ChatCompletion) -> Optional[int]:
+        return response.usage.total_tokens if response.usage is not None else None
+
+    def _record_usage(self, response: ChatCompletion) -> None:
+        if response.usage is not None:
+            record_tokens(
+                self.name,
+                self.model,
+                response.usage.prompt_tokens,
+                response.usage.completion_tokens,
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **super().to_dict(),
+            "base_url": self.base_url,
+            "pool_size": self.pool_size,
+            "pool_idle_timeout": self.pool_idle_timeout,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "max_retries": self.max_retries,
+            "prompt_cache_routing": self.prompt_cache_routing,
+        }
@@ -0,0 +1,424 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import FrozenSet
+from typing import Hashable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import TypeVar
+
+import httpx
+from loguru import logger
+
+
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+T = TypeVar("T")
+
+
+def error_status_code(error: BaseException) -> Optional[int]:
+    """Return the HTTP status code of an API error, looking through wrapped errors."""
+    while error is not None:
+        status_code = getattr(error, "status_code", None)
+        if isinstance(status_code, int):
+            return status_code
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def error_retry_after(error: BaseException) -> Optional[float]:
+    """Return the seconds to wait from the Retry-After header of an API error, if any."""
+    while error is not None:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers is not None and headers.get("retry-after"):
+            try:
+                return float(headers["retry-after"])
+            except ValueError:
+                return None
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether the request may succeed later: rate limits, server and connection errors."""
+    status_code = error_status_code(error)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+
+    while error is not None:
+        if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def estimate_request_tokens(
+    api_messages: List[Dict[str, Any]], chat_params: Dict[str, Any]
+) -> int:
+    """
+    Estimate the tokens a chat request counts against the tokens per minute limit: about
+    four characters per prompt token, plus the completion tokens it may generate.
+    """
+    prompt_tokens = sum(
+        4 + len(json.dumps(message, default=str)) // 4 for message in api_messages
+    )
+    completion_tokens = (
+        chat_params.get("max_completion_tokens") or chat_params.get("max_tokens") or 0
+    )
+    return prompt_tokens + completion_tokens
+
+
+class TokenBucket:
+    """Allows `rate_per_minute` units per minute, in bursts of up to a minute's worth."""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.tokens = float(rate_per_minute)
+        self.refilled_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(
+            float(self.rate_per_minute),
+            self.tokens + (now - self.refilled_at) * self.rate_per_minute / 60.0,
+        )
+        self.refilled_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available, capped to the bucket size."""
+        missing = min(amount, self.rate_per_minute) - self.tokens
+        return max(0.0, missing * 60.0 / self.rate_per_minute)
+
+
+class RateLimiter:
+    """
+    Client-side limits of one API key and model, shared by every tool using them.
+
+    Requests wait for the requests per minute and tokens per minute buckets, and for a
+    slot under the concurrency limit. The limit adapts AIMD-style: it grows by one for
+    every limit's worth of successful requests and halves on a 429, at most once a
+    second, so concurrent 429s count as one. A Retry-After holds back every request of
+    the key, not only the throttled one, and failed requests are retried after it, or
+    after an exponential backoff, with jitter so the retries do not arrive together.
+
+    Attributes:
+        requests_per_minute (Optional[float]): Request rate limit, unlimited if not set.
+        tokens_per_minute (Optional[float]): Token rate limit, unlimited if not set.
+        max_concurrency (int): Upper bound of the adaptive concurrency limit.
+        concurrency (float): The current concurrency limit.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
+        self._lock = threading.Lock()
+        self._requests: Optional[TokenBucket] = None
+        self._tokens: Optional[TokenBucket] = None
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._decreased_at = 0.0
+        self._conflicts: Set[Tuple[str, FrozenSet[float]]] = set()
+        self.configure(requests_per_minute, tokens_per_minute)
+
+    @property
+    def requests_per_minute(self) -> Optional[float]:
+        return self._requests.rate_per_minute if self._requests else None
+
+    @property
+    def tokens_per_minute(self) -> Optional[float]:
+        return self._tokens.rate_per_minute if self._tokens else None
+
+    def configure(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        """
+        Set the rate limits that are given, keeping the others. A limit that is set
+        already keeps its bucket and is only lowered, with a warning, so tools that
+        disagree on the limits of a key share the stricter one without refilling it.
+        """
+        with self._lock:
+            self._requests = self._limit(
+                self._requests, requests_per_minute, "requests"
+            )
+            self._tokens = self._limit(self._tokens, tokens_per_minute, "tokens")
+
+    def _limit(
+        self, bucket: Optional[TokenBucket], rate_per_minute: Optional[float], unit: str
+    ) -> Optional[TokenBucket]:
+        if not rate_per_minute or (
+            bucket is not None and bucket.rate_per_minute == rate_per_minute
+        ):
+            return bucket
+        if bucket is None:
+            return TokenBucket(rate_per_minute)
+
+        conflict = (unit, frozenset((bucket.rate_per_minute, rate_per_minute)))
+        if conflict not in self._conflicts:
+            self._conflicts.add(conflict)
+            logger.warning(
+                f"Conflicting limits of {bucket.rate_per_minute:g} and "
+                f"{rate_per_minute:g} {unit} per minute for the same API key and "
+                f"model, keeping {min(bucket.rate_per_minute, rate_per_minute):g}"
+            )
+        if rate_per_minute < bucket.rate_per_minute:
+            bucket.refill(time.monotonic())
+            bucket.rate_per_minute = rate_per_minute
+            bucket.tokens = min(bucket.tokens, float(rate_per_minute))
+        return bucket
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take a slot and the tokens, or return the seconds to wait before retrying."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.concurrency):
+                # Releases do not wake up waiters, they poll for a free slot
+                return 0.05
+
+            wait = 0.0
+            for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_time(amount))
+            if wait > 0:
+                return wait
+
+            if self._requests is not None:
+                self._requests.tokens -= 1
+            if self._tokens is not None:
+                self._tokens.tokens -= tokens
+            self.in_flight += 1
+            return 0.0
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Wait for a slot and `tokens` tokens."""
+        while (wait := self._try_acquire(tokens)) > 0:
+            time.sleep(wait)
+
+    async def a_acquire(self, tokens: int = 0) -> None:
+        """Wait for a slot and `tokens` tokens without blocking the event loop."""
+        while (wait := self._try_acquire(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+    def release(
+        self,
+        tokens: int = 0,
+        used_tokens: Optional[int] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """
+        Release a slot, charging the tokens actually used in place of the estimate,
+        and adapt the concurrency limit to the outcome of the request.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if self._tokens is not None and used_tokens is not None:
+                self._tokens.tokens += tokens - used_tokens
+
+            if error is None:
+                self.concurrency = min(
+                    float(self.max_concurrency), self.concurrency + 1 / self.concurrency
+                )
+                return
+            if error_status_code(error) != 429:
+                return
+
+            now = time.monotonic()
+            if now - self._decreased_at >= 1.0:
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self._decreased_at = now
+            retry_after = error_retry_after(error)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Seconds to wait before retrying a failed request, with jitter."""
+        delay = error_retry_after(error)
+        if delay is None:
+            delay = min(MAX_BACKOFF, DEFAULT_BACKOFF * 2**attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def call(
+        self,
+        request: Callable[[], T],
+        tokens: int = 0,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        usage: Callable[[T], Optional[int]] = lambda _: None,
+    ) -> T:
+        """Send a request under the limits, retrying it on retryable errors."""
+        for attempt in range(max_retries + 1):
+            self.acquire(tokens)
+            try:
+                response = request()
+            except Exception as e:
+                self.release(tokens, error=e)
+                if attempt == max_retries or not is_retryable_error(e):
+                    raise
+                time.sleep(self.backoff(attempt, e))
+                continue
+            except BaseException:
+                self.release(tokens)
+                raise
+            self.release(tokens, usage(response))
+            return response
+
+    async def a_call(
+        self,
+        request: Callable[[], Awaitable[T]],
+        tokens: int = 0,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        usage: Callable[[T], Optional[int]] = lambda _: None,
+    ) -> T:
+        """Send a request under the limits, like `call`, without blocking the loop."""
+        for attempt in range(max_retries + 1):
+            await self.a_acquire(tokens)
+            try:
+                response = await request()
+            except Exception as e:
+                self.release(tokens, error=e)
+                if attempt == max_retries or not is_retryable_error(e):
+                    raise
+                await asyncio.sleep(self.backoff(attempt, e))
+                continue
+            except BaseException:
+                self.release(tokens)
+                raise
+            self.release(tokens, usage(response))
+            return response
+
+    def stream(
+        self,
+        request: Callable[[], Iterator[T]],
+        tokens: int = 0,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ) -> Iterator[T]:
+        """
+        Open a stream under the limits, retrying the opening on retryable errors, and
+        hold its slot until the stream is consumed.
+        """
+        for attempt in range(max_retries + 1):
+            self.acquire(tokens)
+            try:
+                chunks = request()
+            except Exception as e:
+                self.release(tokens, error=e)
+                if attempt == max_retries or not is_retryable_error(e):
+                    raise
+                time.sleep(self.backoff(attempt, e))
+                continue
+            except BaseException:
+                self.release(tokens)
+                raise
+            break
+
+        error = None
+        try:
+            yield from chunks
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(tokens, error=error)
+
+    async def a_stream(
+        self,
+        request: Callable[[], Awaitable[AsyncIterator[T]]],
+        tokens: int = 0,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ) -> AsyncIterator[T]:
+        """Open a stream under the limits, like `stream`, without blocking the loop."""
+        for attempt in range(max_retries + 1):
+            await self.a_acquire(tokens)
+            try:
+                chunks = await request()
+            except Exception as e:
+                self.release(tokens, error=e)
+                if attempt == max_retries or not is_retryable_error(e):
+                    raise
+                await asyncio.sleep(self.backoff(attempt, e))
+                continue
+            except BaseException:
+                self.release(tokens)
+                raise
+            break
+
+        error = None
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(tokens, error=error)
+
+
+class RateLimiterRegistry:
+    """
+    Process-wide registry of rate limiters, keyed by API key and model, so every tool
+    calling a model with the same key shares its limits, whichever node it serves.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._limiters = {}
+        return cls._instance
+
+    @staticmethod
+    def _key(api_key: Optional[str], model: str) -> Tuple[Hashable, ...]:
+        # Only keep a digest of the credentials around
+        api_key_digest = hashlib.sha256(api_key.encode()).hexdigest() if api_key else None
+        return (api_key_digest, model)
+
+    def get(
+        self,
+        api_key: Optional[str],
+        model: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> RateLimiter:
+        """
+        Return the limiter of the API key and model, setting the limits that are given
+        if it has none yet, or lowering them to the stricter ones otherwise.
+        """
+        key = self._key(api_key, model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = RateLimiter()
+        limiter.configure(requests_per_minute, tokens_per_minute)
+        return limiter
+
+    def clear(self) -> None:
+        """Forget every limiter."""
+        with self._lock:
+            self._limiters.clear()
+
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from function_schema import tools_hash
+
+from grafi.common.models.message import Message
+from grafi.tools.llms.llm import LLM
+
+
+def dump_message(
+    message: Message, exclude: FrozenSet[str] = frozenset()
+) -> Dict[str, Any]:
+    """
+    Dump a message for hashing, without its id and timestamp, which differ on every
+    call. Its tools are replaced by their hash, precomputed for the compiled ones.
+    """
+    dumped = message.model_dump(
+        mode="json",
+        exclude={"message_id", "timestamp", "tools", *exclude},
+        warnings=False,
+    )
+    dumped["tools"] = tools_hash(message.tools) if message.tools else None
+    return dumped
+
+
+def response_cache_key(llm: LLM, input_data: List[Message]) -> str:
+    """Hash the model, system message, input messages and chat params of an LLM call."""
+    payload = {
+        "model": getattr(llm, "model", None),
+        "system_message": llm.system_message,
+        "messages": [dump_message(message) for message in input_data],
+        "chat_params": llm.chat_params,
+    }
+    serialized = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Stores LLM responses by request hash and counts hits and misses.
+
+    Subclasses guard their entries with `_lock`, which the counters share.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[Message]]:
+        """Return the cached response for the key, counting the hit or miss."""
+        messages = self._get(key)
+        with self._lock:
+            if messages is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return messages
+
+    def set(self, key: str, messages: List[Message]) -> None:
+        """Cache the response for the key."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        raise NotImplementedError
+
+    def _get(self, key: str) -> Optional[List[Message]]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit and miss counters."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ResponseCache":
+        # A cache is shared by every copy of the command using it
+        return self
+
+
+class InMemoryResponseCache(ResponseCache):
+    """
+    Process-local response cache with LRU eviction and an optional TTL.
+
+    Args:
+        max_size (int): Maximum number of cached responses.
+        ttl (Optional[float]): Seconds a response stays valid, forever when None.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, List[Message]]]" = (
+            OrderedDict()
+        )
+
+    def _get(self, key: str) -> Optional[List[Message]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, messages = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return messages
+
+    def set(self, key: str, messages: List[Message]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), messages)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    On-disk response cache backed by SQLite, shared by every process using the same file.
+
+    Entries are evicted least recently used first, and ignored once they are older than
+    `ttl` seconds. The eviction runs once every `max_size // 100` writes rather than on
+    each one, and leaves room for the writes until the next, so a single process keeps
+    at most `max_size` entries.
+
+    Args:
+        path (str): Path of the SQLite database file.
+        max_size (int): Maximum number of cached responses.
+        ttl (Optional[float]): Seconds a response stays valid, forever when None.
+    """
+
+    def __init__(
+        self,
+        path: str = "response_cache.db",
+        max_size: int = 100_000,
+        ttl: Optional[float] = None,
+    ):
+        super().__init__()
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._eviction_batch = max(1, max_size // 100)
+        # Evict on the first write, the file may already hold entries
+        self._writes_since_eviction = self._eviction_batch
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    messages TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_accessed_at "
+                "ON response_cache (accessed_at)"
+            )
+
+    def _get(self, key: str) -> Optional[List[Message]]:
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT messages, stored_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            messages, stored_at = row
+            if self.ttl is not None and now - stored_at > self.ttl:
+                self._connection.execute(
+                    "DELETE FROM response_cache WHERE key = ?", (key,)
+                )
+                return None
+
+            self._connection.execute(
+                "UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+
+        return [Message.model_validate(message) for message in json.loads(messages)]
+
+    def set(self, key: str, messages: List[Message]) -> None:
+        now = time.time()
+        serialized = json.dumps(
+            [message.model_dump(mode="json", warnings=False) for message in messages]
+        )
+        with self._lock, self._connection:
+            if self._writes_since_eviction >= self._eviction_batch:
+                self._connection.execute(
+                    """
+                    DELETE FROM response_cache WHERE key IN (
+                        SELECT key FROM response_cache
+                        ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_size - self._eviction_batch,),
+                )
+                self._writes_since_eviction = 0
+            self._connection.execute(
+                "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?)",
+                (key, serialized, now, now),
+            )
+            self._writes_since_eviction += 1
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM response_cache")
+
@@ -0,0 +1,408 @@
+import asyncio
+import threading
+import time
+from typing import Any
+from typing import AsyncGenerator
+from typing import Dict
+from typing import Generator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from loguru import logger
+from metrics import llm_backend_requests
+from pydantic import BaseModel
+from pydantic import Field
+from pydantic import PrivateAttr
+from rate_limiter import error_retry_after
+from rate_limiter import is_retryable_error
+
+from grafi.common.decorators.record_tool_a_execution import record_tool_a_execution
+from grafi.common.decorators.record_tool_execution import record_tool_execution
+from grafi.common.decorators.record_tool_stream import record_tool_stream
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.tools.llms.llm import LLM
+
+
+DEFAULT_COOLDOWN = 10.0
+
+_state_lock = threading.Lock()
+
+
+class LLMBackend(BaseModel):
+    """
+    A backend of a RoutedLLMTool.
+
+    Attributes:
+        llm (LLM): The tool sending the requests, for instance a PooledOllamaTool for a
+            local replica or a PooledOpenAITool.
+        priority (int): Backends with a lower priority are used first, the others only
+            when those are saturated, rate limited or failing.
+        max_concurrency (Optional[int]): Maximum number of requests in flight.
+        requests_per_minute (Optional[float]): Maximum request rate.
+    """
+
+    llm: LLM
+    priority: int = Field(default=0)
+    max_concurrency: Optional[int] = Field(default=None)
+    requests_per_minute: Optional[float] = Field(default=None)
+
+
+class _BackendState:
+    def __init__(self, backend: LLMBackend):
+        self.latency: Optional[float] = None
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        # Token bucket holding up to one second of requests
+        self.rate = (
+            backend.requests_per_minute / 60.0
+            if backend.requests_per_minute
+            else None
+        )
+        self.capacity = max(1.0, self.rate) if self.rate else 0.0
+        self.tokens = self.capacity
+        self.refilled_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        if self.rate:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.refilled_at) * self.rate
+            )
+            self.refilled_at = now
+
+
+class _RouterState:
+    """Load and health of the backends, shared by every copy of the tool."""
+
+    def __init__(self, backends: List[LLMBackend]):
+        self.lock = threading.Lock()
+        self.backends = [_BackendState(backend) for backend in backends]
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "_RouterState":
+        return self
+
+
+class RoutedLLMTool(LLM):
+    """
+    An LLM spreading its requests over several backends, so one LLMResponseCommand can
+    use local Ollama replicas for most prompts and OpenAI when they are saturated.
+
+    Among the backends of the lowest priority that are available, that is not cooling
+    down, under their concurrency cap and within their rate limit, a request goes to the
+    one with the lowest smoothed latency weighted by its requests in flight. When none
+    is available, the request waits for the first one to free up. A request failing
+    with a 429, a 5xx or a connection error is retried on another backend, and the
+    failing one is left alone for its Retry-After or `cooldown` seconds. Streams only
+    fail over until their first chunk. Backends that retry failed requests themselves,
+    like PooledOpenAITool, are built with `max_retries` at 0 unless it is set, so they
+    fail over at once rather than after their retries and backoffs.
+
+        RoutedLLMTool.Builder()
+        .backend(PooledOllamaTool.Builder().api_url(replica_1).build(), max_concurrency=4)
+        .backend(PooledOllamaTool.Builder().api_url(replica_2).build(), max_concurrency=4)
+        .backend(PooledOpenAITool.Builder().api_key(key).build(), priority=1)
+        .system_message(system_message)
+        .build()
+
+    Attributes:
+        backends (List[LLMBackend]): The backends and their limits.
+        cooldown (float): Seconds a failing backend is skipped without a Retry-After.
+        latency_smoothing (float): Weight of the latest latency in the smoothed one.
+    """
+
+    name: str = Field(default="RoutedLLMTool")
+    type: str = Field(default="RoutedLLMTool")
+    backends: List[LLMBackend] = Field(default=[])
+    cooldown: float = Field(default=DEFAULT_COOLDOWN)
+    latency_smoothing: float = Field(default=0.2)
+
+    _state: Optional[_RouterState] = PrivateAttr(default=None)
+
+    class Builder(LLM.Builder):
+        """Concrete builder for RoutedLLMTool."""
+
+        def _init_tool(self) -> "RoutedLLMTool":
+            return RoutedLLMTool()
+
+        def backend(
+            self,
+            llm: LLM,
+            priority: int = 0,
+            max_concurrency: Optional[int] = None,
+            requests_per_minute: Optional[float] = None,
+        ) -> "RoutedLLMTool.Builder":
+            self._tool.backends.append(
+                LLMBackend(
+                    llm=llm,
+                    priority=priority,
+                    max_concurrency=max_concurrency,
+                    requests_per_minute=requests_per_minute,
+                )
+            )
+            return self
+
+        def cooldown(self, cooldown: float) -> "RoutedLLMTool.Builder":
+            self._tool.cooldown = cooldown
+            return self
+
+        def latency_smoothing(
+            self, latency_smoothing: float
+        ) -> "RoutedLLMTool.Builder":
+            self._tool.latency_smoothing = latency_smoothing
+            return self
+
+        def build(self) -> "RoutedLLMTool":
+            for backend in self._tool.backends:
+                # Backends without their own system message use the router's
+                if backend.llm.system_message is None:
+                    backend.llm.system_message = self._tool.system_message
+                # Failing over beats retrying on the failing backend
+                if (
+                    "max_retries" in type(backend.llm).model_fields
+                    and "max_retries" not in backend.llm.model_fields_set
+                ):
+                    backend.llm.max_retries = 0
+            return self._tool
+
+    def _get_state(self) -> _RouterState:
+        with _state_lock:
+            if self._state is None:
+                if not self.backends:
+                    raise ValueError(f"{self.name} has no backend")
+                self._state = _RouterState(self.backends)
+            return self._state
+
+    def _try_acquire(self, tried: Set[int]) -> Tuple[Optional[int], float]:
+        """
+        Take a slot on the best available backend not tried yet, returning its index,
+        or None and the seconds to wait before trying again.
+        """
+        state = self._get_state()
+        now = time.monotonic()
+        with state.lock:
+            candidates = [
+                i
+                for i, backend_state in enumerate(state.backends)
+                if i not in tried and backend_state.cooldown_until <= now
+            ]
+            if not candidates:
+                # Every untried backend is cooling down, better to try one than fail
+                candidates = [i for i in range(len(state.backends)) if i not in tried]
+
+            wait = 0.05
+            available = []
+            for i in candidates:
+                backend, backend_state = self.backends[i], state.backends[i]
+                backend_state.refill(now)
+                if (
+                    backend.max_concurrency is not None
+                    and backend_state.in_flight >= backend.max_concurrency
+                ):
+                    continue
+                if backend_state.rate and backend_state.tokens < 1.0:
+                    wait = min(
+                        wait, (1.0 - backend_state.tokens) / backend_state.rate
+                    )
+                    continue
+                available.append(i)
+
+            if not available:
+                return None, wait
+
+            priority = min(self.backends[i].priority for i in available)
+            index = min(
+                (i for i in available if self.backends[i].priority == priority),
+                key=lambda i: (state.backends[i].latency or 0.0)
+                * (state.backends[i].in_flight + 1),
+            )
+            backend_state = state.backends[index]
+            backend_state.in_flight += 1
+            if backend_state.rate:
+                backend_state.tokens -= 1.0
+            return index, 0.0
+
+    def _acquire(self, tried: Set[int]) -> int:
+        while True:
+            index, wait = self._try_acquire(tried)
+            if index is not None:
+                return index
+            time.sleep(wait)
+
+    async def _a_acquire(self, tried: Set[int]) -> int:
+        while True:
+            index, wait = self._try_acquire(tried)
+            if index is not None:
+                return index
+            await asyncio.sleep(wait)
+
+    def _release(self, index: int, started_at: Optional[float] = None) -> None:
+        """Release a backend, updating its latency if the request completed."""
+        state = self._get_state()
+        with state.lock:
+            backend_state = state.backends[index]
+            backend_state.in_flight -= 1
+            if started_at is None:
+                # Cancelled or closed by the caller, which says nothing of the backend
+                return
+            latency = time.perf_counter() - started_at
+            backend_state.latency = (
+                latency
+                if backend_state.latency is None
+                else self.latency_smoothing * latency
+                + (1 - self.latency_smoothing) * backend_state.latency
+            )
+        llm_backend_requests.inc(
+            tool=self.name, backend=self.backends[index].llm.name, result="success"
+        )
+
+    def _fail(
+        self, index: int, error: Exception, tried: Set[int], retry: bool = True
+    ) -> bool:
+        """Release a failed backend, returning whether the request can fail over."""
+        state = self._get_state()
+        retryable = is_retryable_error(error)
+        with state.lock:
+            backend_state = state.backends[index]
+            backend_state.in_flight -= 1
+            if retryable:
+                backend_state.cooldown_until = time.monotonic() + (
+                    error_retry_after(error) or self.cooldown
+                )
+
+        tried.add(index)
+        can_fail_over = retry and retryable and len(tried) < len(self.backends)
+        backend_name = self.backends[index].llm.name
+        llm_backend_requests.inc(
+            tool=self.name,
+            backend=backend_name,
+            result="failover" if can_fail_over else "error",
+        )
+        if can_fail_over:
+            logger.warning(f"{self.name} failing over from {backend_name}: {error}")
+        return can_fail_over
+
+    @record_tool_execution
+    def execute(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> Message:
+        tried: Set[int] = set()
+        while True:
+            index = self._acquire(tried)
+            started_at = time.perf_counter()
+            try:
+                message = self.backends[index].llm.execute(
+                    execution_context, input_data
+                )
+            except Exception as e:
+                if not self._fail(index, e, tried):
+                    raise
+                continue
+            except BaseException:
+                self._release(index)
+                raise
+            self._release(index, started_at)
+            return message
+
+    @record_tool_a_execution
+    async def a_execute(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> AsyncGenerator[Message, None]:
+        tried: Set[int] = set()
+        while True:
+            index = await self._a_acquire(tried)
+            started_at = time.perf_counter()
+            try:
+                messages = [
+                    message
+                    async for message in self.backends[index].llm.a_execute(
+                        execution_context, input_data
+                    )
+                ]
+            except Exception as e:
+                if not self._fail(index, e, tried):
+                    raise
+                continue
+            except BaseException:
+                self._release(index)
+                raise
+            self._release(index, started_at)
+            break
+
+        for message in messages:
+            yield message
+
+    @record_tool_stream
+    def stream(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> Generator[Message, None, None]:
+        tried: Set[int] = set()
+        while True:
+            index = self._acquire(tried)
+            started_at = time.perf_counter()
+            streamed = False
+            try:
+                for chunk in self.backends[index].llm.stream(
+                    execution_context, input_data
+                ):
+                    streamed = True
+                    yield chunk
+            except Exception as e:
+                if not self._fail(index, e, tried, retry=not streamed):
+                    raise
+                continue
+            except BaseException:
+                self._release(index)
+                raise
+            self._release(index, started_at)
+            return
+
+    @record_tool_a_execution
+    async def a_stream(
+        self,
+        execution_context: ExecutionContext,
+        input_data: List[Message],
+    ) -> AsyncGenerator[Message, None]:
+        tried: Set[int] = set()
+        while True:
+            index = await self._a_acquire(tried)
+            started_at = time.perf_counter()
+            streamed = False
+            try:
+                async for chunk in self.backends[index].llm.a_stream(
+                    execution_context, input_data
+                ):
+                    streamed = True
+                    yield chunk
+            except Exception as e:
+                if not self._fail(index, e, tried, retry=not streamed):
+                    raise
+                continue
+            except BaseException:
+                self._release(index)
+                raise
+            self._release(index, started_at)
+            return
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **super().to_dict(),
+            "backends": [
+                {
+                    "llm": backend.llm.to_dict(),
+                    "priority": backend.priority,
+                    "max_concurrency": backend.max_concurrency,
+                    "requests_per_minute": backend.requests_per_minute,
+                }
+                for backend in self.backends
+            ],
+            "cooldown": self.cooldown,
+            "latency_smoothing": self.latency_smoothing,
+        }
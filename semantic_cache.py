@@ -0,0 +1,479 @@
+import functools
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from client_registry import client_registry
+from loguru import logger
+from rate_limiter import rate_limiters
+from response_cache import dump_message
+
+from grafi.common.models.message import Message
+from grafi.tools.llms.llm import LLM
+
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+# An IVF index is trained once it holds this many vectors per partition
+MIN_PARTITION_SIZE = 16
+KMEANS_ITERATIONS = 8
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy() -> Any:
+    """
+    Import NumPy on the first index built rather than with the module, or return None
+    if it is not installed, the index then falls back to pure Python, fine for a few
+    thousand entries.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def normalize(vector: List[float]) -> List[float]:
+    """Scale a vector to unit length, so inner products are cosine similarities."""
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+class Embedder:
+    """Turns the text of a request into a vector for the semantic cache."""
+
+    def embed(self, text: str) -> List[float]:
+        raise NotImplementedError
+
+    async def a_embed(self, text: str) -> List[float]:
+        return self.embed(text)
+
+
+class HashEmbedder(Embedder):
+    """
+    Offline embedder hashing the lowercased words of a text and their character
+    n-grams into a fixed number of signed dimensions.
+
+    Texts sharing most of their words and spellings end up close, whatever they mean,
+    so it suits tests and inputs that repeat with small variations, like greetings,
+    rather than paraphrases.
+
+    Args:
+        dimensions (int): Size of the vectors.
+        ngram_size (int): Length of the character n-grams, 0 to only hash words.
+    """
+
+    def __init__(self, dimensions: int = 512, ngram_size: int = 3):
+        self.dimensions = dimensions
+        self.ngram_size = ngram_size
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for word in WORD_PATTERN.findall(text.lower()):
+            features.append(word)
+            padded = f" {word} "
+            features.extend(
+                padded[i : i + self.ngram_size]
+                for i in range(len(padded) - self.ngram_size + 1)
+                if self.ngram_size
+            )
+        return features
+
+    def embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for feature in self._features(text):
+            # A stable hash, unlike hash(), so vectors are the same in every process
+            value = int.from_bytes(
+                hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"
+            )
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        return normalize(vector)
+
+
+class OpenAIEmbedder(Embedder):
+    """
+    Embeds texts with the OpenAI embeddings API, through the pooled clients and the
+    rate limiter shared with the chat models of the same key.
+
+    Args:
+        api_key (Optional[str]): The OpenAI API key.
+        model (str): The embedding model.
+        base_url (Optional[str]): Endpoint of an OpenAI compatible server.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "text-embedding-3-small",
+        base_url: Optional[str] = None,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+
+    def embed(self, text: str) -> List[float]:
+        client = client_registry.openai_client(self.api_key, self.base_url)
+        response = rate_limiters.get(self.api_key, self.model).call(
+            lambda: client.embeddings.create(model=self.model, input=text),
+            len(text) // 4,
+        )
+        return normalize(response.data[0].embedding)
+
+    async def a_embed(self, text: str) -> List[float]:
+        client = client_registry.async_openai_client(self.api_key, self.base_url)
+        response = await rate_limiters.get(self.api_key, self.model).a_call(
+            lambda: client.embeddings.create(model=self.model, input=text),
+            len(text) // 4,
+        )
+        return normalize(response.data[0].embedding)
+
+
+class VectorIndex:
+    """
+    Maximum inner product index of unit vectors, by integer id.
+
+    Searches compare the query with every vector, with NumPy when it is installed.
+    With `partitions`, the index is clustered with k-means once it holds enough
+    vectors, retrained whenever it doubled in size, and a search only compares the
+    query with the vectors of the `probes` partitions closest to it, an IVF index
+    trading a little recall for searches that do not grow with the whole index.
+
+    Args:
+        partitions (int): Number of IVF partitions, 0 for brute force searches.
+        probes (int): Number of partitions searched.
+    """
+
+    def __init__(self, partitions: int = 0, probes: int = 1):
+        self.partitions = partitions
+        self.probes = probes
+        self._numpy = load_numpy()
+        # Vectors are stored in slots, reused once their entry is removed
+        self._ids: List[Optional[int]] = []
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._vectors: Any = None
+        self._valid: Any = None
+        self._centroids: Optional[List[List[float]]] = None
+        self._members: List[Set[int]] = []
+        self._partition_of: Dict[int, int] = {}
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, entry_id: int, vector: List[float]) -> None:
+        if entry_id in self._slots:
+            self.remove(entry_id)
+
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = entry_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(entry_id)
+        self._slots[entry_id] = slot
+        self._store(slot, vector)
+
+        if self._centroids is not None:
+            self._assign(slot, vector)
+        if self.partitions and len(self) >= max(
+            self.partitions * MIN_PARTITION_SIZE, 2 * self._trained_size
+        ):
+            self._train()
+
+    def remove(self, entry_id: int) -> None:
+        slot = self._slots.pop(entry_id, None)
+        if slot is None:
+            return
+        self._ids[slot] = None
+        self._free.append(slot)
+        if self._numpy is not None:
+            self._valid[slot] = False
+        else:
+            self._vectors[slot] = None
+        partition = self._partition_of.pop(slot, None)
+        if partition is not None:
+            self._members[partition].discard(slot)
+
+    def search(self, vector: List[float]) -> Tuple[Optional[int], float]:
+        """Return the id of the closest vector and its similarity, or None if empty."""
+        if not self._slots:
+            return None, -1.0
+
+        slots = None
+        if self._centroids is not None:
+            closest = sorted(
+                range(len(self._centroids)),
+                key=lambda i: -self._dot(self._centroids[i], vector),
+            )[: self.probes]
+            slots = [slot for i in closest for slot in self._members[i]]
+            if not slots:
+                return None, -1.0
+
+        numpy = self._numpy
+        if numpy is not None:
+            query = numpy.asarray(vector, dtype=numpy.float32)
+            if slots is None:
+                size = len(self._ids)
+                scores = self._vectors[:size] @ query
+                scores[~self._valid[:size]] = -numpy.inf
+                slot = int(numpy.argmax(scores))
+                return self._ids[slot], float(scores[slot])
+            candidates = numpy.array(slots)
+            scores = self._vectors[candidates] @ query
+            best = int(numpy.argmax(scores))
+            return self._ids[int(candidates[best])], float(scores[best])
+
+        candidates = (
+            slots
+            if slots is not None
+            else [slot for slot in range(len(self._ids)) if self._ids[slot] is not None]
+        )
+        slot = max(candidates, key=lambda slot: self._dot(self._vectors[slot], vector))
+        return self._ids[slot], self._dot(self._vectors[slot], vector)
+
+    def clear(self) -> None:
+        self._ids, self._slots, self._free = [], {}, []
+        self._vectors = self._valid = self._centroids = None
+        self._members, self._partition_of = [], {}
+        self._trained_size = 0
+
+    @staticmethod
+    def _dot(a: List[float], b: List[float]) -> float:
+        return sum(x * y for x, y in zip(a, b))
+
+    def _store(self, slot: int, vector: List[float]) -> None:
+        numpy = self._numpy
+        if numpy is None:
+            if self._vectors is None:
+                self._vectors = []
+            if slot == len(self._vectors):
+                self._vectors.append(vector)
+            else:
+                self._vectors[slot] = vector
+            return
+
+        if self._vectors is None:
+            self._vectors = numpy.zeros((64, len(vector)), dtype=numpy.float32)
+            self._valid = numpy.zeros(64, dtype=bool)
+        elif slot >= len(self._vectors):
+            # Grown by doubling, so adding stays amortized constant time
+            self._vectors = numpy.concatenate(
+                [self._vectors, numpy.zeros_like(self._vectors)]
+            )
+            self._valid = numpy.concatenate([self._valid, numpy.zeros_like(self._valid)])
+        self._vectors[slot] = vector
+        self._valid[slot] = True
+
+    def _vector(self, slot: int) -> List[float]:
+        vector = self._vectors[slot]
+        return vector.tolist() if self._numpy is not None else vector
+
+    def _assign(self, slot: int, vector: List[float]) -> None:
+        partition = max(
+            range(len(self._centroids)),
+            key=lambda i: self._dot(self._centroids[i], vector),
+        )
+        self._members[partition].add(slot)
+        self._partition_of[slot] = partition
+
+    def _train(self) -> None:
+        """Cluster the vectors with spherical k-means and reassign them."""
+        slots = list(self._slots.values())
+        vectors = {slot: self._vector(slot) for slot in slots}
+        # Seeded so the same entries give the same partitions
+        centroids = [
+            vectors[slot] for slot in random.Random(0).sample(slots, self.partitions)
+        ]
+
+        for _ in range(KMEANS_ITERATIONS):
+            sums = [[0.0] * len(centroid) for centroid in centroids]
+            for vector in vectors.values():
+                closest = max(
+                    range(len(centroids)),
+                    key=lambda i: self._dot(centroids[i], vector),
+                )
+                sums[closest] = [x + y for x, y in zip(sums[closest], vector)]
+            centroids = [
+                normalize(total) if any(total) else centroid
+                for total, centroid in zip(sums, centroids)
+            ]
+
+        self._centroids = centroids
+        self._members = [set() for _ in centroids]
+        self._partition_of = {}
+        for slot, vector in vectors.items():
+            self._assign(slot, vector)
+        self._trained_size = len(slots)
+
+
+class SemanticQuery(NamedTuple):
+    """
+    A request to look up: the hash of everything that must match exactly, and the
+    embedding of the message contents that only need to be similar.
+    """
+
+    scope: str
+    vector: List[float]
+
+
+class SemanticCache:
+    """
+    Response cache matching requests by the similarity of their messages, so
+    near-duplicate requests, like greetings worded a little differently, are served
+    the response of the first one.
+
+    The model, system message, chat params, and the roles, tools and tool calls of the
+    input messages must match exactly. The text of the messages is embedded, and a
+    request hits the entry of highest cosine similarity if it reaches `threshold`. A
+    response is reused for requests that differ in their details, a name for instance,
+    so a cache is best used for the nodes whose responses do not depend on them.
+
+    Args:
+        embedder (Optional[Embedder]): Embeds the requests, a HashEmbedder if not set.
+        threshold (float): Minimum cosine similarity of a hit.
+        max_size (int): Maximum number of cached responses, least recently used ones
+            are evicted first.
+        ttl (Optional[float]): Seconds a response stays valid, forever when None.
+        partitions (int): Number of IVF partitions of the index, 0 for brute force.
+        probes (int): Number of IVF partitions searched.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        partitions: int = 0,
+        probes: int = 2,
+    ):
+        self.embedder = embedder or HashEmbedder()
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self.partitions = partitions
+        self.probes = probes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, VectorIndex] = {}
+        self._entries: "OrderedDict[int, Tuple[str, float, List[Message]]]" = (
+            OrderedDict()
+        )
+        self._next_id = 0
+
+    @staticmethod
+    def _split_request(
+        llm: LLM, input_data: List[Message]
+    ) -> Tuple[Optional[str], str]:
+        """Return the scope and the text of a request, or no scope if it has no text."""
+        texts = []
+        messages = []
+        for message in input_data:
+            if isinstance(message.content, str):
+                texts.append(f"{message.role}: {message.content}")
+                messages.append(dump_message(message, exclude=frozenset({"content"})))
+            else:
+                messages.append(dump_message(message))
+        if not texts:
+            return None, ""
+
+        payload = {
+            "model": getattr(llm, "model", None),
+            "system_message": llm.system_message,
+            "messages": messages,
+            "chat_params": llm.chat_params,
+        }
+        serialized = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest(), "\n".join(texts)
+
+    def query(self, llm: LLM, input_data: List[Message]) -> Optional[SemanticQuery]:
+        """Embed a request, returning None if it has no text to compare."""
+        scope, text = self._split_request(llm, input_data)
+        if scope is None:
+            return None
+        return SemanticQuery(scope, self.embedder.embed(text))
+
+    async def a_query(
+        self, llm: LLM, input_data: List[Message]
+    ) -> Optional[SemanticQuery]:
+        """Async version of `query`."""
+        scope, text = self._split_request(llm, input_data)
+        if scope is None:
+            return None
+        return SemanticQuery(scope, await self.embedder.a_embed(text))
+
+    def get(self, query: SemanticQuery) -> Optional[List[Message]]:
+        """Return the response of the most similar request, counting the hit or miss."""
+        messages = None
+        with self._lock:
+            index = self._indexes.get(query.scope)
+            entry_id, similarity = (
+                index.search(query.vector) if index else (None, -1.0)
+            )
+            if entry_id is not None and similarity >= self.threshold:
+                _, stored_at, messages = self._entries[entry_id]
+                if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                    self._remove(entry_id)
+                    messages = None
+                else:
+                    self._entries.move_to_end(entry_id)
+
+            if messages is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if messages is not None:
+            logger.debug(f"Semantic cache hit with similarity {similarity:.3f}")
+        return messages
+
+    def set(self, query: SemanticQuery, messages: List[Message]) -> None:
+        """Cache the response of a request."""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            index = self._indexes.get(query.scope)
+            if index is None:
+                index = self._indexes[query.scope] = VectorIndex(
+                    self.partitions, self.probes
+                )
+            index.add(entry_id, query.vector)
+            self._entries[entry_id] = (query.scope, time.monotonic(), messages)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int) -> None:
+        scope, _, _ = self._entries.pop(entry_id)
+        index = self._indexes[scope]
+        index.remove(entry_id)
+        if not len(index):
+            del self._indexes[scope]
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit and miss counters and the number of cached responses."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "SemanticCache":
+        # A cache is shared by every copy of the command using it
+        return self
@@ -2,10 +2,10 @@ import json
 import os
 import uuid
 
+from function_schema import compiled_llm_function
 from simple_hitl_assistant import SimpleHITLAssistant
 
 from grafi.common.containers.container import container
-from grafi.common.decorators.llm_function import llm_function
 from grafi.common.models.execution_context import ExecutionContext
 from grafi.common.models.message import Message
 from grafi.tools.functions.function_tool import FunctionTool
@@ -17,7 +17,7 @@ api_key = os.getenv("OPENAI_API_KEY")
 
 
 class HumanInfo(FunctionTool):
-    @llm_function
+    @compiled_llm_function
     def request_human_information(self, question_description: str):
         """
         Requests human input for personal information based on a given question description.
@@ -1,23 +1,25 @@
 import os
 
+from base_assistant import BaseAssistant
+from client_registry import DEFAULT_POOL_IDLE_TIMEOUT
+from client_registry import DEFAULT_POOL_SIZE
 from openinference.semconv.trace import OpenInferenceSpanKindValues
+from parallel_event_driven_workflow import ParallelEventDrivenWorkflow
+from pooled_openai_tool import PooledOpenAITool
 from pydantic import Field
 
-from grafi.assistants.assistant import Assistant
 from grafi.common.topics.output_topic import agent_output_topic
 from grafi.common.topics.topic import agent_input_topic
 from grafi.nodes.impl.llm_node import LLMNode
-from grafi.tools.llms.impl.openai_tool import OpenAITool
 from grafi.tools.llms.llm_response_command import LLMResponseCommand
-from grafi.workflows.impl.event_driven_workflow import EventDrivenWorkflow
 
 
-class SimpleLLMAssistant(Assistant):
+class SimpleLLMAssistant(BaseAssistant):
     """
     A simple assistant class that uses OpenAI's language model to process input and generate responses.
 
-    This class sets up a workflow with a single LLM node using OpenAI's API, and provides a method
-    to run input through this workflow.
+    This class sets up a workflow with a single LLM node using OpenAI's API, and provides methods
+    to run input through this workflow, either returning the full response or streaming it.
 
     Attributes:
         api_key (str): The API key for OpenAI. If not provided, it tries to use the OPENAI_API_KEY environment variable.
@@ -33,10 +35,12 @@ class SimpleLLMAssistant(Assistant):
     api_key: str = Field(default_factory=lambda: os.getenv("OPENAI_API_KEY"))
     system_message: str = Field(default=None)
     model: str = Field(default="gpt-4o-mini")
+    pool_size: int = Field(default=DEFAULT_POOL_SIZE)
+    pool_idle_timeout: float = Field(default=DEFAULT_POOL_IDLE_TIMEOUT)
 
-    workflow: EventDrivenWorkflow = None
+    workflow: ParallelEventDrivenWorkflow = None
 
-    class Builder(Assistant.Builder):
+    class Builder(BaseAssistant.Builder):
         """Concrete builder for WorkflowDag."""
 
         def __init__(self):
@@ -57,6 +61,16 @@ class SimpleLLMAssistant(Assistant):
             self._assistant.model = model
             return self
 
+        def pool_size(self, pool_size: int) -> "SimpleLLMAssistant.Builder":
+            self._assistant.pool_size = pool_size
+            return self
+
+        def pool_idle_timeout(
+            self, pool_idle_timeout: float
+        ) -> "SimpleLLMAssistant.Builder":
+            self._assistant.pool_idle_timeout = pool_idle_timeout
+            return self
+
         def build(self) -> "SimpleLLMAssistant":
             self._assistant._construct_workflow()
             return self._assistant
@@ -70,10 +84,12 @@ class SimpleLLMAssistant(Assistant):
             .command(
                 LLMResponseCommand.Builder()
                 .llm(
-                    OpenAITool.Builder()
+                    PooledOpenAITool.Builder()
                     .name("OpenAITool")
                     .api_key(self.api_key)
                     .model(self.model)
+                    .pool_size(self.pool_size)
+                    .pool_idle_timeout(self.pool_idle_timeout)
                     .system_message(self.system_message)
                     .build()
                 )
@@ -85,7 +101,7 @@ class SimpleLLMAssistant(Assistant):
 
         # Create a workflow and add the LLM node
         self.workflow = (
-            EventDrivenWorkflow.Builder()
+            ParallelEventDrivenWorkflow.Builder()
             .name("SimpleLLMWorkflow")
             .node(llm_node)
             .build()
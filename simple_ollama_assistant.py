@@ -1,26 +1,32 @@
+from typing import Optional
+from typing import Union
 
+from base_assistant import BaseAssistant
+from client_registry import DEFAULT_POOL_IDLE_TIMEOUT
+from client_registry import DEFAULT_POOL_SIZE
 from openinference.semconv.trace import OpenInferenceSpanKindValues
+from parallel_event_driven_workflow import ParallelEventDrivenWorkflow
 from pydantic import Field
 
-from grafi.assistants.assistant import Assistant
 from grafi.common.topics.output_topic import agent_output_topic
 from grafi.common.topics.topic import agent_input_topic
 from grafi.nodes.impl.llm_node import LLMNode
-from grafi.tools.llms.impl.ollama_tool import OllamaTool
 from grafi.tools.llms.llm_response_command import LLMResponseCommand
-from grafi.workflows.impl.event_driven_workflow import EventDrivenWorkflow
 
 
-class SimpleOllamaAssistant(Assistant):
+class SimpleOllamaAssistant(BaseAssistant):
     """
     A simple assistant class that uses OpenAI's language model to process input and generate responses.
 
-    This class sets up a workflow with a single LLM node using OpenAI's API, and provides a method
-    to run input through this workflow.
+    This class sets up a workflow with a single LLM node using OpenAI's API, and provides methods
+    to run input through this workflow, either returning the full response or streaming it.
 
     Attributes:
         api_url (str): The API url for Ollama.
         model (str): The name of the OpenAI model to use.
+        keep_alive (Optional[Union[float, str]]): How long Ollama keeps the model loaded after a request.
+        warm_up (bool): Whether building the assistant loads the model, so the first request does not pay for it.
+            Off by default, as it makes `build()` call the Ollama server and wait for the model to load.
         event_store (EventStore): An instance of EventStore to record events during the assistant's operation.
     """
 
@@ -32,8 +38,14 @@ class SimpleOllamaAssistant(Assistant):
     api_url: str = Field(default="http://localhost:11434")
     system_message: str = Field(default=None)
     model: str = Field(default="qwen2.5")
+    pool_size: int = Field(default=DEFAULT_POOL_SIZE)
+    pool_idle_timeout: float = Field(default=DEFAULT_POOL_IDLE_TIMEOUT)
+    keep_alive: Optional[Union[float, str]] = Field(default=None)
+    warm_up: bool = Field(default=False)
 
-    class Builder(Assistant.Builder):
+    workflow: ParallelEventDrivenWorkflow = None
+
+    class Builder(BaseAssistant.Builder):
         """Concrete builder for WorkflowDag."""
 
         def __init__(self):
@@ -56,11 +68,36 @@ class SimpleOllamaAssistant(Assistant):
             self._assistant.model = model
             return self
 
+        def pool_size(self, pool_size: int) -> "SimpleOllamaAssistant.Builder":
+            self._assistant.pool_size = pool_size
+            return self
+
+        def pool_idle_timeout(
+            self, pool_idle_timeout: float
+        ) -> "SimpleOllamaAssistant.Builder":
+            self._assistant.pool_idle_timeout = pool_idle_timeout
+            return self
+
+        def keep_alive(
+            self, keep_alive: Union[float, str]
+        ) -> "SimpleOllamaAssistant.Builder":
+            self._assistant.keep_alive = keep_alive
+            return self
+
+        def warm_up(self, warm_up: bool) -> "SimpleOllamaAssistant.Builder":
+            self._assistant.warm_up = warm_up
+            return self
+
         def build(self) -> "SimpleOllamaAssistant":
             self._assistant._construct_workflow()
+            if self._assistant.warm_up:
+                self._assistant._warm_up()
             return self._assistant
 
     def _construct_workflow(self) -> "SimpleOllamaAssistant":
+        # Imported on the first build, the ollama SDK adds a good part of the import time
+        from pooled_ollama_tool import PooledOllamaTool
+
         # Create an LLM node
         llm_node = (
             LLMNode.Builder()
@@ -69,10 +106,13 @@ class SimpleOllamaAssistant(Assistant):
             .command(
                 LLMResponseCommand.Builder()
                 .llm(
-                    OllamaTool.Builder()
+                    PooledOllamaTool.Builder()
                     .name("UserInputLLM")
                     .api_url(self.api_url)
                     .model(self.model)
+                    .pool_size(self.pool_size)
+                    .pool_idle_timeout(self.pool_idle_timeout)
+                    .keep_alive(self.keep_alive)
                     .system_message(self.system_message)
                     .build()
                 )
@@ -84,10 +124,19 @@ class SimpleOllamaAssistant(Assistant):
 
         # Create a workflow with the input node and the LLM node
         self.workflow = (
-            EventDrivenWorkflow.Builder()
+            ParallelEventDrivenWorkflow.Builder()
             .name("simple_function_call_workflow")
             .node(llm_node)
             .build()
         )
 
         return self
+
+    def _warm_up(self) -> None:
+        from pooled_ollama_tool import PooledOllamaTool
+
+        # Loading a model takes seconds, better paid here than by the first request
+        for node in self.workflow.nodes.values():
+            llm = getattr(node.command, "llm", None)
+            if isinstance(llm, PooledOllamaTool):
+                llm.warm_up()
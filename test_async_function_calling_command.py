@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+from typing import List
+from typing import Optional
+
+import pytest
+from async_function_calling_command import AsyncFunctionCallingCommand
+from mock_assistants import get_execution_context
+from mock_llm_tool import mock_tool_call
+from pydantic import Field
+
+from grafi.common.decorators.llm_function import llm_function
+from grafi.common.models.message import Message
+from grafi.tools.functions.function_tool import FunctionTool
+
+
+class CallRecorder(FunctionTool):
+    """Records the threads the calls run on and how many run at once."""
+
+    delay: float = Field(default=0.0)
+    threads: List[int] = Field(default=[])
+    active: int = Field(default=0)
+    max_active: int = Field(default=0)
+
+    def _enter(self, name: str) -> None:
+        if name == "timeout":
+            raise TimeoutError("The client database timed out")
+        self.threads.append(threading.get_ident())
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+
+    def _exit(self, name: str, email: str) -> str:
+        self.active -= 1
+        return f"User {name}, email {email} has been registered."
+
+
+class AsyncRegisterClient(CallRecorder):
+    @llm_function
+    async def register_client(self, name: str, email: str):
+        """Registers a user based on their name and email."""
+        self._enter(name)
+        await asyncio.sleep(self.delay)
+        return self._exit(name, email)
+
+
+class BlockingRegisterClient(CallRecorder):
+    @llm_function
+    def register_client(self, name: str, email: str):
+        """Registers a user based on their name and email."""
+        self._enter(name)
+        time.sleep(self.delay)
+        return self._exit(name, email)
+
+
+def command(
+    function_tool: CallRecorder,
+    timeout: Optional[float] = None,
+    max_concurrency: Optional[int] = None,
+) -> AsyncFunctionCallingCommand:
+    builder = AsyncFunctionCallingCommand.Builder().function_tool(function_tool)
+    if timeout is not None:
+        builder.timeout(timeout)
+    if max_concurrency is not None:
+        builder.max_concurrency(max_concurrency)
+    return builder.build()
+
+
+def registrations(*names: str) -> Message:
+    """An assistant message calling register_client once per name."""
+    return Message(
+        role="assistant",
+        tool_calls=[
+            tool_call
+            for name in names
+            for tool_call in mock_tool_call(
+                "register_client", {"name": name, "email": f"{name}@binome.dev"}
+            ).tool_calls
+        ],
+    )
+
+
+async def a_execute(command: AsyncFunctionCallingCommand, input_data: Message):
+    return [
+        message
+        async for messages in command.a_execute(get_execution_context(), input_data)
+        for message in messages
+    ]
+
+
+def test_async_function_awaited_on_the_loop():
+    function_tool = AsyncRegisterClient()
+    input_data = registrations("ann", "bob", "eve")
+
+    async def run():
+        return threading.get_ident(), await a_execute(
+            command(function_tool), input_data
+        )
+
+    loop_thread, output = asyncio.run(run())
+
+    # The calls run concurrently and are returned in the order they were made
+    assert [message.content for message in output] == [
+        f"User {name}, email {name}@binome.dev has been registered."
+        for name in ("ann", "bob", "eve")
+    ]
+    assert [message.tool_call_id for message in output] == [
+        tool_call.id for tool_call in input_data.tool_calls
+    ]
+    assert function_tool.threads == [loop_thread] * 3
+
+
+def test_blocking_function_runs_off_the_loop():
+    function_tool = BlockingRegisterClient()
+
+    async def run():
+        return threading.get_ident(), await a_execute(
+            command(function_tool), registrations("ann")
+        )
+
+    loop_thread, output = asyncio.run(run())
+
+    assert [message.content for message in output] == [
+        "User ann, email ann@binome.dev has been registered."
+    ]
+    assert loop_thread not in function_tool.threads
+
+
+@pytest.mark.parametrize("tool_class", [AsyncRegisterClient, BlockingRegisterClient])
+def test_sync_execute(tool_class):
+    function_tool = tool_class()
+
+    output = command(function_tool).execute(
+        get_execution_context(), registrations("ann", "bob")
+    )
+
+    assert [message.content for message in output] == [
+        "User ann, email ann@binome.dev has been registered.",
+        "User bob, email bob@binome.dev has been registered.",
+    ]
+    assert threading.get_ident() not in function_tool.threads
+
+
+@pytest.mark.parametrize("tool_class", [AsyncRegisterClient, BlockingRegisterClient])
+def test_timeout(tool_class):
+    slow_command = command(tool_class(delay=0.5), timeout=0.01)
+
+    with pytest.raises(TimeoutError, match="did not return within 0.01 seconds"):
+        asyncio.run(a_execute(slow_command, registrations("ann")))
+    with pytest.raises(TimeoutError, match="did not return within 0.01 seconds"):
+        slow_command.execute(get_execution_context(), registrations("ann"))
+
+
+@pytest.mark.parametrize("tool_class", [AsyncRegisterClient, BlockingRegisterClient])
+def test_function_timeout_error_raised_as_is(tool_class):
+    # Raised by the function well within the timeout of the call
+    failing_command = command(tool_class(), timeout=10)
+
+    with pytest.raises(TimeoutError, match="The client database timed out"):
+        asyncio.run(a_execute(failing_command, registrations("timeout")))
+    with pytest.raises(TimeoutError, match="The client database timed out"):
+        failing_command.execute(get_execution_context(), registrations("timeout"))
+
+
+@pytest.mark.parametrize("tool_class", [AsyncRegisterClient, BlockingRegisterClient])
+def test_max_concurrency(tool_class):
+    function_tool = tool_class(delay=0.02)
+    limited_command = command(function_tool, max_concurrency=2)
+
+    output = asyncio.run(
+        a_execute(limited_command, registrations("a", "b", "c", "d", "e"))
+    )
+
+    assert len(output) == 5
+    assert function_tool.max_active == 2
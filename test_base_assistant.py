@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from mock_assistants import REGISTERED_RESPONSE
+from mock_assistants import SIMPLE_LLM_RESPONSE
+from mock_assistants import get_execution_context
+from mock_assistants import kyc_assistant
+from mock_assistants import simple_llm_assistant
+
+from grafi.common.containers.container import container
+from grafi.common.models.message import Message
+
+
+@pytest.fixture(autouse=True)
+def event_store():
+    container.event_store.clear_events()
+    yield container.event_store
+    container.event_store.clear_events()
+
+
+def registration_requests(count: int):
+    return [
+        (
+            get_execution_context(),
+            [Message(role="user", content=f"Client {index}, client{index}@binome.dev")],
+        )
+        for index in range(count)
+    ]
+
+
+def test_a_execute_many():
+    assistant = kyc_assistant()
+
+    results = asyncio.run(
+        assistant.a_execute_many(registration_requests(5), max_concurrency=2)
+    )
+
+    assert [[message.content for message in output] for output in results] == [
+        [REGISTERED_RESPONSE]
+    ] * 5
+
+
+def test_a_execute_many_timeout():
+    assistant = simple_llm_assistant()
+    assistant.workflow.nodes["OpenAINode"].command.llm.latency = 1.0
+
+    results = asyncio.run(
+        assistant.a_execute_many(
+            [(get_execution_context(), [Message(role="user", content="Hello")])],
+            timeout=0.01,
+        )
+    )
+
+    assert len(results) == 1
+    assert isinstance(results[0], asyncio.TimeoutError)
+
+
+def test_assistants_sharing_module_topics():
+    # Both workflows use the module level agent input and output topics, whose publish
+    # handlers point at the workflow built last
+    kyc = kyc_assistant()
+    simple = simple_llm_assistant()
+
+    results = asyncio.run(kyc.a_execute_many(registration_requests(3)))
+    assert [[message.content for message in output] for output in results] == [
+        [REGISTERED_RESPONSE]
+    ] * 3
+
+    output = kyc.execute(*registration_requests(1)[0])
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+
+    output = simple.execute(
+        get_execution_context(), [Message(role="user", content="Hello")]
+    )
+    assert [message.content for message in output] == [SIMPLE_LLM_RESPONSE]
+
+    results = asyncio.run(
+        simple.a_execute_many(
+            [(get_execution_context(), [Message(role="user", content="Hello")])]
+        )
+    )
+    assert [[message.content for message in output] for output in results] == [
+        [SIMPLE_LLM_RESPONSE]
+    ]
+
+
+async def collect_stream(assistant, input_data):
+    return [
+        message
+        async for message in assistant.a_stream(get_execution_context(), input_data)
+    ]
+
+
+def test_a_stream():
+    assistant = simple_llm_assistant()
+
+    deltas = asyncio.run(
+        collect_stream(assistant, [Message(role="user", content="Hello")])
+    )
+
+    # Streamed word by word, every delta carries the id of the published message
+    assert len(deltas) == len(SIMPLE_LLM_RESPONSE.split(" "))
+    assert "".join(delta.content for delta in deltas) == SIMPLE_LLM_RESPONSE
+    assert len({delta.message_id for delta in deltas}) == 1
+
+
+def test_a_stream_kyc_registration():
+    assistant = kyc_assistant()
+
+    deltas = asyncio.run(
+        collect_stream(
+            assistant, [Message(role="user", content="Craig Li, craig@binome.dev")]
+        )
+    )
+
+    assert "".join(delta.content for delta in deltas) == REGISTERED_RESPONSE
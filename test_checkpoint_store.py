@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from checkpoint_store import InMemoryCheckpointStore
+from checkpoint_store import SQLiteCheckpointStore
+from loguru import logger
+from mock_assistants import REGISTERED_RESPONSE
+from mock_assistants import get_execution_context
+from mock_assistants import kyc_assistant
+
+from grafi.common.containers.container import container
+from grafi.common.models.message import Message
+
+
+@pytest.fixture(autouse=True)
+def event_store():
+    container.event_store.clear_events()
+    yield container.event_store
+    container.event_store.clear_events()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryCheckpointStore()
+    return SQLiteCheckpointStore(str(tmp_path / "checkpoints.db"))
+
+
+@pytest.fixture
+def warnings():
+    messages = []
+    handler_id = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(handler_id)
+
+
+CHECKPOINT = {"agent_input_topic": {"length": 1, "consumption_offsets": {"A": 1}}}
+
+
+def test_save_and_pop(store):
+    store.save("request", CHECKPOINT)
+
+    assert store.pop("request") == CHECKPOINT
+    # A checkpoint is resumed once
+    assert store.pop("request") is None
+
+
+def test_save_replaces(store):
+    store.save("request", {"turn": 1})
+    store.save("request", {"turn": 2})
+
+    assert store.pop("request") == {"turn": 2}
+
+
+def test_delete(store):
+    store.save("request", CHECKPOINT)
+    store.save("other", CHECKPOINT)
+
+    store.delete("request")
+    store.delete("missing")
+
+    assert store.pop("request") is None
+    assert store.pop("other") == CHECKPOINT
+
+
+def test_sqlite_store_shared_by_connections(tmp_path):
+    SQLiteCheckpointStore(str(tmp_path / "checkpoints.db")).save("request", CHECKPOINT)
+
+    assert SQLiteCheckpointStore(str(tmp_path / "checkpoints.db")).pop("request") == (
+        CHECKPOINT
+    )
+
+
+def start_registration(assistant, execution_context):
+    output = assistant.execute(
+        execution_context,
+        [Message(role="user", content="Hello, I want to register the gym.")],
+    )
+    assert [json.loads(message.content) for message in output] == [
+        {"question_description": "name and email"}
+    ]
+
+
+def test_resume_on_another_worker(store, warnings):
+    execution_context = get_execution_context()
+    worker = kyc_assistant()
+    worker.workflow.checkpoint_store = store
+
+    start_registration(worker, execution_context)
+
+    # The request waits for the human reply, its topics are released
+    assert all(not topic.topic_events for topic in worker.workflow.topics.values())
+
+    other_worker = kyc_assistant()
+    other_worker.workflow.checkpoint_store = store
+    output = other_worker.execute(
+        execution_context, [Message(role="user", content="Craig Li, craig@binome.dev")]
+    )
+
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+    assert store.pop(execution_context.assistant_request_id) is None
+    assert warnings == []
+
+
+def test_resume_without_history_warns(store, warnings, event_store):
+    execution_context = get_execution_context()
+    assistant = kyc_assistant()
+    assistant.workflow.checkpoint_store = store
+
+    start_registration(assistant, execution_context)
+    # As seen by a worker with its own in-memory event store
+    event_store.clear_events()
+    assistant.execute(
+        execution_context, [Message(role="user", content="Craig Li, craig@binome.dev")]
+    )
+
+    assert len(warnings) == 1
+    assert "without its history" in warnings[0]
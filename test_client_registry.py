@@ -0,0 +1,124 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import client_registry as client_registry_module
+import pytest
+from client_registry import client_registry
+from client_registry import http2_available
+from loguru import logger
+
+
+OPENAI_URL = "http://127.0.0.1:1/v1"
+OLLAMA_URL = "http://127.0.0.1:2"
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    client_registry.close()
+    yield client_registry
+    client_registry.close()
+
+
+@pytest.fixture
+def warnings():
+    messages = []
+    handler_id = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(handler_id)
+
+
+def test_same_endpoint_and_key_share_a_client(registry):
+    client = registry.openai_client("key", OPENAI_URL)
+
+    assert registry.openai_client("key", OPENAI_URL) is client
+    assert registry.openai_client("other key", OPENAI_URL) is not client
+    assert registry.openai_client("key", "http://127.0.0.1:3/v1") is not client
+    assert registry.ollama_client(OLLAMA_URL) is registry.ollama_client(OLLAMA_URL)
+
+
+def test_pool_settings_get_their_own_client(registry):
+    client = registry.openai_client("key", OPENAI_URL)
+
+    assert registry.openai_client("key", OPENAI_URL, pool_size=10) is not client
+    assert registry.openai_client("key", OPENAI_URL, pool_idle_timeout=5) is not client
+    assert registry.ollama_client(OLLAMA_URL, pool_size=10) is not (
+        registry.ollama_client(OLLAMA_URL)
+    )
+
+
+def test_clients_leave_retries_to_the_rate_limiter(registry):
+    assert registry.openai_client("key", OPENAI_URL).max_retries == 0
+
+
+def test_async_clients_kept_per_event_loop(registry):
+    async def clients():
+        return (
+            registry.async_openai_client("key", OPENAI_URL),
+            registry.async_openai_client("key", OPENAI_URL),
+            registry.async_ollama_client(OLLAMA_URL),
+        )
+
+    openai_client, same_client, ollama_client = asyncio.run(clients())
+    other_loop_client, _, other_ollama_client = asyncio.run(clients())
+
+    assert same_client is openai_client
+    assert other_loop_client is not openai_client
+    assert other_ollama_client is not ollama_client
+
+
+def test_close(registry):
+    openai_client = registry.openai_client("key", OPENAI_URL)
+    ollama_client = registry.ollama_client(OLLAMA_URL)
+
+    registry.close()
+
+    assert openai_client._client.is_closed
+    assert ollama_client._client.is_closed
+    assert registry.openai_client("key", OPENAI_URL) is not openai_client
+
+
+def test_a_close(registry):
+    async def run():
+        openai_client = registry.async_openai_client("key", OPENAI_URL)
+        ollama_client = registry.async_ollama_client(OLLAMA_URL)
+        await registry.a_close()
+        return (
+            openai_client,
+            ollama_client,
+            registry.async_openai_client("key", OPENAI_URL),
+        )
+
+    openai_client, ollama_client, new_client = asyncio.run(run())
+
+    assert openai_client._client.is_closed
+    assert ollama_client._client.is_closed
+    assert new_client is not openai_client
+
+
+def test_no_h2_warning_on_import():
+    result = subprocess.run(
+        [sys.executable, "-c", "import client_registry, pooled_openai_tool"],
+        cwd=os.path.dirname(os.path.abspath(client_registry_module.__file__)),
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "h2" not in result.stderr
+
+
+def test_h2_checked_once_on_the_first_client(registry, warnings, monkeypatch):
+    monkeypatch.setattr(
+        client_registry_module.importlib.util, "find_spec", lambda name: None
+    )
+    http2_available.cache_clear()
+    try:
+        registry.openai_client("key", OPENAI_URL)
+        registry.openai_client("other key", OPENAI_URL)
+    finally:
+        http2_available.cache_clear()
+
+    assert len(warnings) == 1
+    assert warnings[0].startswith("`h2` not installed")
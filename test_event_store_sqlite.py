@@ -0,0 +1,121 @@
+import json
+
+import pytest
+from event_store_sqlite import EventStoreSQLite
+from mock_assistants import get_execution_context
+from mock_assistants import kyc_assistant
+
+from grafi.common.containers.container import container
+from grafi.common.models.message import Message
+
+
+@pytest.fixture(scope="module")
+def recorded_events():
+    """The events of two KYC registrations, recorded by the in-memory store."""
+    container.event_store.clear_events()
+    assistant = kyc_assistant()
+    for content in ("Craig Li, craig@binome.dev", "Ann Wu, ann@binome.dev"):
+        assistant.execute(
+            get_execution_context(), [Message(role="user", content=content)]
+        )
+    events = container.event_store.get_events()
+    container.event_store.clear_events()
+    return events
+
+
+def parsed(value):
+    if isinstance(value, dict):
+        return {key: parsed(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [parsed(item) for item in value]
+    if isinstance(value, str) and value[:1] in ("[", "{"):
+        return parsed(json.loads(value))
+    return value
+
+
+def normalized(event):
+    """The event as a dict, with the JSON in it parsed, as key order may vary."""
+    return parsed(event.to_dict())
+
+
+@pytest.fixture
+def store(tmp_path, recorded_events):
+    store = EventStoreSQLite(str(tmp_path / "events.db"))
+    store.record_events(recorded_events)
+    return store
+
+
+def test_wal_mode(store):
+    (journal_mode,) = store._connection.execute("PRAGMA journal_mode").fetchone()
+    assert journal_mode == "wal"
+
+
+def test_round_trip(store, recorded_events):
+    events = store.get_events()
+
+    assert [normalized(event) for event in events] == [
+        normalized(event) for event in recorded_events
+    ]
+    assert normalized(store.get_event(recorded_events[3].event_id)) == normalized(
+        recorded_events[3]
+    )
+    assert store.get_event("missing") is None
+
+
+def test_persists_across_connections(tmp_path, store, recorded_events):
+    reopened = EventStoreSQLite(str(tmp_path / "events.db"))
+
+    assert len(reopened.get_events()) == len(recorded_events)
+
+
+def test_lookups(store, recorded_events):
+    conversation_id = recorded_events[0].execution_context.conversation_id
+    request_id = recorded_events[0].execution_context.assistant_request_id
+
+    conversation_events = store.get_conversation_events(conversation_id)
+    assert [event.event_id for event in conversation_events] == [
+        event.event_id
+        for event in recorded_events
+        if event.execution_context.conversation_id == conversation_id
+    ]
+    assert [event.event_id for event in store.get_agent_events(request_id)] == [
+        event.event_id
+        for event in recorded_events
+        if event.execution_context.assistant_request_id == request_id
+    ]
+
+    topic_events = store.get_topic_events("agent_input_topic", conversation_id)
+    assert topic_events
+    assert all(
+        event.topic_name == "agent_input_topic"
+        and event.execution_context.conversation_id == conversation_id
+        for event in topic_events
+    )
+    assert len(store.get_topic_events("agent_input_topic")) > len(topic_events)
+
+
+@pytest.mark.parametrize(
+    "where, index",
+    [
+        ("conversation_id = 'c'", "idx_events_conversation_id"),
+        ("assistant_request_id = 'r'", "idx_events_assistant_request_id"),
+        ("topic_name = 't' AND conversation_id = 'c'", "idx_events_topic_name"),
+    ],
+)
+def test_lookups_use_indexes(store, where, index):
+    plan = store._connection.execute(
+        f"EXPLAIN QUERY PLAN SELECT payload FROM events WHERE {where} ORDER BY id"
+    ).fetchall()
+
+    assert any(index in row[-1] for row in plan)
+
+
+def test_delete_conversation_events(store, recorded_events):
+    conversation_id = recorded_events[0].execution_context.conversation_id
+
+    store.delete_conversation_events(conversation_id)
+
+    assert store.get_conversation_events(conversation_id) == []
+    assert store.get_events()
+    store.clear_events()
+    assert store.get_events() == []
@@ -0,0 +1,73 @@
+import copy
+import json
+import pickle
+
+import pytest
+from function_schema import CompiledFunctionSpec
+from function_schema import serialize_tool
+from function_schema import tools_hash
+from function_schema import tools_json
+from kyc import ClientInfo
+from kyc import RegisterClient
+
+from grafi.common.models.function_spec import FunctionSpec
+
+
+SPEC = ClientInfo().function_specs
+OTHER_SPEC = RegisterClient().function_specs
+
+
+def plain_tool(spec: CompiledFunctionSpec) -> dict:
+    return FunctionSpec(**spec.model_dump()).to_openai_tool()
+
+
+def test_compiled_tool_matches_the_built_one():
+    assert isinstance(SPEC, CompiledFunctionSpec)
+    assert SPEC.to_openai_tool() == plain_tool(SPEC)
+    assert json.loads(SPEC.tool_json) == plain_tool(SPEC)
+
+
+def test_compiled_tool_is_shared_and_read_only():
+    tool = SPEC.to_openai_tool()
+    assert OTHER_SPEC.to_openai_tool() is not tool
+    assert SPEC.to_openai_tool() is tool
+
+    with pytest.raises(TypeError, match="read-only"):
+        tool["type"] = "other"
+    with pytest.raises(TypeError, match="read-only"):
+        tool["function"]["name"] = "other"
+    with pytest.raises(TypeError, match="read-only"):
+        tool["function"]["parameters"]["required"].append("other")
+    with pytest.raises(TypeError, match="read-only"):
+        tool.update(type="other")
+    assert tool == plain_tool(SPEC)
+
+
+def test_copies_of_compiled_tools():
+    tool = SPEC.to_openai_tool()
+
+    assert copy.deepcopy(tool) is tool
+    # Built copies are plain, so they can be changed
+    changed = dict(tool)
+    changed["type"] = "other"
+    assert tool["type"] == "function"
+    unpickled = pickle.loads(pickle.dumps(tool))
+    assert type(unpickled) is dict
+    assert unpickled == tool
+
+
+def test_compile_is_idempotent():
+    assert CompiledFunctionSpec.compile(SPEC) is SPEC
+    assert copy.deepcopy(SPEC) is SPEC
+
+
+def test_tools_json_reuses_the_compiled_serialization():
+    tools = [SPEC.to_openai_tool(), OTHER_SPEC.to_openai_tool()]
+    plain_tools = [plain_tool(SPEC), plain_tool(OTHER_SPEC)]
+
+    assert tools_json(tools) == (
+        b"[" + SPEC.tool_json + b"," + OTHER_SPEC.tool_json + b"]"
+    )
+    assert tools_json(tools) == tools_json(plain_tools)
+    assert tools_hash(tools) == tools_hash(plain_tools)
+    assert serialize_tool(tools[0]) == SPEC.tool_json
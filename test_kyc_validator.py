@@ -0,0 +1,116 @@
+import pytest
+from kyc_validator import find_cued_name
+from kyc_validator import find_full_name
+from kyc_validator import validate_client_info
+
+from grafi.common.models.message import Message
+
+
+def validate(*contents: str) -> str:
+    return validate_client_info(
+        [Message(role="user", content=content) for content in contents]
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "Craig Li, craig@binome.dev",
+        "My name is Craig Li and my email is craig@binome.dev.",
+        "Craig Li <Craig.Li+gym@mail.binome.dev>",
+        "José Álvarez-Núñez (jose@example.es)",
+        "Иван Петров, ivan@example.ru",
+        "Seán O'Brien; sean@example.ie",
+        "Name: Craig Li, email: craig@binome.dev",
+        "Hi, I'm Craig Li. Email craig@binome.dev",
+    ],
+)
+def test_valid(content):
+    assert validate(content) == "Valid"
+
+
+@pytest.mark.parametrize(
+    "content, answer",
+    [
+        ("Hello, I want to register.", "Invalid - Full name and email are missing"),
+        ("craig li", "Invalid - Full name and email are missing"),
+        ("Craig Li", "Invalid - Email is missing"),
+        ("I am Craig Li, no email", "Invalid - Email is missing"),
+    ],
+)
+def test_missing_email(content, answer):
+    assert validate(content) == answer
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        # Malformed email
+        "Craig Li, craig@binome",
+        # Email on its own
+        "craig@binome.dev",
+        # Lowercase name
+        "craig li, craig@binome.dev",
+        # Placeholder name
+        "John Doe, john@doe.com",
+        # The capitalized words are in different sentences
+        "I am Craig. Li is my colleague, craig@binome.dev",
+        # Capitalized words that are not a name
+        "Hi There, my email is bob@example.com",
+        "Please Register me: bob@example.com",
+        "I want to Sign Up with bob@example.com",
+        "New York bob@example.com",
+        # A name away from any cue
+        "Craig Li wants to register, his email is craig@binome.dev",
+    ],
+)
+def test_left_to_the_llm(content):
+    assert validate(content) is None
+
+
+def test_name_and_email_in_separate_messages():
+    assert validate("Craig Li", "craig@binome.dev") == "Valid"
+
+
+def test_only_user_messages_are_checked():
+    input_data = [
+        Message(role="assistant", content="Please send your name, e.g. Craig Li"),
+        Message(role="user", content="craig@binome.dev"),
+    ]
+
+    assert validate_client_info(input_data) is None
+
+
+@pytest.mark.parametrize(
+    "text, full_name",
+    [
+        ("My name is Craig Li", "Craig Li"),
+        ("Jean-Luc Picard, captain", "Jean-Luc Picard"),
+        ("D'Angelo Russell", "D'Angelo Russell"),
+        # The email is not part of the name
+        ("Craig Li craig@binome.dev Ann", "Craig Li"),
+        ("Craig Li2", None),
+        ("Craig J Li", None),
+        ("Craig", None),
+        ("Hi There Craig Li", "Craig Li"),
+        ("New York", None),
+    ],
+)
+def test_find_full_name(text, full_name):
+    assert find_full_name(text) == full_name
+
+
+@pytest.mark.parametrize(
+    "text, full_name",
+    [
+        ("My name is Craig Li and I live here", "Craig Li"),
+        ("i am Craig Li", "Craig Li"),
+        ("This is Craig Li, craig@binome.dev", "Craig Li"),
+        ("Craig Li <craig@binome.dev>", "Craig Li"),
+        ("Craig Li", None),
+        ("I am Craig, craig@binome.dev", None),
+        ("Hello There craig@binome.dev", None),
+    ],
+)
+def test_find_cued_name(text, full_name):
+    assert find_cued_name(text) == full_name
@@ -0,0 +1,120 @@
+from typing import List
+
+from kyc import ClientInfo
+from kyc import RegisterClient
+from kyc_assistant import KycAssistant
+from managed_llm_node import SUMMARY_PREFIX
+from managed_llm_node import ManagedLLMNode
+from mock_assistants import get_execution_context
+from mock_llm_tool import MockLLMTool
+from response_cache import InMemoryResponseCache
+
+from grafi.common.models.message import Message
+from grafi.common.topics.topic import agent_input_topic
+from grafi.tools.llms.llm_response_command import LLMResponseCommand
+
+
+def count_tokens(message: Message) -> int:
+    """One token per message, so budgets count messages."""
+    return 1
+
+
+def managed_node(**params) -> ManagedLLMNode:
+    node = (
+        ManagedLLMNode.Builder()
+        .name("ThoughtNode")
+        .subscribe(agent_input_topic)
+        .command(
+            LLMResponseCommand.Builder()
+            .llm(MockLLMTool(name="ThoughtLLM", responses=["Valid"]))
+            .build()
+        )
+        .token_counter(count_tokens)
+        .build()
+    )
+    for name, value in params.items():
+        setattr(node, name, value)
+    return node
+
+
+def conversation(length: int) -> List[Message]:
+    return [
+        Message(role="user" if index % 2 == 0 else "assistant", content=f"m{index}")
+        for index in range(length)
+    ]
+
+
+def test_history_within_budget_is_sent_as_is():
+    node = managed_node(max_prompt_tokens=10)
+    messages = conversation(5)
+
+    assert node._compact(get_execution_context(), messages) == messages
+
+
+def test_history_over_budget_is_truncated():
+    node = managed_node(max_prompt_tokens=3)
+    messages = conversation(5)
+
+    assert node._compact(get_execution_context(), messages) == messages[-3:]
+
+
+def test_recent_messages_kept_over_budget():
+    node = managed_node(max_prompt_tokens=1, min_recent_messages=2)
+    messages = conversation(5)
+
+    assert node._compact(get_execution_context(), messages) == messages[-2:]
+
+
+def test_summary_is_cached_and_extended():
+    requests: List[str] = []
+
+    def summarize(input_data: List[Message]) -> str:
+        requests.append(input_data[-1].content)
+        return f"summary {len(requests)}"
+
+    node = managed_node(
+        max_prompt_tokens=4,
+        summary_max_tokens=1,
+        summarizer=MockLLMTool(responses=[summarize]),
+    )
+    execution_context = get_execution_context()
+    messages = conversation(8)
+
+    compacted = node._compact(execution_context, messages[:6])
+    assert [message.content for message in compacted] == [
+        SUMMARY_PREFIX + "summary 1",
+        "m3",
+        "m4",
+        "m5",
+    ]
+
+    # Two turns later only the messages that left the budget since are summarized
+    compacted = node._compact(execution_context, messages)
+    assert compacted[0].content == SUMMARY_PREFIX + "summary 2"
+    assert "summary 1" in requests[1]
+    assert "m0" not in requests[1]
+    assert "m4" in requests[1]
+
+    # The same history is served from the cache
+    node._compact(execution_context, messages)
+    assert len(requests) == 2
+
+
+def test_kyc_summaries_have_their_own_cache():
+    response_cache = InMemoryResponseCache()
+    assistant = (
+        KycAssistant.Builder()
+        .api_key("mock")
+        .hitl_request(ClientInfo(name="request_human_information"))
+        .register_request(RegisterClient(name="register_client"))
+        .response_cache(response_cache)
+        .build()
+    )
+
+    summary_caches = {
+        id(node.summary_cache)
+        for node in assistant.workflow.nodes.values()
+        if isinstance(node, ManagedLLMNode)
+    }
+    assert len(summary_caches) == 1
+    assert id(response_cache) not in summary_caches
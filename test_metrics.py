@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+from metrics import MetricsRegistry
+from metrics import current_node
+from metrics import llm_completion_tokens
+from metrics import llm_prompt_tokens
+from metrics import metrics
+from metrics import node_duration
+from metrics import node_queue_wait
+from metrics import record_node
+from metrics import record_tokens
+from metrics import record_tool
+from metrics import tool_duration
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def recorded():
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+def test_counter(registry):
+    counter = registry.counter("requests_total", "Requests.", ("tool", "result"))
+
+    counter.inc(tool="llm", result="hit")
+    counter.inc(2, tool="llm", result="hit")
+    counter.inc(tool="llm", result="miss")
+
+    assert counter.value(tool="llm", result="hit") == 3
+    assert counter.value(tool="llm", result="miss") == 1
+    assert counter.value(tool="other", result="hit") == 0
+    assert registry.counter("requests_total", "Requests.") is counter
+
+
+def test_metric_type_conflict(registry):
+    registry.counter("requests_total", "Requests.")
+
+    with pytest.raises(ValueError, match="already a counter"):
+        registry.histogram("requests_total", "Requests.")
+
+
+def test_histogram_buckets(registry):
+    histogram = registry.histogram("duration", "Duration.", buckets=(1.0, 2.0, 4.0))
+
+    for value in (0.5, 1.0, 1.5, 3.0, 10.0):
+        histogram.observe(value)
+
+    # Each value counted in the first bucket it fits, +Inf last
+    assert histogram._series[()][0] == [2, 1, 1, 1]
+    assert histogram.count() == 5
+    assert histogram.sum() == 16.0
+
+
+def test_histogram_quantile(registry):
+    histogram = registry.histogram("duration", "Duration.", buckets=(1.0, 2.0, 4.0))
+    assert histogram.quantile(0.5) is None
+
+    for value in (0.5, 0.5, 1.5, 1.5):
+        histogram.observe(value)
+
+    # Interpolated linearly inside the bucket of the rank
+    assert histogram.quantile(0.25) == 0.5
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.75) == 1.5
+    assert histogram.quantile(1.0) == 2.0
+
+    histogram.observe(100.0)
+    assert histogram.quantile(1.0) == 4.0
+
+
+def test_histogram_summary(registry):
+    histogram = registry.histogram("duration", "Duration.", ("node",), buckets=(1.0,))
+    histogram.observe(0.5, node="A")
+    histogram.observe(0.5, node="A")
+
+    assert histogram.summary() == {
+        ("A",): {"count": 2, "mean": 0.5, "p50": 0.5, "p90": 0.9, "p99": 0.99}
+    }
+
+
+def test_prometheus_text(registry):
+    counter = registry.counter("tokens_total", "Tokens.", ("model",))
+    histogram = registry.histogram(
+        "duration_seconds", "Duration.", ("node",), buckets=(0.5, 1.0)
+    )
+    counter.inc(12345678, model='gpt "4o"')
+    counter.inc(0.1, model="mini")
+    histogram.observe(0.25, node="A")
+    histogram.observe(2.0, node="A")
+
+    assert registry.render_prometheus() == (
+        "# HELP tokens_total Tokens.\n"
+        "# TYPE tokens_total counter\n"
+        'tokens_total{model="gpt \\"4o\\""} 12345678.0\n'
+        'tokens_total{model="mini"} 0.1\n'
+        "# HELP duration_seconds Duration.\n"
+        "# TYPE duration_seconds histogram\n"
+        'duration_seconds_bucket{node="A",le="0.5"} 1\n'
+        'duration_seconds_bucket{node="A",le="1"} 1\n'
+        'duration_seconds_bucket{node="A",le="+Inf"} 2\n'
+        'duration_seconds_sum{node="A"} 2.25\n'
+        'duration_seconds_count{node="A"} 2\n'
+    )
+
+
+def test_large_values_keep_every_digit(registry):
+    counter = registry.counter("tokens_total", "Tokens.")
+    counter.inc(123456789012)
+    counter.inc(1)
+
+    assert counter.render()[-1] == "tokens_total 123456789013.0"
+
+
+def test_reset_keeps_the_metrics(registry):
+    counter = registry.counter("tokens_total", "Tokens.")
+    counter.inc(5)
+
+    registry.reset()
+
+    assert registry.get("tokens_total") is counter
+    assert counter.value() == 0
+    assert counter.render() == [
+        "# HELP tokens_total Tokens.",
+        "# TYPE tokens_total counter",
+    ]
+
+
+def test_record_node(recorded):
+    with record_node("ThoughtNode", ready_at=0.0):
+        assert current_node() == "ThoughtNode"
+        with record_tool("ThoughtLLM"):
+            pass
+        record_tokens("ThoughtLLM", "gpt-4o", 120, 30)
+    assert current_node() == ""
+
+    assert node_duration.count(node="ThoughtNode") == 1
+    assert node_queue_wait.count(node="ThoughtNode") == 1
+    assert tool_duration.count(node="ThoughtNode", tool="ThoughtLLM") == 1
+    labels = {"node": "ThoughtNode", "tool": "ThoughtLLM", "model": "gpt-4o"}
+    assert llm_prompt_tokens.value(**labels) == 120
+    assert llm_completion_tokens.value(**labels) == 30
+
+
+def test_record_node_without_ready_at(recorded):
+    with record_node("ThoughtNode"):
+        pass
+
+    assert node_duration.count(node="ThoughtNode") == 1
+    assert node_queue_wait.count(node="ThoughtNode") == 0
+
+
+def test_missing_token_counts(recorded):
+    record_tokens("ThoughtLLM", "gpt-4o", None, None)
+
+    # Counted as zero, outside of any node
+    assert llm_prompt_tokens.render()[2:] == [
+        'grafi_llm_prompt_tokens_total{node="",tool="ThoughtLLM",model="gpt-4o"} 0.0'
+    ]
+
+
+def test_node_label_follows_tasks(recorded):
+    async def node(name: str) -> None:
+        with record_node(name):
+            await asyncio.sleep(0)
+            record_tokens("LLM", "model", 1, 0)
+
+    async def run():
+        await asyncio.gather(node("A"), node("B"))
+
+    asyncio.run(run())
+
+    assert llm_prompt_tokens.value(node="A", tool="LLM", model="model") == 1
+    assert llm_prompt_tokens.value(node="B", tool="LLM", model="model") == 1
@@ -0,0 +1,356 @@
+import asyncio
+import json
+import os
+import threading
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import Dict
+from typing import List
+
+import pytest
+from client_registry import client_registry
+from kyc import ClientInfo
+from kyc import RegisterClient
+from mock_assistants import get_execution_context
+from openai_batch_tool import BatchTransport
+from openai_batch_tool import OpenAIBatchTool
+
+from grafi.common.containers.container import container
+from grafi.common.models.message import Message
+
+
+class FakeTransport(BatchTransport):
+    """Answers every request of a batch with its last message, reversed."""
+
+    def __init__(self, fail_submit: bool = False):
+        self.fail_submit = fail_submit
+        self.batch_files: List[str] = []
+        self.lines: List[Dict[str, Any]] = []
+
+    def submit(self, batch_file: str) -> str:
+        self.batch_files.append(batch_file)
+        with open(batch_file) as f:
+            self.lines = [json.loads(line) for line in f]
+        if self.fail_submit:
+            raise ConnectionError("upload failed")
+        return "batch_1"
+
+    def poll(self, batch_id: str) -> str:
+        return "completed"
+
+    def download(self, batch_id: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "custom_id": line["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "id": f"chatcmpl-{line['custom_id']}",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": line["body"]["model"],
+                        "choices": [
+                            {
+                                "index": 0,
+                                "finish_reason": "stop",
+                                "message": {
+                                    "role": "assistant",
+                                    "content": line["body"]["messages"][-1]["content"][
+                                        ::-1
+                                    ],
+                                },
+                            }
+                        ],
+                    },
+                },
+            }
+            for line in self.lines
+        ]
+
+
+class BatchServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the files and batches endpoints of the OpenAI API. A batch is
+    in progress on its first poll and completed on the next, answering every request
+    with its last message reversed, or with an error if that message is "fail".
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), BatchHandler)
+        self.files: Dict[str, str] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.polls: Dict[str, int] = {}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/v1"
+
+    def add_file(self, content: str) -> str:
+        file_id = f"file-{len(self.files) + 1}"
+        self.files[file_id] = content
+        return file_id
+
+    def run_batch(self, batch: Dict[str, Any]) -> None:
+        outputs, errors = [], []
+        for line in self.files[batch["input_file_id"]].splitlines():
+            request = json.loads(line)
+            content = request["body"]["messages"][-1]["content"]
+            if content == "fail":
+                errors.append(
+                    {
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 400,
+                            "body": {"error": {"message": "Invalid request"}},
+                        },
+                    }
+                )
+                continue
+            outputs.append(
+                {
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {
+                            "id": f"chatcmpl-{request['custom_id']}",
+                            "object": "chat.completion",
+                            "created": 0,
+                            "model": request["body"]["model"],
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "finish_reason": "stop",
+                                    "message": {
+                                        "role": "assistant",
+                                        "content": content[::-1],
+                                    },
+                                }
+                            ],
+                        },
+                    },
+                }
+            )
+        batch["status"] = "completed"
+        batch["output_file_id"] = self.add_file(
+            "\n".join(json.dumps(line) for line in outputs)
+        )
+        batch["error_file_id"] = (
+            self.add_file("\n".join(json.dumps(line) for line in errors))
+            if errors
+            else None
+        )
+
+
+class BatchHandler(BaseHTTPRequestHandler):
+    server: BatchServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(self, body: Any) -> None:
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path == "/v1/files":
+            form = BytesParser(policy=default).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+                + self._body()
+            )
+            content = next(
+                part.get_content()
+                for part in form.iter_parts()
+                if part.get_param("name", header="content-disposition") == "file"
+            )
+            if isinstance(content, bytes):
+                content = content.decode()
+            file_id = self.server.add_file(content)
+            self._send(
+                {
+                    "id": file_id,
+                    "object": "file",
+                    "bytes": len(content),
+                    "created_at": 0,
+                    "filename": "batch.jsonl",
+                    "purpose": "batch",
+                    "status": "processed",
+                }
+            )
+        elif self.path == "/v1/batches":
+            request = json.loads(self._body())
+            batch_id = f"batch_{len(self.server.batches) + 1}"
+            batch = self.server.batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": request["endpoint"],
+                "input_file_id": request["input_file_id"],
+                "completion_window": request["completion_window"],
+                "status": "validating",
+                "created_at": 0,
+            }
+            self._send(batch)
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts[:2] == ["v1", "batches"] and len(parts) == 3:
+            batch = self.server.batches[parts[2]]
+            polls = self.server.polls[parts[2]] = self.server.polls.get(parts[2], 0) + 1
+            if polls == 1:
+                batch["status"] = "in_progress"
+            elif batch["status"] == "in_progress":
+                self.server.run_batch(batch)
+            self._send(batch)
+        elif parts[:2] == ["v1", "files"] and parts[3:] == ["content"]:
+            self._send(self.server.files[parts[2]])
+        else:
+            self.send_error(404)
+
+
+@pytest.fixture
+def batch_server():
+    server = BatchServer()
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    client_registry.close()
+
+
+@pytest.fixture(autouse=True)
+def event_store():
+    container.event_store.clear_events()
+    yield container.event_store
+    container.event_store.clear_events()
+
+
+def batch_tool(transport: FakeTransport, batch_dir: str) -> OpenAIBatchTool:
+    return (
+        OpenAIBatchTool.Builder()
+        .api_key("mock")
+        .transport(transport)
+        .batch_dir(batch_dir)
+        .poll_interval(0)
+        .build()
+    )
+
+
+def requests(count: int):
+    return [
+        (get_execution_context(), [Message(role="user", content=f"client {index}")])
+        for index in range(count)
+    ]
+
+
+def test_execute_batch(tmp_path, event_store):
+    transport = FakeTransport()
+    tool = batch_tool(transport, str(tmp_path))
+
+    outputs = tool.execute_batch(requests(3))
+
+    assert [output.content for output in outputs] == [
+        f"client {index}"[::-1] for index in range(3)
+    ]
+    assert [line["custom_id"] for line in transport.lines] == ["0", "1", "2"]
+    assert len(event_store.get_events()) == 6
+
+
+def test_batch_lines_with_tools(tmp_path):
+    transport = FakeTransport()
+    tool = batch_tool(transport, str(tmp_path))
+    tools = [
+        ClientInfo().function_specs.to_openai_tool(),
+        RegisterClient().function_specs.to_openai_tool(),
+    ]
+    message = Message(role="user", content="client 0")
+    message.tools = tools
+
+    tool.submit_batch([(get_execution_context(), [message])] + requests(1))
+
+    assert transport.lines[0]["body"]["tools"] == tools
+    assert transport.lines[0]["body"]["messages"][-1]["content"] == "client 0"
+    assert "tools" not in transport.lines[1]["body"]
+
+
+def test_batch_file_deleted_after_submit(tmp_path):
+    transport = FakeTransport()
+    tool = batch_tool(transport, str(tmp_path))
+
+    tool.submit_batch(requests(2))
+
+    assert len(transport.batch_files) == 1
+    assert not os.path.exists(transport.batch_files[0])
+    assert os.listdir(tmp_path) == []
+
+
+def test_batch_file_deleted_when_submit_fails(tmp_path):
+    tool = batch_tool(FakeTransport(fail_submit=True), str(tmp_path))
+
+    with pytest.raises(ConnectionError):
+        tool.submit_batch(requests(2))
+
+    assert os.listdir(tmp_path) == []
+
+
+def server_batch_tool(batch_server: BatchServer, batch_dir: str) -> OpenAIBatchTool:
+    return (
+        OpenAIBatchTool.Builder()
+        .api_key("mock")
+        .base_url(batch_server.base_url)
+        .batch_dir(batch_dir)
+        .poll_interval(0)
+        .build()
+    )
+
+
+def server_requests():
+    return [
+        (get_execution_context(), [Message(role="user", content=content)])
+        for content in ("client 0", "fail", "client 2")
+    ]
+
+
+def test_openai_batch_transport(tmp_path, batch_server, event_store):
+    tool = server_batch_tool(batch_server, str(tmp_path))
+    requests = server_requests()
+
+    outputs = tool.execute_batch(requests)
+
+    assert outputs[0].content == "0 tneilc"
+    assert isinstance(outputs[1], RuntimeError)
+    assert "Invalid request" in str(outputs[1])
+    assert outputs[2].content == "2 tneilc"
+    # The uploaded batch file, the output and the error files
+    assert len(batch_server.files) == 3
+    uploaded = [json.loads(line) for line in batch_server.files["file-1"].splitlines()]
+    assert [line["custom_id"] for line in uploaded] == ["0", "1", "2"]
+    assert batch_server.batches["batch_1"]["endpoint"] == "/v1/chat/completions"
+    assert batch_server.polls["batch_1"] == 3
+    assert os.listdir(tmp_path) == []
+
+    failed = event_store.get_events()[-2]
+    assert failed.execution_context == requests[1][0]
+    assert "Invalid request" in failed.error
+
+
+def test_a_execute_batch(tmp_path, batch_server, event_store):
+    tool = server_batch_tool(batch_server, str(tmp_path))
+
+    outputs = asyncio.run(tool.a_execute_batch(server_requests()))
+
+    assert [
+        output.content if isinstance(output, Message) else "error"
+        for output in outputs
+    ] == ["0 tneilc", "error", "2 tneilc"]
+    assert len(event_store.get_events()) == 6
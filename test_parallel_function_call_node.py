@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from typing import Any
+from typing import List
+
+import pytest
+from async_function_calling_command import AsyncFunctionCallingCommand
+from mock_assistants import get_execution_context
+from mock_llm_tool import mock_tool_call
+from parallel_function_call_node import ParallelFunctionCallNode
+from pydantic import Field
+from pydantic import PrivateAttr
+
+from grafi.common.decorators.llm_function import llm_function
+from grafi.common.events.topic_events.consume_from_topic_event import (
+    ConsumeFromTopicEvent,
+)
+from grafi.common.models.message import Message
+from grafi.common.topics.topic import Topic
+from grafi.tools.functions.function_tool import FunctionTool
+
+
+register_user_topic = Topic(name="register_user_topic")
+
+
+class RegisterClient(FunctionTool):
+    """Blocks every call until the expected number of calls run at once."""
+
+    concurrent_calls: int = Field(default=1)
+    names: List[str] = Field(default=[])
+
+    _barrier: threading.Barrier = PrivateAttr()
+
+    def model_post_init(self, context: Any) -> None:
+        self._barrier = threading.Barrier(self.concurrent_calls)
+
+    @llm_function
+    def register_client(self, name: str):
+        """Registers a user based on their name."""
+        self.names.append(name)
+        self._barrier.wait(timeout=5)
+        return f"User {name} has been registered."
+
+
+def node(function_tool: RegisterClient) -> ParallelFunctionCallNode:
+    return (
+        ParallelFunctionCallNode.Builder()
+        .name("FunctionCallRegisterNode")
+        .subscribe(register_user_topic)
+        .command(
+            AsyncFunctionCallingCommand.Builder().function_tool(function_tool).build()
+        )
+        .build()
+    )
+
+
+def registrations(*names: str) -> Message:
+    return Message(
+        role="assistant",
+        tool_calls=[
+            tool_call
+            for name in names
+            for tool_call in mock_tool_call(
+                "register_client", {"name": name}
+            ).tool_calls
+        ],
+    )
+
+
+def response(tool_call_message: Message, index: int) -> Message:
+    return Message(
+        role="tool",
+        content="Registered earlier.",
+        tool_call_id=tool_call_message.tool_calls[index].id,
+    )
+
+
+def node_input(*messages: Message) -> List[ConsumeFromTopicEvent]:
+    execution_context = get_execution_context()
+    return [
+        ConsumeFromTopicEvent(
+            execution_context=execution_context,
+            topic_name=register_user_topic.name,
+            offset=offset,
+            consumer_name="FunctionCallRegisterNode",
+            consumer_type="ParallelFunctionCallNode",
+            data=[message],
+        )
+        for offset, message in enumerate(messages)
+    ]
+
+
+def a_execute(function_call_node, node_input):
+    async def run():
+        return [
+            message
+            async for messages in function_call_node.a_execute(
+                get_execution_context(), node_input
+            )
+            for message in messages
+        ]
+
+    return asyncio.run(run())
+
+
+def execute(function_call_node, node_input):
+    return function_call_node.execute(get_execution_context(), node_input)
+
+
+@pytest.mark.parametrize("run", [execute, a_execute])
+def test_calls_of_all_messages_run_concurrently(run):
+    # Would time out on the barrier if a message waited for the previous one
+    function_tool = RegisterClient(concurrent_calls=4)
+
+    output = run(
+        node(function_tool),
+        node_input(registrations("ann", "bob"), registrations("eve", "joe")),
+    )
+
+    assert [message.content for message in output] == [
+        f"User {name} has been registered." for name in ("ann", "bob", "eve", "joe")
+    ]
+
+
+@pytest.mark.parametrize("run", [execute, a_execute])
+def test_answered_calls_are_not_run_again(run):
+    function_tool = RegisterClient()
+    tool_call_message = registrations("ann", "bob")
+
+    output = run(
+        node(function_tool),
+        node_input(tool_call_message, response(tool_call_message, 0)),
+    )
+
+    assert function_tool.names == ["bob"]
+    assert [message.tool_call_id for message in output] == [
+        tool_call_message.tool_calls[1].id
+    ]
+
+
+@pytest.mark.parametrize("run", [execute, a_execute])
+def test_answered_messages_are_skipped(run):
+    function_tool = RegisterClient()
+    tool_call_message = registrations("ann")
+
+    output = run(
+        node(function_tool),
+        node_input(tool_call_message, response(tool_call_message, 0)),
+    )
+
+    assert output == []
+    assert function_tool.names == []
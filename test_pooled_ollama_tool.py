@@ -0,0 +1,191 @@
+import asyncio
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import httpx
+import ollama
+import pytest
+from client_registry import client_registry
+from loguru import logger
+from metrics import llm_completion_tokens
+from metrics import llm_prompt_tokens
+from mock_assistants import get_execution_context
+from pooled_ollama_tool import PooledOllamaTool
+
+from grafi.common.containers.container import container
+from grafi.common.models.message import Message
+
+
+def chat_responses(*contents: str) -> List[ollama.ChatResponse]:
+    """Streamed responses of the contents, the last one done with its token counts."""
+    return [
+        ollama.ChatResponse(
+            model="llama3.2",
+            message=ollama.Message(role="assistant", content=content),
+            done=index == len(contents) - 1,
+            prompt_eval_count=12 if index == len(contents) - 1 else None,
+            eval_count=3 if index == len(contents) - 1 else None,
+        )
+        for index, content in enumerate(contents)
+    ]
+
+
+class StubOllamaClient:
+    """Answers with the scripted responses, or fails with `error`."""
+
+    def __init__(
+        self, responses: List[ollama.ChatResponse], error: Optional[Exception] = None
+    ):
+        self.responses = responses
+        self.error = error
+        self.calls: List[Dict[str, Any]] = []
+
+    def _call(self, kwargs: Dict[str, Any]) -> None:
+        self.calls.append(kwargs)
+        if self.error is not None:
+            raise self.error
+
+    def chat(self, **kwargs):
+        self._call(kwargs)
+        return iter(self.responses) if kwargs.get("stream") else self.responses[-1]
+
+    def generate(self, **kwargs):
+        self._call(kwargs)
+        return ollama.GenerateResponse(model=kwargs["model"], response="", done=True)
+
+
+class AsyncStubOllamaClient(StubOllamaClient):
+    async def _stream(self):
+        for response in self.responses:
+            await asyncio.sleep(0)
+            yield response
+
+    async def chat(self, **kwargs):
+        self._call(kwargs)
+        return self._stream() if kwargs.get("stream") else self.responses[-1]
+
+    async def generate(self, **kwargs):
+        return super().generate(**kwargs)
+
+
+@pytest.fixture(autouse=True)
+def event_store():
+    container.event_store.clear_events()
+    yield container.event_store
+    container.event_store.clear_events()
+
+
+@pytest.fixture
+def stub_clients(monkeypatch):
+    """Stub the clients of the registry, returning a function setting their script."""
+    clients = {}
+
+    def stub(responses, error=None):
+        clients["sync"] = StubOllamaClient(responses, error)
+        clients["async"] = AsyncStubOllamaClient(responses, error)
+        return clients
+
+    monkeypatch.setattr(
+        client_registry, "ollama_client", lambda *args, **kwargs: clients["sync"]
+    )
+    monkeypatch.setattr(
+        client_registry,
+        "async_ollama_client",
+        lambda *args, **kwargs: clients["async"],
+    )
+    return stub
+
+
+@pytest.fixture
+def warnings():
+    messages = []
+    handler_id = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(handler_id)
+
+
+def ollama_tool() -> PooledOllamaTool:
+    return (
+        PooledOllamaTool.Builder()
+        .name("OllamaLLM")
+        .model("llama3.2")
+        .keep_alive("30m")
+        .build()
+    )
+
+
+INPUT = [Message(role="user", content="Hello")]
+TOKEN_LABELS = {"node": "", "tool": "OllamaLLM", "model": "llama3.2"}
+
+
+def test_stream(stub_clients):
+    clients = stub_clients(chat_responses("Hel", "lo", " there", ""))
+    prompt_tokens = llm_prompt_tokens.value(**TOKEN_LABELS)
+
+    chunks = list(ollama_tool().stream(get_execution_context(), INPUT))
+
+    assert [chunk.content for chunk in chunks] == ["Hel", "lo", " there", ""]
+    (call,) = clients["sync"].calls
+    assert call["stream"] is True
+    assert call["keep_alive"] == "30m"
+    assert call["messages"] == [{"role": "user", "content": "Hello"}]
+    # Usage is reported by the last chunk only
+    assert llm_prompt_tokens.value(**TOKEN_LABELS) == prompt_tokens + 12
+
+
+def test_a_stream(stub_clients):
+    clients = stub_clients(chat_responses("Hel", "lo", ""))
+    completion_tokens = llm_completion_tokens.value(**TOKEN_LABELS)
+
+    async def run():
+        return [
+            chunk.content
+            async for chunk in ollama_tool().a_stream(get_execution_context(), INPUT)
+        ]
+
+    assert asyncio.run(run()) == ["Hel", "lo", ""]
+    (call,) = clients["async"].calls
+    assert call["stream"] is True
+    assert call["keep_alive"] == "30m"
+    assert llm_completion_tokens.value(**TOKEN_LABELS) == completion_tokens + 3
+
+
+def test_execute_forwards_keep_alive(stub_clients):
+    clients = stub_clients(chat_responses("Hello there"))
+
+    message = ollama_tool().execute(get_execution_context(), INPUT)
+
+    assert message.content == "Hello there"
+    assert clients["sync"].calls[0]["keep_alive"] == "30m"
+    assert "stream" not in clients["sync"].calls[0]
+
+
+def test_stream_errors_are_wrapped(stub_clients):
+    stub_clients([], error=httpx.ConnectError("Connection refused"))
+
+    with pytest.raises(RuntimeError, match="Ollama API error: Connection refused"):
+        list(ollama_tool().stream(get_execution_context(), INPUT))
+
+
+def test_warm_up(stub_clients):
+    clients = stub_clients([])
+    tool = ollama_tool()
+
+    assert tool.warm_up() is True
+    assert asyncio.run(tool.a_warm_up()) is True
+    # Only loads the model, without a prompt
+    expected = [{"model": "llama3.2", "keep_alive": "30m"}]
+    assert clients["sync"].calls == expected
+    assert clients["async"].calls == expected
+
+
+def test_warm_up_connection_error(stub_clients, warnings):
+    stub_clients([], error=httpx.ConnectError("Connection refused"))
+    tool = ollama_tool()
+
+    assert tool.warm_up() is False
+    assert asyncio.run(tool.a_warm_up()) is False
+    assert len(warnings) == 2
+    assert warnings[0].startswith("Could not warm up Ollama model llama3.2")
@@ -0,0 +1,219 @@
+import asyncio
+from typing import List
+from typing import Optional
+
+import httpx
+import pytest
+import rate_limiter
+from loguru import logger
+from rate_limiter import RateLimiter
+from rate_limiter import rate_limiters
+
+
+class FakeClock:
+    """Stands in for the time module, sleeping moves the clock forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps: List[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def a_sleep(self, seconds: float) -> None:
+        self.sleep(seconds)
+
+
+class APIError(Exception):
+    def __init__(self, status_code: int, retry_after: Optional[str] = None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = httpx.Response(
+            status_code, headers={"retry-after": retry_after} if retry_after else {}
+        )
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", clock.a_sleep)
+    # No jitter
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda a, b: 0.0)
+    yield clock
+    rate_limiters.clear()
+
+
+@pytest.fixture
+def warnings():
+    messages = []
+    handler_id = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(handler_id)
+
+
+def test_requests_per_minute(clock):
+    limiter = RateLimiter(requests_per_minute=60)
+
+    for _ in range(60):
+        limiter.acquire()
+        limiter.release()
+    assert clock.sleeps == []
+
+    # The bucket is empty and refills one request a second
+    limiter.acquire()
+    assert clock.sleeps == [1.0]
+
+
+def test_tokens_per_minute(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+
+    limiter.acquire(600)
+    limiter.release(600)
+    limiter.acquire(300)
+
+    assert clock.sleeps == [30.0]
+
+
+def test_request_over_the_bucket_size_waits_for_a_full_bucket(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+
+    limiter.acquire(600)
+    limiter.release(600)
+    limiter.acquire(1000)
+
+    assert clock.sleeps == [60.0]
+
+
+def test_release_charges_the_used_tokens(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+
+    limiter.acquire(600)
+    limiter.release(600, used_tokens=300)
+    limiter.acquire(300)
+
+    assert clock.sleeps == []
+
+
+def test_async_acquire_waits_without_blocking(clock):
+    limiter = RateLimiter(requests_per_minute=60)
+
+    async def run():
+        for _ in range(61):
+            await limiter.a_acquire()
+            limiter.release()
+
+    asyncio.run(run())
+
+    assert clock.sleeps == [1.0]
+
+
+def test_retry_after_holds_back_every_request(clock):
+    limiter = RateLimiter()
+
+    limiter.acquire()
+    limiter.release(error=APIError(429, retry_after="2"))
+    limiter.acquire()
+
+    assert clock.sleeps == [2.0]
+
+
+def test_call_retries_after_retry_after(clock):
+    limiter = RateLimiter()
+    errors = [APIError(429, retry_after="3")]
+
+    def request() -> str:
+        if errors:
+            raise errors.pop()
+        return "pong"
+
+    assert limiter.call(request) == "pong"
+    # The retry waits for the Retry-After once, not again when acquiring its slot
+    assert clock.sleeps == [3.0]
+    assert limiter.in_flight == 0
+
+
+def test_call_backs_off_exponentially_without_retry_after(clock):
+    limiter = RateLimiter()
+    errors = [APIError(503), APIError(503)]
+
+    def request() -> str:
+        if errors:
+            raise errors.pop()
+        return "pong"
+
+    assert limiter.call(request) == "pong"
+    assert clock.sleeps == [0.5, 1.0]
+
+
+def test_call_raises_after_max_retries(clock):
+    limiter = RateLimiter()
+
+    def request() -> str:
+        raise APIError(429, retry_after="1")
+
+    with pytest.raises(APIError):
+        limiter.call(request, max_retries=2)
+    assert clock.sleeps == [1.0, 1.0]
+    assert limiter.in_flight == 0
+
+
+def test_call_raises_non_retryable_errors(clock):
+    limiter = RateLimiter()
+    calls = []
+
+    def request() -> str:
+        calls.append(1)
+        raise APIError(400)
+
+    with pytest.raises(APIError):
+        limiter.call(request)
+    assert len(calls) == 1
+    assert clock.sleeps == []
+
+
+def test_concurrent_rate_limits_halve_the_concurrency_once(clock):
+    limiter = RateLimiter(max_concurrency=8)
+
+    for _ in range(3):
+        limiter.acquire()
+    for _ in range(3):
+        limiter.release(error=APIError(429))
+    assert limiter.concurrency == 4.0
+
+    clock.now += 1.0
+    limiter.acquire()
+    limiter.release(error=APIError(429))
+    assert limiter.concurrency == 2.0
+
+
+def test_registry_keeps_the_stricter_limit(clock, warnings):
+    limiter = rate_limiters.get("key", "model", requests_per_minute=60)
+    for _ in range(60):
+        limiter.acquire()
+        limiter.release()
+
+    # A looser limit neither replaces nor refills the bucket
+    assert rate_limiters.get("key", "model", requests_per_minute=120) is limiter
+    assert limiter.requests_per_minute == 60
+    limiter.acquire()
+    limiter.release()
+    assert clock.sleeps == [1.0]
+
+    # A stricter one lowers it
+    rate_limiters.get("key", "model", requests_per_minute=30)
+    assert limiter.requests_per_minute == 30
+
+    # Warned once per conflict, not on every request
+    rate_limiters.get("key", "model", requests_per_minute=120)
+    rate_limiters.get("key", "model", requests_per_minute=60)
+    rate_limiters.get("key", "model", requests_per_minute=30)
+    assert len(warnings) == 3
+    assert warnings[0] == (
+        "Conflicting limits of 60 and 120 requests per minute for the same API key "
+        "and model, keeping 60\n"
+    )
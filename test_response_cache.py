@@ -0,0 +1,185 @@
+import threading
+
+import pytest
+import response_cache
+from cached_llm_response_command import CachedLLMResponseCommand
+from mock_assistants import get_execution_context
+from mock_llm_tool import MockLLMTool
+from response_cache import InMemoryResponseCache
+from response_cache import SQLiteResponseCache
+from response_cache import response_cache_key
+
+from grafi.common.models.message import Message
+
+
+class FakeClock:
+    """Stands in for the time module, every reading is a second after the last one."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def _tick(self) -> float:
+        self.now += 1.0
+        return self.now
+
+    monotonic = _tick
+    time = _tick
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path, clock):
+    if request.param == "memory":
+        return lambda **kwargs: InMemoryResponseCache(**kwargs)
+    return lambda **kwargs: SQLiteResponseCache(
+        path=str(tmp_path / "response_cache.db"), **kwargs
+    )
+
+
+def response(content: str):
+    return [Message(role="assistant", content=content)]
+
+
+def test_hit_and_miss_counts(cache):
+    responses = cache()
+
+    assert responses.get("a") is None
+    responses.set("a", response("A"))
+    assert [message.content for message in responses.get("a")] == ["A"]
+    assert responses.get("b") is None
+
+    assert responses.stats() == {"hits": 1, "misses": 2}
+
+
+def test_lru_eviction(cache):
+    responses = cache(max_size=2)
+    responses.set("a", response("A"))
+    responses.set("b", response("B"))
+
+    # Reading "a" makes "b" the least recently used entry
+    assert responses.get("a") is not None
+    responses.set("c", response("C"))
+
+    assert responses.get("b") is None
+    assert responses.get("a") is not None
+    assert responses.get("c") is not None
+
+
+def test_ttl_expiry(cache, clock):
+    responses = cache(ttl=10)
+    responses.set("a", response("A"))
+
+    assert responses.get("a") is not None
+    clock.now += 10
+    assert responses.get("a") is None
+    assert responses.stats() == {"hits": 1, "misses": 1}
+
+
+def test_counts_under_concurrent_reads(cache):
+    responses = cache()
+    responses.set("a", response("A"))
+
+    def read():
+        for _ in range(100):
+            responses.get("a")
+            responses.get("b")
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert responses.stats() == {"hits": 400, "misses": 400}
+
+
+def test_sqlite_eviction_runs_in_batches(tmp_path, clock):
+    responses = SQLiteResponseCache(path=str(tmp_path / "cache.db"), max_size=200)
+    evictions = []
+
+    def trace(statement: str) -> None:
+        if statement.lstrip().startswith("DELETE"):
+            evictions.append(statement)
+
+    responses._connection.set_trace_callback(trace)
+
+    for index in range(400):
+        responses.set(str(index), response(str(index)))
+
+    # Every second write, leaving room for the write until the next one
+    assert len(evictions) == 200
+    (size,) = responses._connection.execute(
+        "SELECT COUNT(*) FROM response_cache"
+    ).fetchone()
+    assert size == 200
+    assert responses.get("199") is None
+    assert responses.get("200") is not None
+
+
+def test_clear(cache):
+    responses = cache()
+    responses.set("a", response("A"))
+
+    responses.clear()
+
+    assert responses.get("a") is None
+
+
+def test_key_ignores_message_ids_and_timestamps():
+    llm = MockLLMTool(system_message="Validate")
+    first = [Message(role="user", content="Craig Li, craig@binome.dev")]
+    second = [Message(role="user", content="Craig Li, craig@binome.dev")]
+
+    assert first[0].message_id != second[0].message_id
+    assert response_cache_key(llm, first) == response_cache_key(llm, second)
+
+
+def test_key_covers_system_message_chat_params_and_tools():
+    input_data = [Message(role="user", content="Hello")]
+    with_tools = [Message(role="user", content="Hello")]
+    with_tools[0].tools = [{"type": "function", "function": {"name": "register"}}]
+
+    key = response_cache_key(MockLLMTool(system_message="A"), input_data)
+
+    assert key != response_cache_key(MockLLMTool(system_message="B"), input_data)
+    assert key != response_cache_key(
+        MockLLMTool(system_message="A", chat_params={"temperature": 0}), input_data
+    )
+    assert key != response_cache_key(MockLLMTool(system_message="A"), with_tools)
+
+
+def test_command_serves_repeated_requests_from_cache():
+    llm = MockLLMTool(responses=["Valid"], chat_params={"temperature": 0})
+    responses = InMemoryResponseCache()
+    command = (
+        CachedLLMResponseCommand.Builder().llm(llm).response_cache(responses).build()
+    )
+    input_data = [Message(role="user", content="Craig Li, craig@binome.dev")]
+
+    first = command.execute(get_execution_context(), input_data)
+    second = command.execute(get_execution_context(), input_data)
+
+    assert first.content == second.content == "Valid"
+    # Served with a new id, so it can be published like a new response
+    assert first.message_id != second.message_id
+    assert responses.stats() == {"hits": 1, "misses": 1}
+
+
+def test_command_skips_cache_above_temperature_zero():
+    llm = MockLLMTool(responses=["Valid"], chat_params={"temperature": 0.7})
+    responses = InMemoryResponseCache()
+    command = (
+        CachedLLMResponseCommand.Builder().llm(llm).response_cache(responses).build()
+    )
+    input_data = [Message(role="user", content="Craig Li, craig@binome.dev")]
+
+    command.execute(get_execution_context(), input_data)
+    command.execute(get_execution_context(), input_data)
+
+    assert responses.stats() == {"hits": 0, "misses": 0}
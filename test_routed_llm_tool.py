@@ -0,0 +1,285 @@
+import asyncio
+from typing import List
+from typing import Optional
+
+import httpx
+import pytest
+import routed_llm_tool
+from metrics import llm_backend_requests
+from mock_assistants import get_execution_context
+from mock_llm_tool import MockLLMTool
+from pooled_openai_tool import PooledOpenAITool
+from pydantic import PrivateAttr
+from routed_llm_tool import RoutedLLMTool
+
+from grafi.common.containers.container import container
+from grafi.common.models.message import Message
+
+
+class APIError(Exception):
+    def __init__(self, status_code: int, retry_after: Optional[str] = None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = httpx.Response(
+            status_code, headers={"retry-after": retry_after} if retry_after else {}
+        )
+
+
+def failing(status_code: int, retry_after: Optional[str] = None):
+    """A response failing with an API error, wrapped like a client would."""
+
+    def respond(input_data: List[Message]) -> str:
+        raise RuntimeError("backend failed") from APIError(status_code, retry_after)
+
+    return respond
+
+
+class TrackedLLM(MockLLMTool):
+    """Records how many requests it serves at once."""
+
+    _active: int = PrivateAttr(default=0)
+    _peak: int = PrivateAttr(default=0)
+
+    async def a_execute(self, execution_context, input_data):
+        self._active += 1
+        self._peak = max(self._peak, self._active)
+        try:
+            async for message in super().a_execute(execution_context, input_data):
+                yield message
+        finally:
+            self._active -= 1
+
+
+class BrokenStreamLLM(MockLLMTool):
+    """Streams a first chunk, then fails with a server error."""
+
+    def stream(self, execution_context, input_data):
+        yield Message(role="assistant", content="Par")
+        raise RuntimeError("stream broken") from APIError(503)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture(autouse=True)
+def event_store():
+    container.event_store.clear_events()
+    yield container.event_store
+    container.event_store.clear_events()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(routed_llm_tool, "time", clock)
+    return clock
+
+
+def backend(name: str, *responses, **params) -> MockLLMTool:
+    return MockLLMTool(name=name, responses=list(responses), **params)
+
+
+def router(*backends, **params) -> RoutedLLMTool:
+    builder = RoutedLLMTool.Builder().name("Router")
+    for llm, backend_params in backends:
+        builder.backend(llm, **backend_params)
+    if "cooldown" in params:
+        builder.cooldown(params["cooldown"])
+    return builder.build()
+
+
+INPUT = [Message(role="user", content="Hello")]
+
+
+def execute(tool: RoutedLLMTool) -> str:
+    return tool.execute(get_execution_context(), INPUT).content
+
+
+async def a_execute(tool: RoutedLLMTool) -> str:
+    messages = [
+        message async for message in tool.a_execute(get_execution_context(), INPUT)
+    ]
+    return messages[-1].content
+
+
+def test_lowest_priority_first():
+    tool = router(
+        (backend("OpenAI", "from openai"), {"priority": 1}),
+        (backend("Ollama", "from ollama"), {"priority": 0}),
+    )
+
+    assert execute(tool) == "from ollama"
+    assert asyncio.run(a_execute(tool)) == "from ollama"
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 503])
+def test_failover_on_wrapped_errors(status_code):
+    tool = router(
+        (backend("Ollama", failing(status_code)), {}),
+        (backend("OpenAI", "from openai"), {"priority": 1}),
+    )
+    failovers = llm_backend_requests.value(
+        tool="Router", backend="Ollama", result="failover"
+    )
+
+    assert execute(tool) == "from openai"
+    assert (
+        llm_backend_requests.value(tool="Router", backend="Ollama", result="failover")
+        == failovers + 1
+    )
+
+
+def test_no_failover_on_client_errors():
+    tool = router(
+        (backend("Ollama", failing(400)), {}),
+        (backend("OpenAI", "from openai"), {"priority": 1}),
+    )
+
+    with pytest.raises(RuntimeError, match="backend failed"):
+        execute(tool)
+
+
+def test_last_error_raised_when_every_backend_fails():
+    tool = router(
+        (backend("Ollama", failing(503)), {}),
+        (backend("OpenAI", failing(429)), {"priority": 1}),
+    )
+
+    with pytest.raises(RuntimeError) as error:
+        asyncio.run(a_execute(tool))
+    assert error.value.__cause__.status_code == 429
+
+
+def test_retry_after_cooldown(clock):
+    ollama = backend("Ollama", failing(429, retry_after="30"), "from ollama")
+    tool = router(
+        (ollama, {}), (backend("OpenAI", "from openai"), {"priority": 1}), cooldown=5
+    )
+
+    assert execute(tool) == "from openai"
+    # Skipped for its Retry-After rather than the cooldown
+    clock.now += 29
+    assert execute(tool) == "from openai"
+    clock.now += 1
+    assert execute(tool) == "from ollama"
+
+
+def test_cooldown_without_retry_after(clock):
+    ollama = backend("Ollama", failing(503), "from ollama")
+    tool = router(
+        (ollama, {}), (backend("OpenAI", "from openai"), {"priority": 1}), cooldown=5
+    )
+
+    assert execute(tool) == "from openai"
+    clock.now += 4
+    assert execute(tool) == "from openai"
+    clock.now += 1
+    assert execute(tool) == "from ollama"
+
+
+def test_saturated_backend_overflows_to_the_next_priority():
+    ollama = TrackedLLM(name="Ollama", responses=["from ollama"], latency=0.05)
+    tool = router(
+        (ollama, {"max_concurrency": 1}),
+        (backend("OpenAI", "from openai"), {"priority": 1}),
+    )
+
+    async def run():
+        return await asyncio.gather(a_execute(tool), a_execute(tool))
+
+    assert sorted(asyncio.run(run())) == ["from ollama", "from openai"]
+
+
+def test_requests_wait_for_max_concurrency():
+    ollama = TrackedLLM(name="Ollama", responses=["from ollama"], latency=0.01)
+    tool = router((ollama, {"max_concurrency": 2}))
+
+    async def run():
+        return await asyncio.gather(*(a_execute(tool) for _ in range(6)))
+
+    assert asyncio.run(run()) == ["from ollama"] * 6
+    assert ollama._peak == 2
+    assert tool._get_state().backends[0].in_flight == 0
+
+
+def test_stream_fails_over_before_its_first_chunk():
+    tool = router(
+        (backend("Ollama", failing(503)), {}),
+        (backend("OpenAI", "from openai"), {"priority": 1}),
+    )
+
+    chunks = [chunk.content for chunk in tool.stream(get_execution_context(), INPUT)]
+
+    assert chunks == ["from", " openai"]
+
+
+def test_stream_does_not_fail_over_after_its_first_chunk():
+    requests = []
+
+    def respond(input_data: List[Message]) -> str:
+        requests.append(input_data)
+        return "from openai"
+
+    tool = router(
+        (BrokenStreamLLM(name="Ollama"), {}),
+        (backend("OpenAI", respond), {"priority": 1}),
+    )
+    chunks = []
+
+    with pytest.raises(RuntimeError, match="stream broken"):
+        for chunk in tool.stream(get_execution_context(), INPUT):
+            chunks.append(chunk.content)
+
+    assert chunks == ["Par"]
+    assert requests == []
+    assert tool._get_state().backends[0].in_flight == 0
+
+
+def test_in_flight_released_on_cancel():
+    tool = router((backend("Ollama", "from ollama", latency=10), {}))
+    state = tool._get_state()
+
+    async def run():
+        task = asyncio.create_task(a_execute(tool))
+        while state.backends[0].in_flight == 0:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    assert state.backends[0].in_flight == 0
+    assert state.backends[0].cooldown_until == 0.0
+
+
+def test_in_flight_released_when_a_stream_is_closed():
+    tool = router((backend("Ollama", "from ollama"), {}))
+
+    chunks = tool.stream(get_execution_context(), INPUT)
+    assert next(chunks).content == "from"
+    assert tool._get_state().backends[0].in_flight == 1
+    chunks.close()
+
+    assert tool._get_state().backends[0].in_flight == 0
+
+
+def test_backends_fail_over_instead_of_retrying():
+    default = PooledOpenAITool.Builder().api_key("key").build()
+    configured = PooledOpenAITool.Builder().api_key("key").max_retries(3).build()
+
+    router((default, {}), (configured, {"priority": 1}))
+
+    assert default.max_retries == 0
+    assert configured.max_retries == 3
@@ -0,0 +1,160 @@
+import math
+from typing import List
+
+import pytest
+import semantic_cache
+from mock_llm_tool import MockLLMTool
+from semantic_cache import Embedder
+from semantic_cache import HashEmbedder
+from semantic_cache import SemanticCache
+from semantic_cache import VectorIndex
+
+from grafi.common.models.message import Message
+
+
+class AngleEmbedder(Embedder):
+    """Embeds a message of degrees as the unit vector at that angle."""
+
+    def embed(self, text: str) -> List[float]:
+        angle = math.radians(float(text.rsplit(" ", 1)[-1]))
+        return [math.cos(angle), math.sin(angle)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(semantic_cache, "time", clock)
+    return clock
+
+
+LLM = MockLLMTool(name="ResponseToUserLLM", system_message="Answer the user.")
+
+
+def request(content: str, role: str = "user") -> List[Message]:
+    return [Message(role=role, content=content)]
+
+
+def response(content: str) -> List[Message]:
+    return [Message(role="assistant", content=content)]
+
+
+def cache(**params) -> SemanticCache:
+    return SemanticCache(embedder=AngleEmbedder(), threshold=0.95, **params)
+
+
+def lookup(cache: SemanticCache, content: str, llm=LLM) -> str:
+    messages = cache.get(cache.query(llm, request(content)))
+    return messages[0].content if messages else None
+
+
+def store(cache: SemanticCache, content: str, llm=LLM) -> None:
+    cache.set(cache.query(llm, request(content)), response(f"answer {content}"))
+
+
+def test_similarity_threshold():
+    semantic = cache()
+    store(semantic, "0")
+
+    # cos(10°) = 0.985 and cos(30°) = 0.866
+    assert lookup(semantic, "0") == "answer 0"
+    assert lookup(semantic, "10") == "answer 0"
+    assert lookup(semantic, "-10") == "answer 0"
+    assert lookup(semantic, "30") is None
+    assert semantic.stats() == {"hits": 3, "misses": 1, "size": 1}
+
+
+def test_most_similar_entry_is_served():
+    semantic = cache()
+    store(semantic, "0")
+    store(semantic, "16")
+
+    assert lookup(semantic, "5") == "answer 0"
+    assert lookup(semantic, "12") == "answer 16"
+
+
+def test_requests_must_match_exactly_apart_from_their_text():
+    semantic = cache()
+    store(semantic, "0")
+
+    other_llm = MockLLMTool(name="ResponseToUserLLM", system_message="Be brief.")
+    assert lookup(semantic, "0", llm=other_llm) is None
+    assert semantic.get(semantic.query(LLM, request("0", role="system"))) is None
+
+
+def test_requests_without_text_are_not_cached():
+    input_data = [Message(role="user", content=[{"type": "image_url"}])]
+
+    assert cache().query(LLM, input_data) is None
+
+
+def test_least_recently_used_evicted():
+    semantic = cache(max_size=2)
+    store(semantic, "0")
+    store(semantic, "90")
+    assert lookup(semantic, "0") == "answer 0"
+
+    store(semantic, "180")
+
+    assert lookup(semantic, "0") == "answer 0"
+    assert lookup(semantic, "90") is None
+    assert lookup(semantic, "180") == "answer 180"
+    assert semantic.stats()["size"] == 2
+
+
+def test_expired_entries_miss(clock):
+    semantic = cache(ttl=60)
+    store(semantic, "0")
+
+    clock.now += 60
+    assert lookup(semantic, "0") == "answer 0"
+
+    clock.now += 1
+    assert lookup(semantic, "0") is None
+    assert semantic.stats() == {"hits": 1, "misses": 1, "size": 0}
+
+
+def test_clear():
+    semantic = cache()
+    store(semantic, "0")
+
+    semantic.clear()
+
+    assert lookup(semantic, "0") is None
+    assert semantic.stats()["size"] == 0
+
+
+def test_hash_embedder_matches_small_variations():
+    semantic = SemanticCache(threshold=0.8)
+    greeting = "Hello, this is Craig. I want to register the gym. Can you help me?"
+    store(semantic, greeting)
+
+    assert lookup(semantic, greeting.lower().replace(",", "")) == f"answer {greeting}"
+    assert lookup(semantic, "What time does the gym open?") is None
+
+
+def test_hash_embedder_is_stable():
+    assert HashEmbedder().embed("Hello there") == HashEmbedder().embed("Hello there")
+
+
+@pytest.mark.parametrize("partitions", [0, 4])
+def test_vector_index_finds_the_closest_vector(partitions):
+    index = VectorIndex(partitions=partitions, probes=2)
+    embedder = AngleEmbedder()
+    # Enough vectors to train the partitions
+    for degrees in range(0, 360, 5):
+        index.add(degrees, embedder.embed(str(degrees)))
+    index.remove(90)
+
+    entry_id, similarity = index.search(embedder.embed("41"))
+    assert entry_id == 40
+    assert similarity == pytest.approx(math.cos(math.radians(1)))
+    assert index.search(embedder.embed("89"))[0] == 85
+    assert len(index) == 71
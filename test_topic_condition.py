@@ -0,0 +1,80 @@
+import pytest
+from mock_llm_tool import mock_tool_call
+from topic_condition import no_tool_calls
+from topic_condition import tool_call_name_in
+from topic_condition import tool_call_name_not_in
+
+from grafi.common.models.message import Message
+from grafi.common.topics.topic import Topic
+
+
+register = [mock_tool_call("register_client", {"name": "Craig Li"})]
+request_information = [
+    mock_tool_call("request_client_information", {"question_description": "email"})
+]
+text_reply = [Message(role="assistant", content="Valid")]
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (register, True),
+        (request_information, False),
+        (text_reply, False),
+        ([], False),
+        # Only the last message is routed on
+        (register + text_reply, False),
+        (text_reply + register, True),
+    ],
+)
+def test_tool_call_name_in(data, expected):
+    assert tool_call_name_in("register_client", "update_client")(data) is expected
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (register, False),
+        (request_information, True),
+        (text_reply, False),
+        ([], False),
+    ],
+)
+def test_tool_call_name_not_in(data, expected):
+    assert tool_call_name_not_in("register_client")(data) is expected
+
+
+def test_conditions_read_the_last_message_on_every_call():
+    # Nothing is cached between calls, a changed list is routed on its new last message
+    conditions = [tool_call_name_in("register_client"), tool_call_name_not_in("x")]
+    data = list(register)
+
+    assert [condition(data) for condition in conditions] == [True, True]
+    data[-1] = text_reply[0]
+    assert [condition(data) for condition in conditions] == [False, False]
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (register, False),
+        (text_reply, True),
+        ([], False),
+        (register + text_reply, True),
+    ],
+)
+def test_no_tool_calls(data, expected):
+    assert no_tool_calls(data) is expected
+
+
+def test_topic_condition():
+    topic = Topic(
+        name="register_user_topic", condition=tool_call_name_in("register_client")
+    )
+
+    assert topic.condition(register)
+    assert not topic.condition(request_information)
+
+
+def test_repr():
+    assert repr(tool_call_name_not_in("b", "a")) == "tool_call_name not in ['a', 'b']"
@@ -0,0 +1,132 @@
+from types import SimpleNamespace
+
+import pytest
+from loguru import logger
+from mock_assistants import kyc_assistant
+from workflow_routing import can_satisfy
+from workflow_routing import check_cycles
+from workflow_routing import check_reachability
+from workflow_routing import compile_node_subscriptions
+
+from grafi.common.topics.subscription_builder import SubscriptionBuilder
+from grafi.common.topics.topic import Topic
+from grafi.common.topics.topic import agent_input_topic
+
+
+class PendingTopic:
+    """A topic with new messages for the given consumers."""
+
+    def __init__(self, *consumers: str):
+        self.consumers = consumers
+
+    def can_consume(self, consumer_name: str) -> bool:
+        return consumer_name in self.consumers
+
+
+topic_a = Topic(name="a")
+topic_b = Topic(name="b")
+topic_c = Topic(name="c")
+
+# (a AND b) OR c
+a_and_b_or_c = (
+    SubscriptionBuilder()
+    .subscribed_to(topic_a)
+    .and_()
+    .subscribed_to(topic_b)
+    .or_()
+    .subscribed_to(topic_c)
+    .build()
+)
+
+
+@pytest.fixture
+def warnings():
+    messages = []
+    handler_id = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(handler_id)
+
+
+@pytest.mark.parametrize(
+    "pending, expected",
+    [
+        ({"a"}, False),
+        ({"a", "b"}, True),
+        ({"c"}, True),
+        (set(), False),
+    ],
+)
+def test_compile_subscription(pending, expected):
+    predicate = compile_node_subscriptions([a_and_b_or_c], "node")
+    topics = {
+        name: PendingTopic("node") if name in pending else PendingTopic()
+        for name in "abc"
+    }
+
+    assert predicate(topics) is expected
+
+
+def test_compile_subscription_other_consumer():
+    predicate = compile_node_subscriptions([a_and_b_or_c], "node")
+
+    assert not predicate({name: PendingTopic("other") for name in "abc"})
+
+
+def test_node_without_subscriptions_can_always_run():
+    assert compile_node_subscriptions([], "node")({})
+
+
+def test_can_satisfy():
+    assert can_satisfy(a_and_b_or_c, {"c"})
+    assert can_satisfy(a_and_b_or_c, {"a", "b"})
+    assert not can_satisfy(a_and_b_or_c, {"a"})
+
+
+def node(name, subscribed_to, publish_to):
+    return SimpleNamespace(
+        name=name,
+        subscribed_expressions=[
+            SubscriptionBuilder().subscribed_to(topic).build()
+            for topic in subscribed_to
+        ],
+        publish_to=publish_to,
+    )
+
+
+def test_check_reachability(warnings):
+    nodes = {
+        "First": node("First", [agent_input_topic], [topic_a]),
+        "Second": node("Second", [topic_a], [topic_b]),
+        "Orphan": node("Orphan", [topic_c], [topic_b]),
+    }
+
+    check_reachability("Workflow", nodes)
+
+    assert warnings == [
+        "[Workflow] Node Orphan is unreachable from the agent input topic\n"
+    ]
+
+
+def test_check_cycles(warnings):
+    nodes = {
+        "First": node("First", [agent_input_topic], [topic_a]),
+        "Second": node("Second", [topic_a], [topic_b]),
+        "Third": node("Third", [topic_b], [topic_a]),
+    }
+    topic_nodes = {"agent_input_topic": ["First"], "a": ["Second"], "b": ["Third"]}
+
+    check_cycles("Workflow", nodes, topic_nodes)
+
+    assert warnings == ["[Workflow] Workflow has a cycle: Second -> Third -> Second\n"]
+
+
+def test_kyc_routing_table(warnings):
+    workflow = kyc_assistant().workflow
+    routing_table = workflow._routing.routing_table
+
+    assert [name for name, _ in routing_table["register_user_respond"]] == [
+        "LLMResponseToUserNode"
+    ]
+    assert [name for name, _ in routing_table["agent_input_topic"]] == ["ThoughtNode"]
+    # The human request topic closes the only cycle of the graph
+    assert warnings == []
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+from metrics import speculative_executions
+from mock_assistants import REGISTERED_RESPONSE
+from mock_assistants import act
+from mock_assistants import get_execution_context
+from mock_assistants import kyc_assistant
+
+from grafi.common.containers.container import container
+from grafi.common.models.message import Message
+
+
+@pytest.fixture(autouse=True)
+def event_store():
+    container.event_store.clear_events()
+    yield container.event_store
+    container.event_store.clear_events()
+
+
+@pytest.fixture
+def assistant():
+    assistant = kyc_assistant(speculative_action=True)
+    # The validator answers after the speculation of the action node has started
+    assistant.workflow.nodes["ThoughtNode"].command.llm.latency = 0.05
+    return assistant
+
+
+@pytest.fixture
+def action_calls(assistant) -> List[str]:
+    calls = []
+
+    def counted_act(input_data: List[Message]) -> Message:
+        calls.append(input_data[-1].content)
+        return act(input_data)
+
+    assistant.workflow.nodes["ActionNode"].command.llm.responses = [counted_act]
+    return calls
+
+
+def speculations(result: str) -> float:
+    return speculative_executions.value(node="ActionNode", result=result)
+
+
+def test_speculation_targets(assistant):
+    assert assistant.workflow._speculation.targets == {"ThoughtNode": ["ActionNode"]}
+    assert kyc_assistant().workflow._speculation.targets == {}
+
+
+def test_speculation_used(assistant, action_calls):
+    used = speculations("used")
+
+    output = assistant.execute(
+        get_execution_context(),
+        [Message(role="user", content="Craig Li, craig@binome.dev")],
+    )
+
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+    assert action_calls == ["Valid"]
+    assert speculations("used") == used + 1
+
+
+def test_speculation_used_async(assistant, action_calls):
+    used = speculations("used")
+
+    output = asyncio.run(
+        assistant.a_execute(
+            get_execution_context(),
+            [Message(role="user", content="Craig Li, craig@binome.dev")],
+        )
+    )
+
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+    assert action_calls == ["Valid"]
+    assert speculations("used") == used + 1
+
+
+def test_speculation_discarded_on_another_answer(assistant, action_calls):
+    discarded = speculations("discarded")
+
+    output = assistant.execute(
+        get_execution_context(),
+        [Message(role="user", content="Hello, I want to register the gym.")],
+    )
+
+    assert [json.loads(message.content) for message in output] == [
+        {"question_description": "name and email"}
+    ]
+    # The action node is run again on the actual answer of the validator
+    assert action_calls[-1] == "Invalid - the name and email are missing"
+    assert speculations("discarded") == discarded + 1
+
+
+def speculate_on_valid(node, executor=None):
+    upstream_input = [Message(role="user", content="Craig Li, craig@binome.dev")]
+    predicted = Message(role="assistant", content="Valid")
+    if executor is None:
+        node.a_speculate(get_execution_context(), upstream_input, predicted)
+    else:
+        node.speculate(get_execution_context(), upstream_input, predicted, executor)
+
+
+def test_discard_cancels_queued_speculation(assistant, action_calls):
+    node = assistant.workflow.nodes["ActionNode"]
+    release = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Keeps the only worker busy, so the speculation stays queued
+        executor.submit(release.wait)
+        speculate_on_valid(node, executor)
+        future = node._speculation[1]
+
+        node.discard_speculation()
+        release.set()
+
+    assert future.cancelled()
+    assert action_calls == []
+
+
+def test_discard_cancels_speculation_task(assistant, action_calls):
+    node = assistant.workflow.nodes["ActionNode"]
+    node.command.llm.latency = 1.0
+
+    async def speculate_and_discard():
+        speculate_on_valid(node)
+        task = node._speculation[1]
+        await asyncio.sleep(0)
+        node.discard_speculation()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return task
+
+    assert asyncio.run(speculate_and_discard()).cancelled()
@@ -0,0 +1,193 @@
+"""
+Offline tests of the assistant workflows, run against MockLLMTool. The event counts
+catch nodes that stop running, or run twice.
+"""
+
+import asyncio
+import json
+
+import pytest
+from mock_assistants import REGISTERED_RESPONSE
+from mock_assistants import SIMPLE_LLM_RESPONSE
+from mock_assistants import get_execution_context
+from mock_assistants import kyc_assistant
+from mock_assistants import set_llm
+from mock_assistants import simple_llm_assistant
+from mock_llm_tool import MockLLMTool
+
+from grafi.common.containers.container import container
+from grafi.common.models.message import Message
+from grafi.workflows.impl.event_driven_workflow import EventDrivenWorkflow
+
+
+@pytest.fixture(autouse=True)
+def event_store():
+    container.event_store.clear_events()
+    yield container.event_store
+    container.event_store.clear_events()
+
+
+def test_simple_llm_assistant_execute(event_store):
+    assistant = simple_llm_assistant()
+
+    output = assistant.execute(
+        get_execution_context(), [Message(role="user", content="Hello")]
+    )
+
+    assert [message.content for message in output] == [SIMPLE_LLM_RESPONSE]
+    assert len(event_store.get_events()) == 11
+
+
+def test_simple_llm_assistant_a_execute(event_store):
+    assistant = simple_llm_assistant()
+
+    output = asyncio.run(
+        assistant.a_execute(
+            get_execution_context(), [Message(role="user", content="Hello")]
+        )
+    )
+
+    assert [message.content for message in output] == [SIMPLE_LLM_RESPONSE]
+    assert len(event_store.get_events()) == 11
+
+
+def test_kyc_assistant_registration(event_store):
+    assistant = kyc_assistant()
+
+    output = assistant.execute(
+        get_execution_context(),
+        [Message(role="user", content="Craig Li, craig@binome.dev")],
+    )
+
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+    assert len(event_store.get_events()) == 29
+
+
+def test_kyc_assistant_text_reply(event_store):
+    assistant = kyc_assistant()
+    set_llm(
+        assistant,
+        "ActionNode",
+        MockLLMTool(name="ActionLLM", responses=["Which gym do you want to join?"]),
+    )
+    set_llm(
+        assistant,
+        "LLMResponseToUserNode",
+        MockLLMTool(
+            name="ResponseToUserLLM",
+            responses=[lambda input_data: input_data[-1].content],
+        ),
+    )
+
+    output = assistant.execute(
+        get_execution_context(),
+        [Message(role="user", content="Craig Li, craig@binome.dev")],
+    )
+
+    # A reply without a tool call is answered instead of ending without an output
+    assert [message.content for message in output] == ["Which gym do you want to join?"]
+
+
+def test_kyc_assistant_hitl(event_store):
+    assistant = kyc_assistant()
+    execution_context = get_execution_context()
+
+    output = assistant.execute(
+        execution_context,
+        [Message(role="user", content="Hello, I want to register the gym.")],
+    )
+    assert [json.loads(message.content) for message in output] == [
+        {"question_description": "name and email"}
+    ]
+
+    # The request is resumed with the human reply to the information request
+    output = assistant.execute(
+        execution_context, [Message(role="user", content="Craig Li, craig@binome.dev")]
+    )
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+    assert len(event_store.get_events()) == 53
+
+
+@pytest.fixture
+def full_restores(monkeypatch):
+    """Record the requests restored by replaying their events from the event store."""
+    restores = []
+    initial_workflow = EventDrivenWorkflow.initial_workflow
+
+    def record_restore(workflow, execution_context, input):
+        restores.append(execution_context.assistant_request_id)
+        return initial_workflow(workflow, execution_context, input)
+
+    monkeypatch.setattr(EventDrivenWorkflow, "initial_workflow", record_restore)
+    return restores
+
+
+def test_kyc_assistant_hitl_resumes_from_memory(event_store, full_restores):
+    assistant = kyc_assistant()
+    execution_context = get_execution_context()
+
+    assistant.execute(
+        execution_context,
+        [Message(role="user", content="Hello, I want to register the gym.")],
+    )
+    output = assistant.execute(
+        execution_context, [Message(role="user", content="Craig Li, craig@binome.dev")]
+    )
+
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+    # Only the first turn is restored from the event store
+    assert full_restores == [execution_context.assistant_request_id]
+    assert len(event_store.get_events()) == 53
+
+
+def test_kyc_assistant_hitl_restores_after_another_workflow(
+    event_store, full_restores
+):
+    assistant = kyc_assistant()
+    execution_context = get_execution_context()
+    other_execution_context = get_execution_context()
+
+    assistant.execute(
+        execution_context,
+        [Message(role="user", content="Hello, I want to register the gym.")],
+    )
+    # Publishes to the module level topics shared with the first assistant
+    output = kyc_assistant("OtherKycAssistant").execute(
+        other_execution_context,
+        [Message(role="user", content="Craig Li, craig@binome.dev")],
+    )
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+    output = assistant.execute(
+        execution_context, [Message(role="user", content="Craig Li, craig@binome.dev")]
+    )
+
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+    assert full_restores == [
+        execution_context.assistant_request_id,
+        other_execution_context.assistant_request_id,
+        execution_context.assistant_request_id,
+    ]
+
+
+def test_kyc_assistant_hitl_async(event_store):
+    assistant = kyc_assistant()
+    execution_context = get_execution_context()
+
+    output = asyncio.run(
+        assistant.a_execute(
+            execution_context,
+            [Message(role="user", content="Hello, I want to register the gym.")],
+        )
+    )
+    assert [json.loads(message.content) for message in output] == [
+        {"question_description": "name and email"}
+    ]
+
+    output = asyncio.run(
+        assistant.a_execute(
+            execution_context,
+            [Message(role="user", content="Craig Li, craig@binome.dev")],
+        )
+    )
+    assert [message.content for message in output] == [REGISTERED_RESPONSE]
+    assert len(event_store.get_events()) == 53
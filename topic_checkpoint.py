@@ -0,0 +1,66 @@
+from typing import Any
+from typing import Dict
+from typing import List
+
+from grafi.common.events.event import EventType
+from grafi.common.events.topic_events.output_topic_event import OutputTopicEvent
+from grafi.common.events.topic_events.publish_to_topic_event import PublishToTopicEvent
+from grafi.common.topics.topic_base import HUMAN_REQUEST_TOPIC
+from grafi.common.topics.topic_base import TopicBase
+
+
+def is_waiting_for_human(
+    topics: Dict[str, TopicBase], topic_nodes: Dict[str, List[str]]
+) -> bool:
+    """Whether a human request is published and not consumed yet."""
+    topic = topics.get(HUMAN_REQUEST_TOPIC)
+    return topic is not None and any(
+        topic.can_consume(node_name)
+        for node_name in topic_nodes.get(HUMAN_REQUEST_TOPIC, [])
+    )
+
+
+def checkpoint_topics(
+    topics: Dict[str, TopicBase], topic_nodes: Dict[str, List[str]]
+) -> Dict[str, Any]:
+    """
+    Return a JSON serializable checkpoint of the topics: the events that are still
+    unconsumed by a subscriber or consumer, and the committed offsets.
+    """
+    checkpoint: Dict[str, Any] = {}
+    for topic_name, topic in topics.items():
+        offsets = [
+            topic.consumption_offsets.get(node_name, 0)
+            for node_name in topic_nodes.get(topic_name, [])
+        ] + list(topic.consumption_offsets.values())
+        # Events consumed by every consumer are never read again
+        pending_offset = min(offsets, default=0)
+        checkpoint[topic_name] = {
+            "length": len(topic.topic_events),
+            "consumption_offsets": dict(topic.consumption_offsets),
+            "topic_events": [
+                event.to_dict() for event in topic.topic_events[pending_offset:]
+            ],
+        }
+    return checkpoint
+
+
+def restore_topics(topics: Dict[str, TopicBase], checkpoint: Dict[str, Any]) -> None:
+    """Reset the topics to the state saved by `checkpoint_topics`."""
+    for topic_name, topic in topics.items():
+        topic.reset()
+        state = checkpoint.get(topic_name)
+        if state is None:
+            continue
+
+        events = [
+            (
+                OutputTopicEvent
+                if event_dict["event_type"] == EventType.OUTPUT_TOPIC.value
+                else PublishToTopicEvent
+            ).from_dict(event_dict)
+            for event_dict in state["topic_events"]
+        ]
+        # Pad the dropped events, so offsets keep indexing the topic events
+        topic.topic_events = [None] * (state["length"] - len(events)) + events
+        topic.consumption_offsets = state["consumption_offsets"]
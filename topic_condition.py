@@ -0,0 +1,56 @@
+from typing import FrozenSet
+from typing import List
+
+from grafi.common.models.message import Message
+
+
+def last_tool_call_names(data: List[Message]) -> FrozenSet[str]:
+    """Return the names of the tool calls of the last message, without copying the data."""
+    if not data:
+        return frozenset()
+    return frozenset(
+        tool_call.function.name for tool_call in data[-1].tool_calls or []
+    )
+
+
+class ToolCallNameCondition:
+    """
+    Topic condition matching the tool calls of the last published message by name.
+
+    Unlike a lambda over the message list, it is safe on messages without tool calls, which
+    match neither the positive nor the negated condition, and the message list is not
+    copied.
+
+    Use `tool_call_name_in` and `tool_call_name_not_in` to create it:
+
+        Topic(name="register_user_topic", condition=tool_call_name_in("register_client"))
+    """
+
+    def __init__(self, names: FrozenSet[str], negate: bool = False):
+        self.names = names
+        self.negate = negate
+
+    def __call__(self, data: List[Message]) -> bool:
+        tool_call_names = last_tool_call_names(data)
+        if self.negate:
+            return bool(tool_call_names - self.names)
+        return not tool_call_names.isdisjoint(self.names)
+
+    def __repr__(self) -> str:
+        op = "not in" if self.negate else "in"
+        return f"tool_call_name {op} {sorted(self.names)}"
+
+
+def tool_call_name_in(*names: str) -> ToolCallNameCondition:
+    """Match when the last message calls a tool with one of the names."""
+    return ToolCallNameCondition(frozenset(names))
+
+
+def tool_call_name_not_in(*names: str) -> ToolCallNameCondition:
+    """Match when the last message calls a tool with a name other than the given ones."""
+    return ToolCallNameCondition(frozenset(names), negate=True)
+
+
+def no_tool_calls(data: List[Message]) -> bool:
+    """Match when the last message calls no tool, as a plain text reply."""
+    return bool(data) and not last_tool_call_names(data)
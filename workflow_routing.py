@@ -0,0 +1,173 @@
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Set
+from typing import Tuple
+
+from loguru import logger
+
+from grafi.common.topics.topic import AGENT_INPUT_TOPIC
+from grafi.common.topics.topic_base import HUMAN_REQUEST_TOPIC
+from grafi.common.topics.topic_base import TopicBase
+from grafi.common.topics.topic_expression import CombinedExpr
+from grafi.common.topics.topic_expression import LogicalOp
+from grafi.common.topics.topic_expression import SubExpr
+from grafi.common.topics.topic_expression import TopicExpr
+from grafi.nodes.node import Node
+
+
+# Compiled subscription of a node, evaluated against the topics of the workflow
+SubscriptionPredicate = Callable[[Dict[str, TopicBase]], bool]
+
+
+def compile_subscription(expr: SubExpr, node_name: str) -> SubscriptionPredicate:
+    """
+    Compile a subscription expression into a predicate telling whether the node has new
+    messages satisfying it. Topics are looked up by name, so the predicate stays valid
+    for copies of the workflow.
+    """
+    if isinstance(expr, TopicExpr):
+        topic_name = expr.topic.name
+        return lambda topics: topics[topic_name].can_consume(node_name)
+    elif isinstance(expr, CombinedExpr):
+        left = compile_subscription(expr.left, node_name)
+        right = compile_subscription(expr.right, node_name)
+        if expr.op == LogicalOp.AND:
+            return lambda topics: left(topics) and right(topics)
+        else:  # expr.op == LogicalOp.OR
+            return lambda topics: left(topics) or right(topics)
+    else:
+        return lambda topics: False
+
+
+def compile_node_subscriptions(
+    expressions: List[SubExpr], node_name: str
+) -> SubscriptionPredicate:
+    """Compile all the subscription expressions of a node, which must all be satisfied."""
+    predicates = [compile_subscription(expr, node_name) for expr in expressions]
+    if not predicates:
+        return lambda topics: True
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda topics: all(predicate(topics) for predicate in predicates)
+
+
+def can_satisfy(expr: SubExpr, topic_names: Set[str]) -> bool:
+    """Whether the expression can be satisfied when only the given topics receive messages."""
+    if isinstance(expr, TopicExpr):
+        return expr.topic.name in topic_names
+    elif isinstance(expr, CombinedExpr):
+        left = can_satisfy(expr.left, topic_names)
+        right = can_satisfy(expr.right, topic_names)
+        return left and right if expr.op == LogicalOp.AND else left or right
+    return False
+
+
+class WorkflowRouting:
+    """
+    The routing table of a workflow, compiled once when it is built: every topic is mapped
+    to its subscribers with their subscription expressions precompiled, so dispatching a
+    publish event is a dict lookup.
+
+    Only node and topic names are kept, so copies of the workflow can share the routing.
+
+    Args:
+        nodes (Dict[str, Node]): The nodes of the workflow, by name.
+        topic_nodes (Dict[str, List[str]]): The subscribers of every topic.
+    """
+
+    def __init__(self, nodes: Dict[str, Node], topic_nodes: Dict[str, List[str]]):
+        self.node_predicates: Dict[str, SubscriptionPredicate] = {
+            node_name: compile_node_subscriptions(node.subscribed_expressions, node_name)
+            for node_name, node in nodes.items()
+        }
+        self.routing_table: Dict[str, List[Tuple[str, SubscriptionPredicate]]] = {
+            topic_name: [
+                (node_name, self.node_predicates[node_name])
+                for node_name in dict.fromkeys(node_names)
+            ]
+            for topic_name, node_names in topic_nodes.items()
+        }
+
+    def can_execute(self, node: Node, topics: Dict[str, TopicBase]) -> bool:
+        """Whether the node has new messages satisfying its subscriptions."""
+        predicate = self.node_predicates.get(node.name)
+        if predicate is None:
+            return node.can_execute()
+        return predicate(topics)
+
+    def ready_subscribers(
+        self, topic_name: str, topics: Dict[str, TopicBase]
+    ) -> Iterable[str]:
+        """Names of the subscribers of the topic whose subscriptions are satisfied."""
+        for node_name, can_execute in self.routing_table.get(topic_name, ()):
+            if can_execute(topics):
+                yield node_name
+
+
+def check_reachability(workflow_name: str, nodes: Dict[str, Node]) -> None:
+    """Log the nodes that can never run, as no message can satisfy their subscriptions."""
+    # Propagate messages from the entry topics until no more node can run
+    reachable_topics = {AGENT_INPUT_TOPIC, HUMAN_REQUEST_TOPIC}
+    reachable_nodes: Set[str] = set()
+    changed = True
+    while changed:
+        changed = False
+        for node_name, node in nodes.items():
+            if node_name in reachable_nodes:
+                continue
+            if all(
+                can_satisfy(expr, reachable_topics)
+                for expr in node.subscribed_expressions
+            ):
+                reachable_nodes.add(node_name)
+                reachable_topics.update(topic.name for topic in node.publish_to)
+                changed = True
+
+    for node_name in nodes.keys() - reachable_nodes:
+        logger.warning(
+            f"[{workflow_name}] Node {node_name} is unreachable from the agent input topic"
+        )
+
+
+def check_cycles(
+    workflow_name: str, nodes: Dict[str, Node], topic_nodes: Dict[str, List[str]]
+) -> None:
+    """Log the cycles between nodes that do not go through the human request topic."""
+    # Edges between nodes through the topics they publish to, except human requests,
+    # which suspend the workflow until the next turn
+    successors: Dict[str, List[str]] = {
+        node_name: [
+            subscriber
+            for topic in node.publish_to
+            if topic.name != HUMAN_REQUEST_TOPIC
+            for subscriber in topic_nodes.get(topic.name, [])
+        ]
+        for node_name, node in nodes.items()
+    }
+
+    # Iterative depth-first search, a back edge closes a cycle
+    visited: Set[str] = set()
+    for start in nodes:
+        if start in visited:
+            continue
+        path: List[str] = [start]
+        on_path: Set[str] = {start}
+        stack = [iter(successors[start])]
+        visited.add(start)
+        while stack:
+            successor = next(stack[-1], None)
+            if successor is None:
+                stack.pop()
+                on_path.discard(path.pop())
+            elif successor in on_path:
+                cycle = path[path.index(successor) :] + [successor]
+                logger.warning(
+                    f"[{workflow_name}] Workflow has a cycle: {' -> '.join(cycle)}"
+                )
+            elif successor not in visited:
+                visited.add(successor)
+                path.append(successor)
+                on_path.add(successor)
+                stack.append(iter(successors[successor]))
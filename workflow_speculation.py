@@ -0,0 +1,117 @@
+from concurrent.futures import Executor
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+from managed_llm_node import ManagedLLMNode
+from workflow_routing import can_satisfy
+
+from grafi.common.events.topic_events.consume_from_topic_event import (
+    ConsumeFromTopicEvent,
+)
+from grafi.common.models.execution_context import ExecutionContext
+from grafi.common.models.message import Message
+from grafi.nodes.node import Node
+
+
+class WorkflowSpeculation:
+    """
+    The managed LLM nodes started speculatively while a node with a speculative output
+    runs, found once when the workflow is built. Only nodes the predicted output alone
+    would trigger are started, and they keep their result only if the node answers as
+    predicted.
+
+    Only node names are kept, so copies of the workflow can share it.
+
+    Args:
+        nodes (Dict[str, Node]): The nodes of the workflow, by name.
+        topic_nodes (Dict[str, List[str]]): The subscribers of every topic.
+        streamed_nodes (Set[str]): Nodes the workflow can stream instead of calling
+            their command, they are never started speculatively.
+    """
+
+    def __init__(
+        self,
+        nodes: Dict[str, Node],
+        topic_nodes: Dict[str, List[str]],
+        streamed_nodes: Set[str],
+    ):
+        self.targets: Dict[str, List[str]] = {
+            node_name: self._find_targets(node, nodes, topic_nodes, streamed_nodes)
+            for node_name, node in nodes.items()
+            if isinstance(node, ManagedLLMNode) and node.speculative_output is not None
+        }
+
+    @staticmethod
+    def _find_targets(
+        node: ManagedLLMNode,
+        nodes: Dict[str, Node],
+        topic_nodes: Dict[str, List[str]],
+        streamed_nodes: Set[str],
+    ) -> List[str]:
+        predicted = [Message(role="assistant", content=node.speculative_output)]
+        targets = []
+        for topic in node.publish_to:
+            if not topic.condition(predicted):
+                continue
+            for node_name in topic_nodes.get(topic.name, []):
+                target = nodes[node_name]
+                if (
+                    isinstance(target, ManagedLLMNode)
+                    and node_name != node.name
+                    and node_name not in targets
+                    and node_name not in streamed_nodes
+                    and all(
+                        can_satisfy(expr, {topic.name})
+                        for expr in target.subscribed_expressions
+                    )
+                ):
+                    targets.append(node_name)
+        return targets
+
+    def start(
+        self,
+        nodes: Dict[str, Node],
+        execution_context: ExecutionContext,
+        node: Node,
+        node_consumed_events: List[ConsumeFromTopicEvent],
+        executor: Optional[Executor] = None,
+    ) -> List[ManagedLLMNode]:
+        """
+        Start the targets of the node on the executor, or as tasks of the running event
+        loop without one, and return them.
+        """
+        targets = [nodes[node_name] for node_name in self.targets.get(node.name, [])]
+        if not targets:
+            return []
+
+        upstream_input = node.get_command_input(execution_context, node_consumed_events)
+        predicted = Message(role="assistant", content=node.speculative_output)
+        for target in targets:
+            if executor is None:
+                target.a_speculate(execution_context, upstream_input, predicted)
+            else:
+                target.speculate(
+                    execution_context, upstream_input, predicted, executor
+                )
+        return targets
+
+    @staticmethod
+    def resolve(node: Node, result: Any, targets: List[ManagedLLMNode]) -> None:
+        """Discard the target speculations unless the node answered as predicted."""
+        # Nothing to resolve against when the node failed
+        if targets and (
+            not isinstance(result, list)
+            or not result
+            or result[-1].content != node.speculative_output
+        ):
+            for target in targets:
+                target.discard_speculation()
+
+    def discard(self, nodes: Dict[str, Node]) -> None:
+        """Discard the speculations of nodes that did not run in the end."""
+        for node_names in self.targets.values():
+            for node_name in node_names:
+                nodes[node_name].discard_speculation()
@@ -0,0 +1,187 @@
+from collections import deque
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+
+from parallel_event_driven_workflow import ParallelEventDrivenWorkflow
+from pydantic import BaseModel
+
+from grafi.common.topics.topic_base import TopicBase
+from grafi.common.topics.topic_expression import CombinedExpr
+from grafi.common.topics.topic_expression import SubExpr
+from grafi.common.topics.topic_expression import TopicExpr
+from grafi.nodes.node import Node
+from grafi.tools.tool import Tool
+
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Compiled state of the workflow, shared by the instances of a template
+SHARED_WORKFLOW_ATTRIBUTES = (
+    "_routing",
+    "_speculation",
+)
+
+
+def reset_private_attributes(
+    model: ModelT, keep: Tuple[str, ...] = ()
+) -> ModelT:
+    """Reset the private attributes of a copied model to their defaults but `keep`."""
+    for name, private_attribute in type(model).__private_attributes__.items():
+        if name not in keep:
+            setattr(model, name, private_attribute.get_default())
+    return model
+
+
+class WorkflowTemplate:
+    """
+    A built and compiled workflow to stamp out workflows from, at a fraction of the cost
+    of building them.
+
+    An instance gets its own workflow, topics and nodes, the objects holding the state
+    of a request, all copied without validation. The compiled routing table, the
+    subscription predicates, the function specs, and every tool and command that is not
+    reconfigured are shared with the template. Tools are reconfigured by name, with
+    the fields to change, so instances can differ in api key, model or system message:
+
+        template = WorkflowTemplate(workflow)
+        tenant_workflow = template.instantiate(
+            {"ThoughtLLM": {"api_key": tenant_api_key, "model": "gpt-4o"}}
+        )
+
+    Instantiating leaves the template workflow untouched, so a workflow in use can be
+    the template, as when an assistant forks its workflow. It must not be changed once
+    the template is made.
+
+    Args:
+        workflow (ParallelEventDrivenWorkflow): The built workflow.
+    """
+
+    def __init__(self, workflow: ParallelEventDrivenWorkflow):
+        self.workflow = workflow
+        self._tools: Dict[str, Tool] = {}
+        for node in workflow.nodes.values():
+            for owner in (node, node.command):
+                for tool in self._get_tools(owner).values():
+                    self._tools.setdefault(tool.name, tool)
+
+    @property
+    def tool_names(self) -> List[str]:
+        """Names of the tools that can be reconfigured."""
+        return list(self._tools)
+
+    @staticmethod
+    def _get_tools(model: Optional[BaseModel]) -> Dict[str, Tool]:
+        """Return the tools held by the fields of a node or command, by field name."""
+        if model is None:
+            return {}
+        return {
+            field_name: value
+            for field_name in type(model).model_fields
+            if isinstance(value := getattr(model, field_name), Tool)
+        }
+
+    def instantiate(
+        self, tool_params: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> ParallelEventDrivenWorkflow:
+        """
+        Stamp out a workflow from the template.
+
+        Args:
+            tool_params (Optional[Dict[str, Dict[str, Any]]]): Fields to set on the
+                copies of the tools, by tool name. Other tools are shared.
+
+        Returns:
+            ParallelEventDrivenWorkflow: A workflow ready to execute.
+        """
+        tool_params = tool_params or {}
+        unknown_tools = tool_params.keys() - self._tools.keys()
+        if unknown_tools:
+            raise ValueError(
+                f"Unknown tools {sorted(unknown_tools)} in workflow "
+                f"{self.workflow.name}"
+            )
+
+        tools: Dict[int, Tool] = {
+            id(self._tools[name]): self._tools[name].model_copy(update=params)
+            for name, params in tool_params.items()
+        }
+        topics = {
+            name: self._copy_topic(topic)
+            for name, topic in self.workflow.topics.items()
+        }
+        nodes = {
+            name: self._copy_node(node, topics, tools)
+            for name, node in self.workflow.nodes.items()
+        }
+
+        workflow = reset_private_attributes(
+            self.workflow.model_copy(
+                update={
+                    "nodes": nodes,
+                    "topics": topics,
+                    "state": {},
+                    "execution_context": None,
+                    "execution_queue": deque(),
+                }
+            ),
+            keep=SHARED_WORKFLOW_ATTRIBUTES,
+        )
+        workflow.bind_topics()
+        return workflow
+
+    @staticmethod
+    def _copy_topic(topic: TopicBase) -> TopicBase:
+        # Module level topics carry the events of the workflows that last used them
+        return topic.model_copy(update={"topic_events": [], "consumption_offsets": {}})
+
+    def _copy_expression(self, expr: SubExpr, topics: Dict[str, TopicBase]) -> SubExpr:
+        if isinstance(expr, TopicExpr):
+            return expr.model_copy(update={"topic": topics[expr.topic.name]})
+        if isinstance(expr, CombinedExpr):
+            return expr.model_copy(
+                update={
+                    "left": self._copy_expression(expr.left, topics),
+                    "right": self._copy_expression(expr.right, topics),
+                }
+            )
+        return expr
+
+    def _tool_update(
+        self, model: BaseModel, tools: Dict[int, Tool]
+    ) -> Dict[str, Tool]:
+        """Return the fields of the model holding a reconfigured tool, with its copy."""
+        return {
+            field_name: tools[id(tool)]
+            for field_name, tool in self._get_tools(model).items()
+            if id(tool) in tools
+        }
+
+    def _copy_node(
+        self, node: Node, topics: Dict[str, TopicBase], tools: Dict[int, Tool]
+    ) -> Node:
+        command = node.command
+        command_update = self._tool_update(command, tools)
+        if command_update:
+            command = command.model_copy(update=command_update)
+
+        copy = reset_private_attributes(
+            node.model_copy(
+                update={
+                    **self._tool_update(node, tools),
+                    "command": command,
+                    "subscribed_expressions": [
+                        self._copy_expression(expr, topics)
+                        for expr in node.subscribed_expressions
+                    ],
+                    "publish_to": [topics[topic.name] for topic in node.publish_to],
+                }
+            )
+        )
+        copy._subscribed_topics = {
+            name: topics[name] for name in node._subscribed_topics
+        }
+        return copy